@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from main_evaluate import compile_answer_key
+
+ANSWER_KEY_DIR = os.environ.get("ANSWER_KEY_DIR", "answer_keys")
+
+def answer_key_id(correct_answers: dict) -> str:
+    """Anahtar içeriğinden kararlı kimlik üret (aynı anahtar -> aynı ID)"""
+    canonical = json.dumps(correct_answers, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+class AnswerKeyRegistry:
+    """Kayıtlı cevap anahtarları; derlenmiş halleri bellekte tutulur
+
+    Ham anahtarlar storage_dir altında saklanır, sunucu yeniden başlayınca
+    ilk kullanımda tekrar yüklenip derlenir.
+    """
+
+    def __init__(self, storage_dir: str = ANSWER_KEY_DIR):
+        self.storage_dir = storage_dir
+        self._keys = {}
+        self._lock = threading.Lock()
+        os.makedirs(storage_dir, exist_ok=True)
+
+    def _path(self, key_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{key_id}.json")
+
+    def _entry(self, key_id: str, record: dict) -> dict:
+        return {**record, "compiled": compile_answer_key(record["answers"])}
+
+    def register(self, correct_answers: dict, name: str = None) -> dict:
+        """Anahtarı kaydet ve derle; aynı içerik tekrar kaydedilirse aynı ID döner"""
+        if not isinstance(correct_answers, dict) or not correct_answers:
+            raise ValueError("Cevap anahtarı boş olmayan bir JSON nesnesi olmalı")
+        if not all(isinstance(v, str) for v in correct_answers.values()):
+            raise ValueError("Cevap anahtarındaki tüm cevaplar metin olmalı")
+
+        key_id = answer_key_id(correct_answers)
+
+        with self._lock:
+            if key_id not in self._keys:
+                record = {
+                    "key_id": key_id,
+                    "name": name,
+                    "created_at": time.time(),
+                    "answers": correct_answers,
+                }
+                with open(self._path(key_id), "w", encoding="utf-8") as f:
+                    json.dump(record, f, indent=2, ensure_ascii=False)
+                self._keys[key_id] = self._entry(key_id, record)
+
+            return self._keys[key_id]
+
+    def get(self, key_id: str):
+        """Kayıtlı anahtarı döndür (answers + compiled), yoksa None"""
+        with self._lock:
+            if key_id in self._keys:
+                return self._keys[key_id]
+
+            # Önceki çalıştırmadan kalan kayıt
+            if not key_id.isalnum() or not os.path.exists(self._path(key_id)):
+                return None
+            with open(self._path(key_id), "r", encoding="utf-8") as f:
+                self._keys[key_id] = self._entry(key_id, json.load(f))
+            return self._keys[key_id]
+
+    def list(self):
+        keys = []
+        for filename in sorted(os.listdir(self.storage_dir)):
+            if filename.endswith(".json"):
+                entry = self.get(filename[:-5])
+                if entry is not None:
+                    keys.append(describe(entry))
+        return keys
+
+    def delete(self, key_id: str) -> bool:
+        with self._lock:
+            self._keys.pop(key_id, None)
+            path = self._path(key_id)
+            if key_id.isalnum() and os.path.exists(path):
+                os.remove(path)
+                return True
+        return False
+
+def describe(entry: dict) -> dict:
+    """API yanıtı için derlenmiş alanlar olmadan özet"""
+    return {
+        "key_id": entry["key_id"],
+        "name": entry.get("name"),
+        "created_at": entry.get("created_at"),
+        "question_count": len(entry["answers"]),
+    }
@@ -0,0 +1,235 @@
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+from ocr_parsing import parse_answer_sheet, parse_score_sheet
+from text_normalize import OCR_CHAR_MAP
+
+# Eski (satır başına ileri tarama + derlenmemiş regex) ayrıştırıcılar:
+# hız karşılaştırması ve çıktı eşitliği kontrolü için referans
+
+def legacy_correct_common_ocr_errors(text: str) -> str:
+    text = text.translate(str.maketrans(OCR_CHAR_MAP))
+    text = text.replace('u', '4').replace('U', '4')
+    text = text.replace('o', '0').replace('O', '0')
+    text = text.replace('l', '1').replace('I', '1')
+    return text
+
+def legacy_parse_answer_sheet(rec_texts, rec_scores):
+    student_name = None
+    student_id = None
+    answers = {}
+    answer_warnings = {}
+
+    for i, text in enumerate(rec_texts):
+        text = text.strip()
+
+        if "Ad Soyad" in text or "ad soyad" in text.lower() or "Ad soyad" in text:
+            parts = text.split(":")
+            if len(parts) > 1:
+                student_name = parts[1].strip()
+
+        elif "Ogrenci No" in text or "Öğrenci No" in text or "ogrenci no" in text.lower():
+            parts = text.split(":")
+            if len(parts) > 1:
+                student_id = legacy_correct_common_ocr_errors(parts[1].strip())
+                student_id = ''.join(filter(str.isdigit, student_id))
+
+        elif "Soru" in text or "soru" in text.lower():
+            match = re.search(r'[Ss]oru\s*(\d+)', text)
+            if match:
+                question_num = int(match.group(1))
+                answer = None
+                low_confidence_indices = []
+
+                if ":" in text:
+                    parts = text.split(":", 1)
+                    if len(parts) > 1:
+                        answer = parts[1].strip()
+                        if i < len(rec_scores) and rec_scores[i] < 0.85:
+                            low_confidence_indices.append(i)
+
+                j = i + 1
+                while j < len(rec_texts):
+                    next_text = rec_texts[j].strip()
+                    if re.search(r'[Ss]oru\s*\d+', next_text):
+                        break
+                    if next_text:
+                        if j < len(rec_scores) and rec_scores[j] < 0.85:
+                            low_confidence_indices.append(j)
+                        if answer:
+                            answer += " " + next_text
+                        else:
+                            answer = next_text
+                    j += 1
+
+                if not answer or answer == "" or answer.lower() == "boş" or answer.lower() == "bos":
+                    answers[question_num] = "Boş"
+                else:
+                    answers[question_num] = answer
+                    if low_confidence_indices:
+                        answer_warnings[question_num] = {
+                            "warning": "Düşük OCR güvenilirliği",
+                            "low_confidence_scores": [rec_scores[idx] for idx in low_confidence_indices if idx < len(rec_scores)]
+                        }
+
+    return student_name, student_id, answers, answer_warnings
+
+def legacy_correct_ocr_errors(text: str) -> str:
+    replacements = {
+        's': '3', 'S': '3', 'f': 'p', 'F': 'p', 'l': '1', 'I': '1', 'o': '0', 'O': '0',
+        'ğ': '9', 'Ğ': '9', 'ş': '6', 'Ş': '6', 'ı': '1', 'İ': '1', 'ρ': 'p', 'P': 'p'
+    }
+    for wrong, correct in replacements.items():
+        text = text.replace(wrong, correct)
+    return text
+
+def legacy_extract_scores_from_text(text: str, all_scores: dict):
+    corrected_text = legacy_correct_ocr_errors(text)
+    original_text = text
+
+    matches = re.findall(r'(\d+)\s*[pPρ]\s*=\s*(\d+)', corrected_text)
+    for match in matches:
+        if len(match) == 2:
+            all_scores[int(match[0])] = int(match[1])
+
+    matches = re.findall(r'[pPρ]\s*=\s*(\d+)', corrected_text)
+    if matches:
+        numbers_in_text = re.findall(r'(\d+)', original_text)
+        for score_match in matches:
+            score = int(score_match)
+            question_match = re.search(r'(\d+)\.', original_text)
+            if question_match:
+                q_num = int(question_match.group(1))
+                if q_num not in all_scores and 1 <= q_num <= 50:
+                    all_scores[q_num] = score
+                    continue
+            for num in numbers_in_text:
+                num_int = int(num)
+                if num_int not in all_scores and 1 <= num_int <= 50:
+                    if f"{num}p" in corrected_text.lower() or f"{num} p" in corrected_text.lower():
+                        all_scores[num_int] = score
+                        break
+
+def legacy_parse_score_sheet(rec_texts) -> dict:
+    all_scores = {}
+    for text in rec_texts:
+        text = text.strip()
+        if text:
+            legacy_extract_scores_from_text(text, all_scores)
+    return all_scores
+
+# Sentetik OCR satırları: uzun çok satırlı cevaplar, OCR karakter hataları, gürültü satırları
+WORDS = ["proje", "yönetimi", "kapsam", "zaman", "maliyet", "risk", "paydaş", "Gantt", "şeması",
+         "fotosentez", "Ankara", "baskent", "42", "3.5", "planlama", "kontrol", "süreç", "kalite"]
+NOISE = ["", "  ", "Sayfa 1", "SORU KAĞIDI", "soru", "Açıklama:", "Ogrenci", "ad", "Bos", "boş",
+         "Çözüm: ölçü", "ñöü åçë", "Not: soru iptal"]
+
+def make_answer_lines(rng: random.Random, questions: int):
+    texts = [
+        "SINAV CEVAP KAĞIDI",
+        f"Ad Soyad: {rng.choice(['Ali Veli', 'Zeynep Kaya', 'Emre Çelik'])}",
+        f"Öğrenci No: {rng.choice(['12O3', '4u56', 'l789', '2024'])}{rng.randint(0, 99)}",
+    ]
+    for q in range(1, questions + 1):
+        label = rng.choice(["Soru", "soru", "Soru ", "Soru  "]) + str(q)
+        style = rng.random()
+        if style < 0.1:
+            texts.append(f"{label}: {rng.choice(['Boş', 'bos', ''])}")
+        elif style < 0.2:
+            texts.append(label)
+        else:
+            texts.append(f"{label}: " + " ".join(rng.choices(WORDS, k=rng.randint(1, 6))))
+        for _ in range(rng.choice([0, 0, 1, 2, 4])):
+            texts.append(" ".join(rng.choices(WORDS, k=rng.randint(1, 8))))
+        if rng.random() < 0.1:
+            texts.append(rng.choice(NOISE))
+        if rng.random() < 0.02:
+            # Tekrarlanan soru numarası ve cevap arasına düşen ad satırı
+            texts.append(f"Soru {rng.randint(1, questions)}: tekrar")
+            texts.append("Ad Soyad: Ayşe Yılmaz")
+    scores = [round(rng.uniform(0.5, 1.0), 4) for _ in texts[:-rng.randint(0, 3) or None]]
+    return texts, scores
+
+def make_score_lines(rng: random.Random, questions: int):
+    texts = ["PUAN TABLOSU", "Ad Soyad: Ali Veli"]
+    for q in range(1, questions + 1):
+        score = rng.randint(0, 20)
+        texts.append(rng.choice([
+            f"{q}p={score}", f"{q} P = {score}", f"{q}f={score}", f"{q}ρ= {score}",
+            f"{q}. soru p={score}", f"{q}. Sf= {score}", f"soru {q}p p={score}",
+            f"{q}p={score}, {q + 1}p={rng.randint(0, 20)}", f"toplam {q}", "İmza:", "",
+        ]))
+    return texts
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, seed: int, repeat: int) -> list:
+    rows = []
+    for size in sizes:
+        rng = random.Random(seed + size)
+        texts, scores = make_answer_lines(rng, size)
+        score_texts = make_score_lines(rng, size)
+
+        answer_same = legacy_parse_answer_sheet(texts, scores) == parse_answer_sheet(texts, scores)
+        score_same = legacy_parse_score_sheet(score_texts) == parse_score_sheet(score_texts)
+
+        old_answer = best_of(lambda: legacy_parse_answer_sheet(texts, scores), repeat)
+        new_answer = best_of(lambda: parse_answer_sheet(texts, scores), repeat)
+        old_score = best_of(lambda: legacy_parse_score_sheet(score_texts), repeat)
+        new_score = best_of(lambda: parse_score_sheet(score_texts), repeat)
+
+        rows.append({
+            "soru": size,
+            "cevap_satiri": len(texts),
+            "cevap_eski_ms": round(old_answer * 1000, 3),
+            "cevap_yeni_ms": round(new_answer * 1000, 3),
+            "cevap_ayni": answer_same,
+            "puan_satiri": len(score_texts),
+            "puan_eski_ms": round(old_score * 1000, 3),
+            "puan_yeni_ms": round(new_score * 1000, 3),
+            "puan_ayni": score_same,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Eski ve tek geçişli OCR ayrıştırıcılarının hız / çıktı karşılaştırması")
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="Kağıt başına soru sayıları (virgülle ayrılmış)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3, help="Her ölçüm için tekrar (en iyi süre alınır)")
+    parser.add_argument("--json", help="Sonuçları bu dosyaya da yaz")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    rows = run(sizes, args.seed, max(1, args.repeat))
+
+    print(f"{'Soru':>6}{'Satır':>8}{'Cevap eski':>13}{'yeni':>11}{'hız':>8}{'Puan eski':>12}{'yeni':>11}{'hız':>8}  Aynı")
+    for row in rows:
+        print(f"{row['soru']:>6}{row['cevap_satiri']:>8}"
+              f"{row['cevap_eski_ms']:>11.2f}ms{row['cevap_yeni_ms']:>9.2f}ms"
+              f"{row['cevap_eski_ms'] / max(row['cevap_yeni_ms'], 1e-6):>7.1f}x"
+              f"{row['puan_eski_ms']:>10.2f}ms{row['puan_yeni_ms']:>9.2f}ms"
+              f"{row['puan_eski_ms'] / max(row['puan_yeni_ms'], 1e-6):>7.1f}x"
+              f"  {'evet' if row['cevap_ayni'] and row['puan_ayni'] else 'HAYIR'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "sonuclar": rows}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Sonuçlar kaydedildi: {args.json}")
+
+    # Çıktı farkı gerileme sayılır
+    if not all(row["cevap_ayni"] and row["puan_ayni"] for row in rows):
+        print("❌ Yeni ayrıştırıcı eski çıktıyla aynı değil!")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from difflib import SequenceMatcher
+
+import cv2
+
+import main_puan
+import main_v3
+from image_io import decode_image, read_image_bytes
+from main_batch import collect_images
+from ocr_engine import create_ocr_engine, extract_payload
+from roi import apply_roi
+
+# --truth klasöründe beklenen dosya adları
+TRUTH_SUFFIX = {"v3": "_processed.json", "puan": "_scores.json"}
+
+def prepare(mode: str, img, crop: bool, target_text_height: int):
+    # Pipeline'ın prepare_ocr_input'u ile aynı adımlar, ROI ayarı parametre olarak
+    img, transform = apply_roi(img, crop=crop, target_text_height=target_text_height)
+    if mode == "v3":
+        img = cv2.cvtColor(main_v3.threshold_image(img), cv2.COLOR_GRAY2BGR)
+    return img, transform
+
+def parsed_fields(mode: str, result) -> dict:
+    """Karşılaştırılacak alanlar: v3 -> ad, numara, cevaplar; puan -> soru puanları"""
+    if not result:
+        return {}
+    if mode == "v3":
+        fields = {"ad": result.get("student_name"), "no": result.get("student_id")}
+        fields.update({f"soru {q}": a for q, a in result.get("answers", {}).items()})
+        return fields
+    return {f"soru {q}": s for q, s in result.get("scores", {}).items()}
+
+def parse(mode: str, payload: dict, image_path: str) -> dict:
+    pipeline = main_v3 if mode == "v3" else main_puan
+    # Ayrıştırma çıktısı (print) benchmark tablosunu bozmasın
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parsed_fields(mode, pipeline.process_ocr_data(payload, image_path))
+
+def load_truth(truth_dir: str, mode: str, image_path: str):
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    path = os.path.join(truth_dir, base_name + TRUTH_SUFFIX[mode])
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return parsed_fields(mode, json.load(f))
+
+def field_agreement(expected: dict, actual: dict) -> float:
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return sum(1 for k, v in expected.items() if actual.get(k) == v) / len(expected)
+
+def build_configs(heights):
+    configs = [("tam çözünürlük", False, 0), ("roi", True, 0)]
+    configs += [(f"roi+h{h}", True, h) for h in heights]
+    return configs
+
+def main():
+    parser = argparse.ArgumentParser(description="ROI kırpma / küçültme ayarlarının hız-doğruluk karşılaştırması")
+    parser.add_argument("source", help="Örnek kağıt klasörü ya da glob deseni")
+    parser.add_argument("--mode", choices=sorted(TRUTH_SUFFIX), default="v3")
+    parser.add_argument("--heights", default="48,32,24",
+                        help="Denenecek hedef yazı yükseklikleri (virgülle ayrılmış, piksel)")
+    parser.add_argument("--truth", help="Beklenen _processed.json / _scores.json klasörü "
+                                        "(verilmezse tam çözünürlük sonucu referans alınır)")
+    parser.add_argument("--repeat", type=int, default=1, help="Her ayar için tekrar (en iyi süre alınır)")
+    parser.add_argument("--json", help="Sonuçları bu dosyaya da yaz")
+    args = parser.parse_args()
+
+    image_paths = collect_images(args.source)
+    if not image_paths:
+        print(f"Uyarı: {args.source} içinde görüntü bulunamadı!")
+        return
+
+    heights = [int(h) for h in args.heights.split(",") if h.strip()]
+    configs = build_configs(heights)
+    os.makedirs("output" if args.mode == "v3" else main_puan.folder_path, exist_ok=True)
+
+    images = []
+    for image_path in image_paths:
+        img = decode_image(read_image_bytes(image_path))
+        if img is None:
+            print(f"Hata: {image_path} okunamadı!")
+            continue
+        images.append((image_path, img))
+
+    if not images:
+        print(f"Uyarı: {args.source} içinde okunabilen görüntü bulunamadı!")
+        return
+
+    ocr = create_ocr_engine()
+
+    # İlk predict çağrısı model ısınmasını içerir, ölçüme katılmaz
+    ocr.predict(prepare(args.mode, images[0][1], False, 0)[0])
+
+    rows = []
+    reference = {}
+    for label, crop, height in configs:
+        prep_time = ocr_time = pixels = text_sim = agreement = 0.0
+        compared = 0
+
+        for image_path, img in images:
+            best_prep = best_ocr = float("inf")
+            for _ in range(max(1, args.repeat)):
+                start = time.perf_counter()
+                ocr_input, transform = prepare(args.mode, img, crop, height)
+                prepared = time.perf_counter()
+                payload = extract_payload(ocr.predict(ocr_input), transform)
+                done = time.perf_counter()
+                best_prep = min(best_prep, prepared - start)
+                best_ocr = min(best_ocr, done - prepared)
+
+            prep_time += best_prep
+            ocr_time += best_ocr
+            pixels += ocr_input.shape[0] * ocr_input.shape[1]
+
+            text = "\n".join(payload["rec_texts"])
+            fields = parse(args.mode, payload, image_path)
+            if not crop:
+                reference[image_path] = (text, fields)
+
+            expected = load_truth(args.truth, args.mode, image_path) if args.truth else reference[image_path][1]
+            if expected is not None:
+                agreement += field_agreement(expected, fields)
+                compared += 1
+            text_sim += SequenceMatcher(None, reference[image_path][0], text).ratio()
+
+        n = len(images)
+        rows.append({
+            "ayar": label,
+            "kirpma": crop,
+            "hedef_yazi_yuksekligi": height,
+            "onisleme_ms": round(prep_time / n * 1000, 1),
+            "ocr_ms": round(ocr_time / n * 1000, 1),
+            "megapiksel": round(pixels / n / 1e6, 2),
+            "metin_benzerligi": round(text_sim / n, 4),
+            "alan_uyumu": round(agreement / compared, 4) if compared else None,
+        })
+
+    base_ms = rows[0]["onisleme_ms"] + rows[0]["ocr_ms"]
+    print(f"\n{len(images)} görüntü, {args.mode} modu, referans: {'--truth' if args.truth else 'tam çözünürlük'}")
+    print(f"{'Ayar':<16}{'MP':>7}{'Önişleme':>11}{'OCR':>10}{'Hızlanma':>10}{'Metin':>9}{'Alan':>8}")
+    for row in rows:
+        total_ms = row["onisleme_ms"] + row["ocr_ms"]
+        agreement = f"{row['alan_uyumu']:.1%}" if row["alan_uyumu"] is not None else "-"
+        print(f"{row['ayar']:<16}{row['megapiksel']:>7.2f}{row['onisleme_ms']:>9.1f}ms{row['ocr_ms']:>8.1f}ms"
+              f"{base_ms / total_ms:>9.2f}x{row['metin_benzerligi']:>9.1%}{agreement:>8}")
+
+    print("\nSeçilen ayar için: ROI_CROP=1 ROI_TARGET_TEXT_HEIGHT=<yükseklik> (0: küçültme yok)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mod": args.mode, "goruntu_sayisi": len(images), "sonuclar": rows}, f,
+                      indent=2, ensure_ascii=False)
+        print(f"💾 Sonuçlar kaydedildi: {args.json}")
+
+if __name__ == "__main__":
+    main()
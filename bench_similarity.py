@@ -0,0 +1,148 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from difflib import SequenceMatcher
+
+import similarity
+from text_normalize import normalize_text
+
+# Yeni motorun eski skorlardan izin verilen en büyük sapması
+TOLERANCE = 0.0
+
+# Gerçek veri verilmezse kullanılan örnek cevap anahtarı
+SAMPLE_KEY = {
+    "1": "Ankara / başkent ankara",
+    "2": "fotosentez",
+    "3": "Proje yönetimi, bir projenin başlangıcından bitişine kadar planlanması, yürütülmesi ve kontrol edilmesidir",
+    "4": "kapsam, zaman ve maliyet / üçlü kısıt",
+    "5": "Risk yönetimi belirsizliklerin tanımlanması, analiz edilmesi ve bunlara yanıt planlanması sürecidir",
+    "6": "Gantt şeması",
+    "7": "paydaş analizi projeden etkilenen kişi ve grupların belirlenmesidir",
+    "8": "kritik yol yöntemi / CPM",
+}
+
+# OCR'ın sık karıştırdığı karakterler
+OCR_NOISE = {"ö": "ä", "ü": "ù", "ş": "s", "ı": "i", "ğ": "ġ", "o": "ò", "e": "é", "a": "à"}
+
+def reference_similarity(s1: str, s2: str):
+    """Eski string_similarity (iç içe SequenceMatcher döngüleri)"""
+    s1_norm = normalize_text(s1)
+    s2_norm = normalize_text(s2)
+
+    if not s1_norm or not s2_norm:
+        return 0
+
+    if s1_norm == s2_norm:
+        return 100
+
+    words1 = s1_norm.split()
+    words2 = s2_norm.split()
+
+    char_similarity = SequenceMatcher(None, s1_norm, s2_norm).ratio() * 100
+
+    if words1 and words2:
+        matching_words = sum(1 for w in words1 if any(
+            SequenceMatcher(None, w, w2).ratio() > 0.75 for w2 in words2
+        ))
+        word_similarity = (matching_words / max(len(words1), len(words2))) * 100
+        return (char_similarity + word_similarity) / 2
+
+    return char_similarity
+
+def add_noise(text: str, rng: random.Random, rate: float = 0.1) -> str:
+    words = text.split()
+    noisy = []
+    for w in words:
+        if rng.random() < 0.1:
+            continue  # kelime atla
+        chars = [OCR_NOISE.get(c, c) if rng.random() < rate else c for c in w]
+        noisy.append("".join(chars))
+    if rng.random() < 0.3:
+        rng.shuffle(noisy)
+    return " ".join(noisy)
+
+def load_pairs(key_path: str, answers_dir: str, students: int, seed: int):
+    """(doğru alternatif, öğrenci cevabı) çiftleri: gerçek veri ya da gürültülü örnekler"""
+    key = SAMPLE_KEY
+    if key_path:
+        with open(key_path, "r", encoding="utf-8") as f:
+            key = json.load(f)
+
+    pairs = []
+    if answers_dir:
+        for path in sorted(glob.glob(os.path.join(answers_dir, "*_processed.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                answers = json.load(f).get("answers", {})
+            for q_num, correct in key.items():
+                student = answers.get(str(q_num), "")
+                for alt in correct.split("/"):
+                    pairs.append((alt.strip(), student))
+        return pairs
+
+    rng = random.Random(seed)
+    for _ in range(students):
+        for correct in key.values():
+            alternatives = [alt.strip() for alt in correct.split("/")]
+            student = add_noise(rng.choice(alternatives), rng)
+            for alt in alternatives:
+                pairs.append((alt, student))
+    return pairs
+
+def clear_caches():
+    for fn in (similarity.cached_normalize, similarity._split_words,
+               similarity.words_match, similarity._normalized_similarity):
+        fn.cache_clear()
+
+def time_calls(fn, pairs, repeat: int, cold: bool):
+    best = float("inf")
+    for _ in range(repeat):
+        if cold:
+            clear_caches()
+        start = time.perf_counter()
+        for correct, student in pairs:
+            fn(student, correct)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="string_similarity mikro benchmark'ı (eski vs yeni)")
+    parser.add_argument("--key", help="Doğru cevaplar JSON'ı (varsayılan: gömülü örnek)")
+    parser.add_argument("--answers", help="_processed.json dosyalarının klasörü (gerçek öğrenci cevapları)")
+    parser.add_argument("--students", type=int, default=200, help="Sentetik öğrenci sayısı")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.key, args.answers, args.students, args.seed)
+    if not pairs:
+        print("Karşılaştırılacak cevap bulunamadı!")
+        return
+
+    # Doğruluk: her çift için eski ve yeni skor
+    clear_caches()
+    max_diff = 0.0
+    worst = None
+    for correct, student in pairs:
+        diff = abs(reference_similarity(student, correct) - similarity.string_similarity(student, correct))
+        if diff > max_diff:
+            max_diff, worst = diff, (student, correct)
+
+    old_time = time_calls(reference_similarity, pairs, args.repeat, cold=False)
+    cold_time = time_calls(similarity.string_similarity, pairs, args.repeat, cold=True)
+    warm_time = time_calls(similarity.string_similarity, pairs, args.repeat, cold=False)
+
+    n = len(pairs)
+    print(f"Çift sayısı: {n} ({len(set(pairs))} benzersiz)")
+    print(f"Eski uygulama     : {old_time * 1e6 / n:8.1f} µs/çağrı")
+    print(f"Yeni (soğuk cache): {cold_time * 1e6 / n:8.1f} µs/çağrı  ({old_time / cold_time:.1f}x)")
+    print(f"Yeni (sıcak cache): {warm_time * 1e6 / n:8.1f} µs/çağrı  ({old_time / warm_time:.1f}x)")
+    print(f"En büyük skor farkı: {max_diff:.4f} (tolerans: {TOLERANCE})")
+
+    if max_diff > TOLERANCE:
+        print(f"⚠️ Tolerans aşıldı: {worst}")
+
+if __name__ == "__main__":
+    main()
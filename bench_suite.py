@@ -0,0 +1,305 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import main_puan
+import main_v3
+import similarity
+from llm_stub_server import start_stub_server
+
+DEFAULT_REPORT = "bench_report.json"
+# Ortalama süre baseline'a göre bu orandan fazla artarsa gerileme sayılır
+REGRESSION_THRESHOLD = 0.2
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+PAGE_SIZE = (1240, 1754)  # A4, 150 dpi
+LINE_HEIGHT = 48
+MAX_LINE_CHARS = 48
+
+# Hershey fontları sadece ASCII çizebildiği için metinler Türkçe karaktersizdir
+FIRST_NAMES = ["Ali", "Ayse", "Mehmet", "Zeynep", "Can", "Elif", "Emre", "Deniz"]
+LAST_NAMES = ["Yilmaz", "Kaya", "Demir", "Celik", "Sahin", "Aydin", "Ozturk", "Arslan"]
+ANSWER_KEY = {
+    "1": "Ankara / baskent ankara",
+    "2": "fotosentez",
+    "3": "Proje yonetimi bir projenin baslangicindan bitisine kadar planlanmasi ve kontrol edilmesidir",
+    "4": "kapsam zaman ve maliyet / uclu kisit",
+    "5": "42",
+    "6": "Gantt semasi",
+    "7": "paydas analizi projeden etkilenen kisi ve gruplarin belirlenmesidir",
+    "8": "3.5",
+}
+WRONG_ANSWERS = ["istanbul", "bilmiyorum", "risk analizi yapilir", "17", "maliyet tablosu", "2.5"]
+
+class StageTimer:
+    """Aşama başına süre örnekleri (saniye)"""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        yield
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        stages = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            stages[stage] = {
+                "n": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+                "total_ms": round(sum(ordered) * 1000, 3),
+            }
+        return stages
+
+def render_lines(lines, rng: random.Random):
+    """Satırları taranmış kağıda benzeyen bir görüntüye çiz (hafif gürültü + bulanıklık)"""
+    width, height = PAGE_SIZE
+    img = np.full((height, width, 3), 245, np.uint8)
+    y = 120
+    for line in lines:
+        cv2.putText(img, line, (80 + rng.randint(-6, 6), y), FONT, 0.9, (25, 25, 25), 2, cv2.LINE_AA)
+        y += LINE_HEIGHT
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 6, img.shape)
+    img = np.clip(img + noise, 0, 255).astype(np.uint8)
+    return cv2.GaussianBlur(img, (3, 3), 0)
+
+def wrap(text: str, width: int = MAX_LINE_CHARS):
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    return lines + [current] if current else lines
+
+def make_answer_sheet(rng: random.Random, questions: int):
+    """Cevap kağıdı: (görüntü, OCR'ın okuması beklenen satırlar)"""
+    lines = [
+        f"Ad Soyad: {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        f"Ogrenci No: {rng.randint(20210000, 20249999)}",
+    ]
+    for q in range(1, questions + 1):
+        correct = ANSWER_KEY[str((q - 1) % len(ANSWER_KEY) + 1)]
+        roll = rng.random()
+        if roll < 0.1:
+            answer = "Bos"
+        elif roll < 0.3:
+            answer = rng.choice(WRONG_ANSWERS)
+        else:
+            answer = rng.choice(correct.split("/")).strip()
+        answer_lines = wrap(f"Soru {q}: {answer}")
+        lines.extend(answer_lines)
+    return render_lines(lines, rng), lines
+
+def make_score_sheet(rng: random.Random, questions: int):
+    """Puan kağıdı: "Np=7" ve "N. ... p=7" biçimleri karışık"""
+    lines = []
+    for q in range(1, questions + 1):
+        score = rng.randint(0, 10)
+        if rng.random() < 0.5:
+            lines.append(f"{q}p={score}")
+        else:
+            lines.append(f"{q}. soru p= {score}")
+    return render_lines(lines, rng), lines
+
+def student_answers(lines, questions: int) -> dict:
+    # Üretilen satırlardan soru -> cevap (değerlendirme aşamasının girdisi)
+    answers = {}
+    current = None
+    for line in lines:
+        if line.startswith("Soru "):
+            current, _, text = line[5:].partition(":")
+            answers[current] = text.strip()
+        elif current is not None:
+            answers[current] += " " + line
+    return {q: answers.get(str(q), "") for q in range(1, questions + 1)}
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    # process_ocr_json çıktıları (output/...) geçici klasöre yazılsın
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def polygon_crops(img, polys):
+    crops = []
+    for poly in polys:
+        x, y, w, h = cv2.boundingRect(np.asarray(poly, dtype=np.int32))
+        if w > 1 and h > 1:
+            crops.append(img[max(0, y):y + h, max(0, x):x + w])
+    return crops
+
+def load_ocr_models():
+    """(algılama, tanıma) modelleri; paddleocr kurulu değilse None"""
+    try:
+        from ocr_engine import create_text_detector, create_text_recognizer
+        return create_text_detector(), create_text_recognizer()
+    except ImportError as e:
+        print(f"⚠️ OCR aşamaları atlanıyor ({e})")
+        return None
+
+def run_suite(sheets: int, questions: int, seed: int, with_ocr: bool = True) -> dict:
+    rng = random.Random(seed)
+    answer_sheets = [make_answer_sheet(rng, questions) for _ in range(sheets)]
+    score_sheets = [make_score_sheet(rng, questions) for _ in range(sheets)]
+    timer = StageTimer()
+
+    # 1. Önişleme
+    prepared = []
+    for img, _ in answer_sheets:
+        with timer.measure("preprocess_v3"):
+            ocr_input, _ = main_v3.prepare_ocr_input(img)
+        prepared.append(ocr_input)
+    for img, _ in score_sheets:
+        with timer.measure("preprocess_puan"):
+            main_puan.prepare_ocr_input(img)
+
+    # 2. OCR: algılama ve tanıma ayrı ayrı
+    models = load_ocr_models() if with_ocr else None
+    if models is not None:
+        detector, recognizer = models
+        # İlk çağrılar model ısınmasını içerir, ölçüme katılmaz
+        warm_polys = next(iter(detector.predict(prepared[0])))["dt_polys"]
+        recognizer.predict(polygon_crops(prepared[0], warm_polys)[:1] or [prepared[0]])
+
+        for ocr_input in prepared:
+            with timer.measure("ocr_detect"):
+                polys = next(iter(detector.predict(ocr_input)))["dt_polys"]
+            crops = polygon_crops(ocr_input, polys)
+            if crops:
+                with timer.measure("ocr_recognize"):
+                    recognizer.predict(crops)
+
+    # 3-5. Ayrıştırma ve değerlendirme, üretilen satırlar OCR çıktısı kabul edilerek
+    # (OCR sonucundan bağımsız, her çalıştırmada aynı girdi)
+    with tempfile.TemporaryDirectory() as tmp, working_directory(tmp), \
+            contextlib.redirect_stdout(io.StringIO()):
+        os.makedirs("output", exist_ok=True)
+        for i, (_, lines) in enumerate(answer_sheets):
+            json_path = f"sheet_{i}_res.json"
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({"rec_texts": lines, "rec_scores": [0.99] * len(lines)}, f)
+            with timer.measure("process_ocr_json"):
+                main_v3.process_ocr_json(json_path, f"sheet_{i}.jpg")
+
+        for _, lines in score_sheets:
+            all_scores = {}
+            with timer.measure("extract_scores_from_text"):
+                for line in lines:
+                    main_puan.extract_scores_from_text(line, all_scores)
+
+        evaluate_with_stub_llm(answer_sheets, questions, timer)
+
+    return timer.summary()
+
+def evaluate_with_stub_llm(answer_sheets, questions: int, timer: StageTimer):
+    server, base_url = start_stub_server("60")
+    os.environ["OLLAMA_HOST"] = base_url
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    try:
+        # OLLAMA_HOST import sırasında okunduğu için stub adresi ayarlandıktan sonra yüklenir
+        from main_evaluate import compile_answer_key, evaluate_answer
+
+        key = compile_answer_key({
+            str(q): ANSWER_KEY[str((q - 1) % len(ANSWER_KEY) + 1)] for q in range(1, questions + 1)
+        })
+        for fn in (similarity.cached_normalize, similarity._split_words,
+                   similarity.words_match, similarity._normalized_similarity):
+            fn.cache_clear()
+
+        for _, lines in answer_sheets:
+            for q, answer in student_answers(lines, questions).items():
+                with timer.measure("evaluate_answer"):
+                    evaluate_answer(answer, key[str(q)])
+    finally:
+        server.shutdown()
+
+def compare(report: dict, baseline: dict, threshold: float):
+    """Baseline'a göre her aşamanın oranı; (satırlar, gerilemeler)"""
+    rows = []
+    regressions = []
+    for stage, current in report["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or not base["mean_ms"]:
+            rows.append((stage, current["mean_ms"], None, None))
+            continue
+        ratio = current["mean_ms"] / base["mean_ms"]
+        rows.append((stage, current["mean_ms"], base["mean_ms"], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(stage)
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik kağıtlarla aşama bazlı benchmark")
+    parser.add_argument("--sheets", type=int, default=20, help="Üretilecek cevap ve puan kağıdı sayısı")
+    parser.add_argument("--questions", type=int, default=8, help="Kağıt başına soru sayısı")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-ocr", action="store_true", help="OCR aşamalarını atla")
+    parser.add_argument("--output", default=DEFAULT_REPORT, help="JSON rapor dosyası")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki rapor")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Gerileme sayılan artış oranı (0.2 = %%20)")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    stages = run_suite(args.sheets, args.questions, args.seed, with_ocr=not args.no_ocr)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+        },
+        "config": {"sheets": args.sheets, "questions": args.questions, "seed": args.seed},
+        "stages": stages,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.threshold)
+        print(f"{'Aşama':<26}{'Şimdi':>12}{'Baseline':>12}{'Oran':>8}")
+        for stage, current, base, ratio in rows:
+            mark = " ⚠️" if stage in regressions else ""
+            base_text = f"{base:>10.2f}ms" if base is not None else f"{'-':>12}"
+            ratio_text = f"{ratio:>7.2f}x" if ratio is not None else f"{'-':>8}"
+            print(f"{stage:<26}{current:>10.2f}ms{base_text}{ratio_text}{mark}")
+    else:
+        print(f"{'Aşama':<26}{'n':>6}{'Ortalama':>12}{'p95':>12}")
+        for stage, s in stages.items():
+            print(f"{stage:<26}{s['n']:>6}{s['mean_ms']:>10.2f}ms{s['p95_ms']:>10.2f}ms")
+
+    print(f"\n💾 Rapor: {args.output} ({time.time() - start_time:.1f} saniye)")
+
+    if regressions:
+        print(f"❌ Gerileme: {', '.join(regressions)} (eşik: %{args.threshold * 100:.0f})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import main_v3
+from main_evaluate import build_evaluation, evaluate_questions
+
+def sheet_for_evaluation(sheet: dict) -> dict:
+    """process_image çıktısını _processed.json'dan okunmuş haline getir
+
+    Bellekteki cevap sözlüğünün anahtarları int'tir; JSON'dan gelen veride
+    str olur ve değerlendirme soruları str(q_num) ile arar.
+    """
+    return {**sheet, "answers": {str(q_num): answer for q_num, answer in sheet.get("answers", {}).items()}}
+
+def grade_sheet(sheet: dict, compiled_key: dict) -> dict:
+    """İşlenmiş cevap kağıdını derlenmiş anahtarla değerlendir (/scenario3 ile aynı çıktı)"""
+    ocr_data = sheet_for_evaluation(sheet)
+    eval_results = evaluate_questions(ocr_data["answers"], compiled_key)
+    return build_evaluation(ocr_data, compiled_key, eval_results, verbose=False)
+
+def grade_image_bytes(image_bytes: bytes, image_name: str, compiled_key: dict,
+                      ocr=None, cache=None, ocr_pool=None):
+    """Görüntüden notlandırmaya tek adım: önişleme -> OCR -> ayrıştırma -> değerlendirme
+
+    Ara sonuçlar dosyaya yazılıp tekrar okunmaz, hepsi bellekte aktarılır.
+    ocr_pool verilirse motor sadece OCR aşamasında tutulur (LLM beklerken
+    başka kağıtlar OCR'a girebilir). Dönüş: (işlenmiş kağıt, değerlendirme),
+    kağıt okunamazsa (None, None).
+    """
+    if ocr_pool is not None:
+        with ocr_pool.acquire() as ocr:
+            sheet = main_v3.process_image_bytes(image_bytes, image_name, ocr, cache)
+    else:
+        sheet = main_v3.process_image_bytes(image_bytes, image_name, ocr, cache)
+
+    if sheet is None:
+        return None, None
+
+    return sheet, grade_sheet(sheet, compiled_key)
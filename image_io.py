@@ -0,0 +1,14 @@
+import cv2
+import numpy as np
+
+def read_image_bytes(image_path: str) -> bytes:
+    """Görüntü dosyasını ham bayt olarak oku (önbellek anahtarı + decode için tek okuma)"""
+    with open(image_path, "rb") as f:
+        return f.read()
+
+def decode_image(image_bytes: bytes):
+    """Bellekteki görüntü baytlarını BGR NumPy dizisine çöz, başarısızsa None"""
+    if not image_bytes:
+        return None
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
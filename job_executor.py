@@ -0,0 +1,104 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import record_stage
+
+class ServerBusy(Exception):
+    """Çalışan + bekleyen iş sayısı sınıra ulaştığında fırlatılır"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Sunucu meşgul, lütfen daha sonra tekrar deneyin")
+        self.retry_after = retry_after
+
+class JobExecutor:
+    """Ağır (bloklayan) işleri event loop dışında çalıştıran sınırlı havuz
+
+    En fazla max_workers iş aynı anda çalışır, max_queue kadar iş sırada
+    bekleyebilir. Sıra doluysa yeni iş ServerBusy ile hemen reddedilir.
+    Toplu isteklerin kağıtları reddedilmez, yer açılınca sıraya girer.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        # Tüm toplu isteklerin paylaştığı yuvalar: kaç toplu istek gelirse
+        # gelsin sırada en fazla max_workers toplu iş bulunur
+        self._batch_slots = asyncio.Semaphore(max_workers)
+        self._capacity = asyncio.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._running
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending - self._running
+
+    def _call(self, func, args, kwargs, submitted: float):
+        record_stage("jobs", "queue_wait", time.perf_counter() - submitted)
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def is_saturated(self) -> bool:
+        return self._pending >= self.max_workers + self.max_queue
+
+    async def run(self, func, *args, **kwargs):
+        """func'u havuzda çalıştır ve sonucunu bekle"""
+        with self._lock:
+            if self.is_saturated():
+                raise ServerBusy(self.retry_after)
+            self._pending += 1
+
+        return await self._submit(func, args, kwargs)
+
+    async def run_queued(self, func, *args, **kwargs):
+        """Toplu iş: sıra doluysa reddetmek yerine yer açılmasını bekle
+
+        Bekleyen iş sınırına run() ile aynı şekilde sayılır; ortak yuvalar
+        sayesinde tekli istekler toplu işler yüzünden 503 almaz.
+        """
+        async with self._batch_slots:
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: not self.is_saturated())
+                with self._lock:
+                    self._pending += 1
+
+            return await self._submit(func, args, kwargs)
+
+    async def _submit(self, func, args, kwargs):
+        try:
+            loop = asyncio.get_running_loop()
+            # contextvars kopyası: iş içindeki aşama süreleri isteğin kaydına eklenir
+            call = functools.partial(contextvars.copy_context().run, self._call, func, args, kwargs,
+                                     time.perf_counter())
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            async with self._capacity:
+                self._capacity.notify()
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
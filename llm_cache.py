@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_DAYS = float(os.environ.get("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "100000"))
+
+# Kaç yazmada bir kayıt sayısı sınırının kontrol edileceği
+EVICT_CHECK_INTERVAL = 100
+
+class LLMCache:
+    """LLM benzerlik yanıtları için kalıcı (SQLite) önbellek
+
+    Anahtar: model adı, prompt tipi (sayisal/sozel), normalize edilmiş doğru
+    cevap ve normalize edilmiş öğrenci cevabı. Süresi dolan kayıtlar (TTL)
+    okunmaz, kayıt sayısı sınırı aşılınca en eski erişilenler silinir.
+    """
+
+    def __init__(self, db_path: str = LLM_CACHE_PATH, ttl_days: float = LLM_CACHE_TTL_DAYS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                model TEXT NOT NULL,
+                prompt_type TEXT NOT NULL,
+                correct TEXT NOT NULL,
+                student TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (model, prompt_type, correct, student)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, model: str, prompt_type: str, correct: str, student: str):
+        """Önbellekteki ham LLM yanıtını döndür, yoksa ya da süresi dolduysa None"""
+        key = (model, prompt_type, correct, student)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache "
+                "WHERE model = ? AND prompt_type = ? AND correct = ? AND student = ?",
+                key
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute(
+                        "DELETE FROM llm_cache WHERE model = ? AND prompt_type = ? AND correct = ? AND student = ?",
+                        key
+                    )
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? "
+                "WHERE model = ? AND prompt_type = ? AND correct = ? AND student = ?",
+                (now, *key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, prompt_type: str, correct: str, student: str, response: str):
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, prompt_type, correct, student, response, now, now)
+            )
+            self._conn.commit()
+
+            self._writes += 1
+            if self._writes % EVICT_CHECK_INTERVAL == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        # Süresi dolanları ve sınırı aşan en eski erişilen kayıtları sil
+        cur = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.evictions += cur.rowcount
+
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                "DELETE FROM llm_cache WHERE rowid IN "
+                "(SELECT rowid FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            self.evictions += cur.rowcount
+
+        self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "entries": size,
+            "max_entries": self.max_entries,
+        }
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_default_llm_cache():
+    """Süreç genelinde paylaşılan önbellek; LLM_CACHE_DISABLED=1 ise None"""
+    global _default_cache
+    if os.environ.get("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+    return _default_cache
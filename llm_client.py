@@ -0,0 +1,121 @@
+import http.client
+import json
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "8"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))
+
+class LLMError(Exception):
+    """LLM sunucusu hata döndürdüğünde ya da ulaşılamadığında"""
+
+class OllamaClient:
+    """Yerel Ollama HTTP API'si için kalıcı bağlantı havuzlu istemci
+
+    Bağlantılar keep-alive ile yeniden kullanılır; havuzdaki her bağlantı
+    aynı anda tek bir istek tarafından kullanıldığı için istemci thread-safe'tir.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_HOST, pool_size: int = LLM_POOL_SIZE,
+                 timeout: float = LLM_TIMEOUT):
+        if "://" not in base_url:
+            base_url = "http://" + base_url
+        url = urlparse(base_url)
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 11434
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def _request(self, method: str, path: str, payload: dict = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        # Sunucu boşta kalan keep-alive bağlantıyı kapatmış olabilir: bir kez yeniden dene
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if attempt == 0:
+                    continue
+                raise LLMError(str(e)) from e
+            except OSError as e:
+                conn.close()
+                raise LLMError(str(e)) from e
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+
+            if response.status != 200:
+                raise LLMError(f"HTTP {response.status}: {data[:200]!r}")
+
+            return json.loads(data)
+
+    def generate(self, prompt: str, model: str, options: dict = None) -> str:
+        """Tek seferlik (stream'siz) üretim; modelin yanıt metnini döndürür"""
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            # Eski CLI çağrısındaki OLLAMA_NUM_GPU=0 ayarının karşılığı
+            "options": {"num_gpu": 0, **(options or {})},
+        }
+
+        with self._lock:
+            self.requests += 1
+        try:
+            return self._request("POST", "/api/generate", payload).get("response", "")
+        except (LLMError, ValueError):
+            with self._lock:
+                self.errors += 1
+            raise
+
+    def ping(self) -> bool:
+        """Sunucu ayakta mı (model listesi alınabiliyor mu)"""
+        try:
+            self._request("GET", "/api/tags")
+            return True
+        except (LLMError, ValueError):
+            return False
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def get_default_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = OllamaClient()
+    return _default_client
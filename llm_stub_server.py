@@ -0,0 +1,84 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Ollama /api/generate ve /api/tags uçlarını taklit eden handler"""
+
+    protocol_version = "HTTP/1.1"
+    # Başlık ve gövde ayrı yazılıyor: Nagle + gecikmeli ACK keep-alive isteklerini ~40 ms bekletir
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "stub"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        server = self.server
+        with server.lock:
+            server.requests.append(request)
+
+        response = server.responder(request.get("prompt", ""))
+        self._send_json(200, {"model": request.get("model"), "response": response, "done": True})
+
+    def log_message(self, format, *args):
+        pass
+
+def make_stub_server(responder, host: str = "127.0.0.1", port: int = 0):
+    server = ThreadingHTTPServer((host, port), StubLLMHandler)
+    server.daemon_threads = True
+    server.responder = responder
+    server.requests = []
+    server.lock = threading.Lock()
+    return server
+
+def start_stub_server(response="100", host: str = "127.0.0.1", port: int = 0):
+    """Arka planda stub LLM sunucusu başlat; (sunucu, base_url) döndürür
+
+    response sabit bir metin ya da prompt alıp metin döndüren bir fonksiyon
+    olabilir. Gelen istekler server.requests listesinde tutulur.
+    """
+    responder = response if callable(response) else (lambda prompt: response)
+    server = make_stub_server(responder, host, port)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Testler için sabit yanıt veren Ollama taklidi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--response", default="100", help="Her prompt için döndürülecek yanıt")
+    args = parser.parse_args()
+
+    server = make_stub_server(lambda prompt: args.response, args.host, args.port)
+
+    print(f"Stub LLM sunucusu: http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,137 +1,639 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
-import subprocess
-import shutil
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+import asyncio
+import threading
+import time
 import uuid
 import os
+import io
 import json
-
-app = FastAPI()
+import zipfile
+
+import main_v3
+import main_puan
+import main_evaluate
+from grading import grade_image_bytes
+from ocr_engine import OCREnginePool, profile_workers
+from ocr_cache import get_default_cache
+from job_executor import JobExecutor, ServerBusy
+from main_batch import IMAGE_EXTENSIONS
+from answer_keys import AnswerKeyRegistry, answer_key_id, describe
+from llm_cache import get_default_llm_cache
+from llm_client import get_default_client
+from result_store import WRITE_JSON_FILES, get_default_result_store, write_result_json
+import metrics
+from metrics import stage_timer
 
 UPLOAD_DIR = "api_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs("output", exist_ok=True)
+os.makedirs(main_puan.folder_path, exist_ok=True)
+
+# Sunucu açılışında yüklenen OCR motoru sayısı (verilmezse ayar profilindeki worker sayısı)
+OCR_POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE") or profile_workers(2))
+
+# Aynı anda çalışan ağır iş sayısı ve sırada bekleyebilecek iş sayısı
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", str(OCR_POOL_SIZE)))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "16"))
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", "5"))
+
+# Yükleme sınırları: tek dosya (zip içindeki her görüntü dahil) ve tek istek toplamı
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", "20"))
+MAX_REQUEST_MB = float(os.environ.get("MAX_REQUEST_MB", "200"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+MAX_REQUEST_BYTES = int(MAX_REQUEST_MB * 1024 * 1024)
+
+# Yüklenen görüntüler sadece bellekte işlenir; 1 ise api_uploads/ altına da arşivlenir
+UPLOAD_ARCHIVE = os.environ.get("UPLOAD_ARCHIVE", "0") == "1"
+if UPLOAD_ARCHIVE:
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Isınma sırasında LLM sunucusuna da ulaşılabiliyor mu kontrol et
+WARMUP_LLM_PING = os.environ.get("WARMUP_LLM_PING", "0") == "1"
+
+ocr_pool = None
+job_executor = None
+answer_key_registry = AnswerKeyRegistry()
+
+# /ready yanıtı; ısınma thread'i tarafından güncellenir
+readiness = {"ready": False, "phase": "starting", "error": None, "llm": "skipped", "startup_seconds": None}
+process_start = time.perf_counter()
 
 
-def run_script(command_list):
-    result = subprocess.run(
-        command_list,
-        capture_output=True,
-        text=True,
-        encoding="utf-8"
+def warm_up():
+    # Ağır işler (paddleocr import'u, model ağırlıkları, ilk çıkarım) arka planda;
+    # bu sürede /health yanıt verir, /ready 503 döner
+    global ocr_pool
+    try:
+        readiness["phase"] = "loading_models"
+        pool = OCREnginePool(OCR_POOL_SIZE)
+
+        readiness["phase"] = "warming_up"
+        pool.warm_up()
+        ocr_pool = pool
+
+        if WARMUP_LLM_PING:
+            readiness["phase"] = "pinging_llm"
+            readiness["llm"] = "ok" if get_default_client().ping() else "unreachable"
+
+        readiness["startup_seconds"] = round(time.perf_counter() - process_start, 2)
+        readiness["phase"] = "ready"
+        readiness["ready"] = True
+        print(f"Sunucu hazır ({readiness['startup_seconds']:.2f} saniye)")
+
+    except Exception as e:
+        readiness["phase"] = "failed"
+        readiness["error"] = str(e)
+        print(f"Hata: ısınma başarısız: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # OCR motorları bir kez yüklenip ısıtılır, istekler sadece çıkarım maliyeti öder
+    global job_executor
+    job_executor = JobExecutor(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS, RETRY_AFTER_SECONDS)
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+    job_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def cache_stat(get_cache, field):
+    # Önbellek kapalıysa (None) ölçüm /metrics çıktısına hiç yazılmaz
+    def read():
+        cache = get_cache()
+        return None if cache is None else cache.stats()[field]
+    return read
+
+
+metrics.REGISTRY.gauge("startup_duration_seconds", "Süreç başlangıcından hazır olmaya kadar geçen süre",
+                       fn=lambda: readiness["startup_seconds"])
+metrics.REGISTRY.gauge("server_ready", "Isınma tamamlandı mı (1/0)",
+                       fn=lambda: int(readiness["ready"]))
+metrics.REGISTRY.gauge("job_queue_depth", "Sırada bekleyen ağır işler",
+                       fn=lambda: job_executor.queue_depth if job_executor else None)
+metrics.REGISTRY.gauge("job_in_flight", "Çalışmakta olan ağır işler",
+                       fn=lambda: job_executor.in_flight if job_executor else None)
+metrics.REGISTRY.gauge("ocr_cache_hits_total", "OCR önbelleği isabetleri",
+                       fn=cache_stat(get_default_cache, "hits"), kind="counter")
+metrics.REGISTRY.gauge("ocr_cache_misses_total", "OCR önbelleği ıskaları",
+                       fn=cache_stat(get_default_cache, "misses"), kind="counter")
+metrics.REGISTRY.gauge("ocr_cache_hit_ratio", "OCR önbelleği isabet oranı",
+                       fn=cache_stat(get_default_cache, "hit_rate"))
+metrics.REGISTRY.gauge("llm_cache_hits_total", "LLM önbelleği isabetleri",
+                       fn=cache_stat(get_default_llm_cache, "hits"), kind="counter")
+metrics.REGISTRY.gauge("llm_cache_misses_total", "LLM önbelleği ıskaları",
+                       fn=cache_stat(get_default_llm_cache, "misses"), kind="counter")
+metrics.REGISTRY.gauge("llm_cache_hit_ratio", "LLM önbelleği isabet oranı",
+                       fn=cache_stat(get_default_llm_cache, "hit_rate"))
+metrics.REGISTRY.gauge("llm_http_requests_total", "Ollama'ya yapılan HTTP istekleri",
+                       fn=lambda: get_default_client().requests, kind="counter")
+metrics.REGISTRY.gauge("llm_http_errors_total", "Başarısız Ollama HTTP istekleri",
+                       fn=lambda: get_default_client().errors, kind="counter")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # İstek süresi histograma, aşama süreleriyle birlikte tek satır JSON kayda yazılır
+    # (akış yanıtlarında süre ilk bayta kadardır)
+    request_id = str(uuid.uuid4())
+
+    # Gövde okunmadan reddet (multipart ayrıştırma da diske/belleğe yazmasın)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        return too_large_response(f"İstek çok büyük (en fazla {MAX_REQUEST_MB:g} MB)")
+
+    timings, token = metrics.begin_request()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        metrics.end_request(token)
+
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        metrics.REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint, status=status)
+
+        if endpoint != "/metrics":
+            metrics.log_request({
+                "request_id": request_id,
+                "method": request.method,
+                "endpoint": endpoint,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "stages_ms": timings.as_dict(),
+            })
+
+
+def busy_response(e: ServerBusy):
+    return JSONResponse(
+        {"error": str(e)},
+        status_code=503,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+class UploadTooLarge(Exception):
+    """Yüklenen dosya MAX_UPLOAD_MB / MAX_REQUEST_MB sınırını aştığında"""
+
+
+def too_large_response(message: str):
+    return JSONResponse({"error": message}, status_code=413)
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    # Sınırın bir bayt fazlası okunur; aşılmışsa dosyanın kalanı hiç okunmaz
+    with stage_timer("api", "upload"):
+        data = await upload.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise UploadTooLarge(f"{upload.filename}: dosya çok büyük (en fazla {max_bytes / 1024 / 1024:g} MB)")
+    return data
+
+
+def not_ready_response():
+    # OCR gerektiren uç noktalar ısınma bitene kadar beklemeden reddedilir
+    if readiness["phase"] == "failed":
+        return JSONResponse({"error": f"OCR motoru yüklenemedi: {readiness['error']}"}, status_code=500)
+
+    return JSONResponse(
+        {"error": "Sunucu hazırlanıyor, lütfen daha sonra tekrar deneyin", "phase": readiness["phase"]},
+        status_code=503,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
     )
 
-    if result.returncode != 0:
-        raise Exception(result.stderr)
 
+# Aşağıdaki *_job fonksiyonları bloklayan işlerdir, job_executor içinde çalışır
+def upload_image_name(job_id: str, filename: str, data: bytes) -> str:
+    # Sonuçtaki görüntü adı; dosya sadece arşiv açıksa yazılır
+    extension = os.path.splitext(filename or "")[1].lower() or ".jpg"
+    image_name = job_id + extension
+
+    if UPLOAD_ARCHIVE:
+        image_name = os.path.join(UPLOAD_DIR, image_name)
+        with stage_timer("api", "archive"), open(image_name, "wb") as f:
+            f.write(data)
+
+    return image_name
+
+
+def process_sheet_job(pipeline, job_id: str, filename: str, data: bytes, exam_id: str = None):
+    # Görüntü baytları diske yazılmadan doğrudan çözülür
+    image_name = upload_image_name(job_id, filename, data)
+
+    with ocr_pool.acquire() as ocr:
+        result = pipeline.process_image_bytes(data, image_name, ocr, get_default_cache())
+
+    store_result(pipeline.RESULT_KIND, result, job_id, exam_id)
     return result
 
 
-# Senaryo 1
-@app.post("/scenario1")
-async def scenario1(file: UploadFile = File(...)):
-    try:
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(UPLOAD_DIR, file_id + ".jpg")
+def store_result(kind: str, data: dict, job_id: str, exam_id: str = None, name: str = None):
+    store = get_default_result_store()
+    if store is None or data is None:
+        return
+    with stage_timer("api", "store"):
+        store.put(kind, data, job_id, exam_id, name)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
 
-        run_script(["python", "main_puan.py", file_path])
+def job_response(data: dict, job_id: str):
+    # Sonuç gövdesi değişmez; iş kimliği başlıkta döner (GET /results/{job_id})
+    return JSONResponse(data, headers={"X-Job-ID": job_id})
 
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        result_path = f"output(puan)/{base_name}_scores.json"
 
-        if not os.path.exists(result_path):
+async def upload_response(pipeline, file: UploadFile, exam_id: str = None):
+    if not readiness["ready"]:
+        return not_ready_response()
+
+    try:
+        data = await read_upload(file)
+        job_id = str(uuid.uuid4())
+        result = await job_executor.run(process_sheet_job, pipeline, job_id, file.filename, data, exam_id)
+
+        if result is None:
             return JSONResponse({"error": "Sonuç oluşturulamadı"}, status_code=500)
 
-        with open(result_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        return job_response(result, job_id)
+
+    except UploadTooLarge as e:
+        return too_large_response(str(e))
 
-        return data
+    except ServerBusy as e:
+        return busy_response(e)
 
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+# Senaryo 1
+@app.post("/scenario1")
+async def scenario1(file: UploadFile = File(...), exam_id: str = Form(None)):
+    return await upload_response(main_puan, file, exam_id)
+
+
 # Senaryo 2
 @app.post("/scenario2")
-async def scenario2(file: UploadFile = File(...)):
+async def scenario2(file: UploadFile = File(...), exam_id: str = Form(None)):
+    return await upload_response(main_v3, file, exam_id)
+
+
+def extract_zip_sheets(data: bytes, budget: int):
+    # Zip içindeki görüntüleri isim sırasıyla (dosya_adı, bayt) olarak döndür
+    # Boyutlar açmadan önce başlıktan kontrol edilir (zip bombası açılmaz)
+    sheets = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.filename):
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if info.file_size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"{info.filename}: dosya çok büyük (en fazla {MAX_UPLOAD_MB:g} MB)")
+            budget -= info.file_size
+            if budget < 0:
+                raise UploadTooLarge(f"Zip içeriği çok büyük (en fazla {MAX_REQUEST_MB:g} MB)")
+            sheets.append((info.filename, archive.read(info)))
+    return sheets
+
+
+async def collect_sheets(files: List[UploadFile]):
+    # Çoklu yükleme ya da zip arşivi -> [(dosya_adı, bayt), ...]
+    # Tek dosya MAX_UPLOAD_MB, zip ve isteğin toplamı MAX_REQUEST_MB ile sınırlı
+    sheets = []
+    budget = MAX_REQUEST_BYTES
+    for upload in files:
+        filename = upload.filename or "sheet.jpg"
+        is_zip = filename.lower().endswith(".zip")
+        data = await read_upload(upload, budget if is_zip else min(budget, MAX_UPLOAD_BYTES))
+
+        if zipfile.is_zipfile(io.BytesIO(data)):
+            unpacked = await asyncio.to_thread(extract_zip_sheets, data, budget)
+            budget -= sum(len(sheet) for _, sheet in unpacked)
+            sheets.extend(unpacked)
+        else:
+            if len(data) > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"{filename}: dosya çok büyük (en fazla {MAX_UPLOAD_MB:g} MB)")
+            budget -= len(data)
+            sheets.append((filename, data))
+    return sheets
+
+
+async def stream_sheet_results(pipeline, sheets, exam_id: str = None):
+    # Her kağıdın sonucu biter bitmez tek satır JSON olarak gönderilir
+    # Eşzamanlılık tüm toplu isteklerin paylaştığı job_executor yuvalarıyla sınırlı
+    async def run_one(index, filename, data):
+        job_id = str(uuid.uuid4())
+        try:
+            result = await job_executor.run_queued(process_sheet_job, pipeline, job_id, filename, data, exam_id)
+        except Exception as e:
+            return {"index": index, "filename": filename, "status": "error", "error": str(e)}
+
+        if result is None:
+            return {"index": index, "filename": filename, "status": "error", "error": "Sonuç oluşturulamadı"}
+
+        return {"index": index, "filename": filename, "status": "ok", "job_id": job_id, "result": result}
+
+    tasks = [asyncio.create_task(run_one(i, name, data)) for i, (name, data) in enumerate(sheets)]
     try:
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(UPLOAD_DIR, file_id + ".jpg")
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    finally:
+        # İstemci bağlantıyı kapatırsa bekleyen kağıtları iptal et
+        for task in tasks:
+            task.cancel()
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
 
-        run_script(["python", "main_v3.py", file_path])
+async def batch_response(pipeline, files: List[UploadFile], exam_id: str = None):
+    if not readiness["ready"]:
+        return not_ready_response()
 
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        result_path = f"output(duzenlenmis)/{base_name}_processed.json"
+    if job_executor.is_saturated():
+        return busy_response(ServerBusy(job_executor.retry_after))
 
-        if not os.path.exists(result_path):
-            return JSONResponse({"error": "Sonuç oluşturulamadı"}, status_code=500)
+    try:
+        sheets = await collect_sheets(files)
+    except UploadTooLarge as e:
+        return too_large_response(str(e))
+    except zipfile.BadZipFile as e:
+        return JSONResponse({"error": f"Zip okunamadı: {e}"}, status_code=400)
+
+    if not sheets:
+        return JSONResponse({"error": "Görüntü bulunamadı"}, status_code=400)
+
+    return StreamingResponse(
+        stream_sheet_results(pipeline, sheets, exam_id),
+        media_type="application/x-ndjson"
+    )
 
-        with open(result_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
 
-        return data
+# Toplu senaryo 1 (zip ya da çoklu görüntü, NDJSON akışı)
+@app.post("/scenario1/batch")
+async def scenario1_batch(files: List[UploadFile] = File(...), exam_id: str = Form(None)):
+    return await batch_response(main_puan, files, exam_id)
 
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+
+# Toplu senaryo 2 (zip ya da çoklu görüntü, NDJSON akışı)
+@app.post("/scenario2/batch")
+async def scenario2_batch(files: List[UploadFile] = File(...), exam_id: str = Form(None)):
+    return await batch_response(main_v3, files, exam_id)
+
+
+def scenario3_job(job_id: str, ocr_data: dict, compiled_key: dict, exam_id: str = None):
+    student_answers = ocr_data.get("answers", {})
+    eval_results = main_evaluate.evaluate_questions(student_answers, compiled_key)
+    data = main_evaluate.build_evaluation(ocr_data, compiled_key, eval_results, verbose=False)
+
+    # Dosya adı eski düzenle aynı: output_llm/{job_id}_ocr_evaluation.json
+    store_result("evaluation", data, job_id, exam_id, name=f"{job_id}_ocr")
+
+    if WRITE_JSON_FILES:
+        os.makedirs("output_llm", exist_ok=True)
+        with stage_timer("api", "write"):
+            write_result_json("evaluation", data, f"{job_id}_ocr")
+
+    return data
+
+
+async def read_json_upload(upload: UploadFile):
+    # Yüklenen JSON dosyaları (OCR çıktısı, cevap anahtarı) nesne olmalı
+    data = await read_upload(upload)
+    try:
+        parsed = json.loads(data)
+    except ValueError as e:
+        raise ValueError(f"{upload.filename}: geçersiz JSON ({e})")
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{upload.filename}: JSON nesnesi bekleniyordu")
+    return parsed
 
 
-# Senaryo 3
+def validate_ocr_data(ocr_data: dict, filename: str):
+    # _processed.json düzeni: {"answers": {soru: metin ya da null}, ...}
+    answers = ocr_data.get("answers")
+    if not isinstance(answers, dict):
+        raise ValueError(f"{filename}: 'answers' alanı nesne olmalı")
+    for q_num, answer in answers.items():
+        if answer is not None and not isinstance(answer, str):
+            raise ValueError(f"{filename}: soru {q_num} cevabı metin olmalı")
+    return ocr_data
+
+
+class AnswerKeyNotFound(LookupError):
+    """İstenen key_id kayıtlı değil"""
+
+
+async def resolve_answer_key(correct_file: UploadFile, key_id: str):
+    # Kayıtlı anahtar (key_id) ya da yüklenen dosya -> (derlenmiş anahtar, anahtar kimliği)
+    if key_id:
+        entry = answer_key_registry.get(key_id)
+        if entry is None:
+            raise AnswerKeyNotFound(f"Cevap anahtarı bulunamadı: {key_id}")
+        return entry["compiled"], key_id
+
+    if correct_file is not None:
+        correct_answers = await read_json_upload(correct_file)
+        return main_evaluate.compile_answer_key(correct_answers), answer_key_id(correct_answers)
+
+    raise ValueError("correct_file ya da key_id gerekli")
+
+
+# Senaryo 3 (cevap anahtarı dosya olarak ya da kayıtlı key_id ile)
 @app.post("/scenario3")
 async def scenario3(
     ocr_file: UploadFile = File(...),
-    correct_file: UploadFile = File(...)
+    correct_file: UploadFile = File(None),
+    key_id: str = Form(None),
+    exam_id: str = Form(None)
 ):
     try:
-        file_id = str(uuid.uuid4())
+        ocr_data = validate_ocr_data(await read_json_upload(ocr_file), ocr_file.filename)
+        compiled_key, key_id = await resolve_answer_key(correct_file, key_id)
 
-        ocr_path = os.path.join(UPLOAD_DIR, f"{file_id}_ocr.json")
-        correct_path = os.path.join(UPLOAD_DIR, f"{file_id}_correct.json")
+    except AnswerKeyNotFound as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
 
-        with open(ocr_path, "wb") as f:
-            shutil.copyfileobj(ocr_file.file, f)
+    except UploadTooLarge as e:
+        return too_large_response(str(e))
 
-        with open(correct_path, "wb") as f:
-            shutil.copyfileobj(correct_file.file, f)
+    except (ValueError, AttributeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
-        run_script([
-            "python",
-            "main_evaluate.py",
-            ocr_path,
-            correct_path
-        ])
+    try:
+        # Sınav kimliği verilmezse cevap anahtarı kimliği kullanılır
+        job_id = str(uuid.uuid4())
+        data = await job_executor.run(scenario3_job, job_id, ocr_data, compiled_key, exam_id or key_id)
+
+        if data is None:
+            return JSONResponse({"error": "LLM sonucu oluşmadı"}, status_code=500)
+
+        return job_response(data, job_id)
 
+    except ServerBusy as e:
+        return busy_response(e)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+def grade_job(job_id: str, filename: str, data: bytes, compiled_key: dict, exam_id: str = None):
+    # Görüntü -> değerlendirme tek işte, ara JSON'lar bellekte aktarılır
+    # OCR motoru sadece OCR aşamasında tutulur, LLM beklerken boşa çıkar
+    image_name = upload_image_name(job_id, filename, data)
+    sheet, evaluation = grade_image_bytes(data, image_name, compiled_key,
+                                          cache=get_default_cache(), ocr_pool=ocr_pool)
+    if evaluation is None:
+        return None
+
+    # Kağıt ve değerlendirme ayrı kayıtlar; kağıt sınıf değerlendirmesinde (main_cohort) de kullanılabilir
+    store_result(main_v3.RESULT_KIND, sheet, f"{job_id}-sheet", exam_id, name=job_id)
+    store_result("evaluation", evaluation, job_id, exam_id, name=job_id)
+
+    if WRITE_JSON_FILES:
         os.makedirs("output_llm", exist_ok=True)
+        with stage_timer("api", "write"):
+            write_result_json("evaluation", evaluation, job_id)
 
-        result_file = None
-        for filename in os.listdir("output_llm"):
-            if file_id in filename:
-                result_file = os.path.join("output_llm", filename)
-                break
+    return evaluation
 
-        if not result_file or not os.path.exists(result_file):
-            return JSONResponse({"error": "LLM sonucu oluşmadı"}, status_code=500)
 
-        with open(result_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+# Görüntüden notlandırma (tek istek: senaryo 2 + senaryo 3)
+@app.post("/grade")
+async def grade(
+    file: UploadFile = File(...),
+    correct_file: UploadFile = File(None),
+    key_id: str = Form(None),
+    exam_id: str = Form(None)
+):
+    if not readiness["ready"]:
+        return not_ready_response()
+
+    try:
+        data = await read_upload(file)
+        compiled_key, key_id = await resolve_answer_key(correct_file, key_id)
+
+    except AnswerKeyNotFound as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+
+    except UploadTooLarge as e:
+        return too_large_response(str(e))
+
+    except (ValueError, AttributeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
-        return data
+    try:
+        job_id = str(uuid.uuid4())
+        evaluation = await job_executor.run(grade_job, job_id, file.filename, data, compiled_key, exam_id or key_id)
+
+        if evaluation is None:
+            return JSONResponse({"error": "Sonuç oluşturulamadı"}, status_code=500)
+
+        return job_response(evaluation, job_id)
+
+    except ServerBusy as e:
+        return busy_response(e)
 
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+# Cevap anahtarı kaydı: bir kez yükle, değerlendirmelerde key_id kullan
+@app.post("/answer-keys")
+async def register_answer_key(file: UploadFile = File(...), name: str = Form(None)):
+    try:
+        entry = answer_key_registry.register(await read_json_upload(file), name)
+    except UploadTooLarge as e:
+        return too_large_response(str(e))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    return describe(entry)
+
+
+@app.get("/answer-keys")
+def list_answer_keys():
+    return answer_key_registry.list()
+
+
+@app.get("/answer-keys/{key_id}")
+def get_answer_key(key_id: str):
+    entry = answer_key_registry.get(key_id)
+    if entry is None:
+        return JSONResponse({"error": f"Cevap anahtarı bulunamadı: {key_id}"}, status_code=404)
+
+    return {**describe(entry), "answers": entry["answers"]}
+
+
+@app.delete("/answer-keys/{key_id}")
+def delete_answer_key(key_id: str):
+    if not answer_key_registry.delete(key_id):
+        return JSONResponse({"error": f"Cevap anahtarı bulunamadı: {key_id}"}, status_code=404)
+
+    return {"deleted": key_id}
+
+
+# Sonuç deposu: iş kimliğiyle tek sonuç ya da sınav / öğrenci / türe göre liste
+@app.get("/results/{job_id}")
+def get_result(job_id: str):
+    store = get_default_result_store()
+    record = store.get(job_id) if store is not None else None
+    if record is None:
+        return JSONResponse({"error": f"Sonuç bulunamadı: {job_id}"}, status_code=404)
+
+    return record
+
+
+@app.get("/results")
+def list_results(kind: str = None, exam_id: str = None, student_id: str = None,
+                 limit: int = 100, offset: int = 0):
+    store = get_default_result_store()
+    if store is None:
+        return JSONResponse({"error": "Sonuç deposu kapalı"}, status_code=404)
+
+    return store.query(kind, exam_id, student_id, limit=min(max(limit, 1), 1000), offset=max(offset, 0))
+
+
 # Kontrol
+# Canlılık: süreç ayakta mı (ısınma sırasında da ok)
 @app.get("/health")
 def health():
 
     return {"status": "ok"}
 
 
+# Hazır olma: OCR motorları yüklenip ısıtıldı mı
+@app.get("/ready")
+def ready():
+    if not readiness["ready"]:
+        return JSONResponse({"status": "not_ready", **readiness}, status_code=503)
+
+    return {"status": "ready", **readiness}
+
+
+# OCR önbellek istatistikleri
+@app.get("/cache/stats")
+def cache_stats():
+    cache = get_default_cache()
+    if cache is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **cache.stats()}
+
+
+# Prometheus metin biçiminde ölçümler (aşama/uç nokta histogramları, sıra, önbellekler, LLM)
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,6 +1,5 @@
-import os
+from main_batch import run_batch
+from ocr_cache import get_default_cache
+from result_store import get_default_result_store
 
-a = os.listdir("puan")
-
-for i in a:
-    os.system(f'python main_puan.py "puan/{i}"')
\ No newline at end of file
+run_batch("puan", mode="puan", cache=get_default_cache(), store=get_default_result_store())
\ No newline at end of file
@@ -0,0 +1,151 @@
+import argparse
+import glob
+import os
+import time
+
+import main_v3
+import main_puan
+from ocr_engine import create_ocr_engine, extract_payload
+from ocr_cache import get_default_cache, write_ocr_json
+from image_io import read_image_bytes, decode_image
+from result_store import get_default_result_store
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+def collect_images(source: str):
+    """Klasör ya da glob deseninden işlenecek görüntüleri sıralı olarak topla"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTENSIONS))
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# mod -> (akış modülü, çıktı klasörü)
+PIPELINES = {
+    "v3": (main_v3, "output"),
+    "puan": (main_puan, main_puan.folder_path),
+}
+
+def run_batch(source: str, mode: str = "v3", batch_size: int = 8, ocr=None, cache=None,
+              debug: bool = False, store=None, exam_id: str = None):
+    """Modeli bir kez yükleyip klasördeki tüm görüntüleri toplu olarak işle
+
+    store verilirse her batch'in sonuçları tek işlemde sonuç deposuna yazılır.
+    """
+    pipeline, output_dir = PIPELINES[mode]
+    os.makedirs(output_dir, exist_ok=True)
+
+    image_paths = collect_images(source)
+    if not image_paths:
+        print(f"Uyarı: {source} içinde görüntü bulunamadı!")
+        return []
+
+    print(f"{len(image_paths)} görüntü bulundu ({mode} modu, batch={batch_size})")
+
+    start_time = time.time()
+
+    if ocr is None:
+        ocr = create_ocr_engine()
+
+    load_time = time.time() - start_time
+    print(f"OCR modeli yüklendi: {load_time:.2f} saniye")
+
+    results = []
+    processed = 0
+
+    for batch in chunked(image_paths, batch_size):
+        batch_start = time.time()
+
+        # Önbellekte olanlar OCR'a gönderilmez
+        payloads = {}
+        cache_keys = {}
+        pending = []
+        for image_path in batch:
+            image_bytes = read_image_bytes(image_path)
+            if cache is not None:
+                cache_keys[image_path] = cache.make_key(image_bytes, pipeline.PREPROCESS_VARIANT)
+                payload = cache.get(cache_keys[image_path])
+                if payload is not None:
+                    payloads[image_path] = payload
+                    continue
+
+            img = decode_image(image_bytes)
+            if img is None:
+                print(f"Hata: {image_path} okunamadı!")
+                continue
+            pending.append((image_path, *pipeline.prepare_ocr_input(img)))
+
+        if pending:
+            # Tek predict çağrısıyla tüm batch'i bellekte çalıştır
+            ocr_results = ocr.predict([ocr_input for _, ocr_input, _ in pending])
+
+            for (image_path, _, transform), res in zip(pending, ocr_results):
+                payloads[image_path] = extract_payload([res], transform)
+                if cache is not None:
+                    cache.put(cache_keys[image_path], payloads[image_path])
+
+        ocr_time = time.time() - batch_start
+        batch_records = []
+
+        for image_path in batch:
+            image_start = time.time()
+            payload = payloads.get(image_path)
+
+            if payload is not None:
+                if debug:
+                    write_ocr_json(payload, pipeline.ocr_json_path(image_path))
+                result = pipeline.process_ocr_data(payload, image_path)
+            else:
+                result = None
+
+            results.append((image_path, result))
+            processed += 1
+            if result is not None:
+                batch_records.append({"kind": pipeline.RESULT_KIND, "data": result, "exam_id": exam_id})
+
+            # Batch OCR süresi görüntülere eşit paylaştırılır
+            image_time = ocr_time / len(batch) + (time.time() - image_start)
+            print(f"[{processed}/{len(image_paths)}] {image_path}: {image_time:.2f} saniye")
+
+        if store is not None and batch_records:
+            store.put_many(batch_records)
+
+    total_time = time.time() - start_time
+    work_time = total_time - load_time
+
+    print("\n" + "=" * 50)
+    print(f"İşlenen görüntü: {processed}/{len(image_paths)}")
+    print(f"Başarısız: {sum(1 for _, r in results if r is None)}")
+    print(f"Toplam süre: {total_time:.2f} saniye (model yükleme: {load_time:.2f} saniye)")
+    if processed and work_time > 0:
+        print(f"Ortalama: {work_time / processed:.2f} saniye/görüntü")
+        print(f"Verim: {processed / work_time:.2f} görüntü/saniye")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"OCR önbelleği: {stats['hits']} isabet, {stats['misses']} ıska (oran: {stats['hit_rate']:.0%})")
+    print("=" * 50)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Klasördeki sınav kağıtlarını tek model yüklemesiyle işle")
+    parser.add_argument("source", help="Görüntü klasörü ya da glob deseni (örn. \"puan/*.jpg\")")
+    parser.add_argument("--mode", choices=sorted(PIPELINES), default="v3",
+                        help="v3: cevap kağıdı, puan: puan kağıdı")
+    parser.add_argument("--batch-size", type=int, default=8, help="predict çağrısı başına görüntü sayısı")
+    parser.add_argument("--no-cache", action="store_true", help="OCR önbelleğini kullanma")
+    parser.add_argument("--debug", action="store_true", help="OCR JSON çıktılarını da diske yaz")
+    parser.add_argument("--exam-id", help="Sonuç deposunda kayıtların sınav kimliği")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else get_default_cache()
+    run_batch(args.source, args.mode, max(1, args.batch_size), cache=cache, debug=args.debug,
+              store=get_default_result_store(), exam_id=args.exam_id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_keys import answer_key_id
+from main_evaluate import (
+    EVAL_PARALLELISM,
+    build_evaluation,
+    compile_answer_key,
+    evaluate_answer,
+    load_json,
+    normalize_text,
+    parse_number,
+)
+from result_store import WRITE_JSON_FILES, get_default_result_store
+
+OUTPUT_DIR = "output_llm"
+SUMMARY_FILE = "sinif_ozeti.json"
+
+def answer_group_key(q_num, student_answer: str, numerical: bool):
+    """Aynı değerlendirmeyi alacak cevaplar için grup anahtarı
+
+    evaluate_answer öğrenci cevabını yalnızca normalize edilmiş haliyle
+    kullanır; sayısal sorularda ham cevabın sayıya çevrilebilmesi de sonucu
+    etkilediği için anahtara eklenir.
+    """
+    normalized = normalize_text(student_answer)
+    if numerical:
+        return (str(q_num), normalized, parse_number(student_answer))
+    return (str(q_num), normalized)
+
+def load_students(source_dir: str, pattern: str):
+    students = []
+    for path in sorted(glob.glob(os.path.join(source_dir, pattern))):
+        if not os.path.isfile(path):
+            continue
+        try:
+            students.append((path, load_json(path)))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Atlandı: {path} ({e})")
+    return students
+
+def load_students_from_store(store, exam_id: str):
+    # Depodaki cevap kağıtları; ad, dosya düzenindeki _processed.json adıyla aynı
+    return [(f"{record['name']}_processed.json", record["data"])
+            for record in store.query("processed", exam_id=exam_id)]
+
+def run_cohort(source_dir: str, correct_file: str, pattern: str = "*_processed.json",
+               parallelism: int = EVAL_PARALLELISM, output_dir: str = OUTPUT_DIR,
+               store=None, exam_id: str = None, from_store: bool = False):
+    """Tüm sınıfı tek seferde değerlendir; aynı (soru, cevap) çifti bir kez değerlendirilir
+
+    from_store=True ise kağıtlar klasör yerine sonuç deposundan (exam_id) okunur;
+    store verilirse değerlendirmeler depoya tek işlemde yazılır.
+    """
+    start_time = time.time()
+
+    # Cevap anahtarı bir kez yüklenip derlenir; sınav kimliği verilmezse anahtarın kimliği
+    raw_key = load_json(correct_file)
+    correct_answers = compile_answer_key(raw_key)
+    numerical = {q_num: compiled.is_numerical for q_num, compiled in correct_answers.items()}
+    eval_exam_id = exam_id or answer_key_id(raw_key)
+
+    if from_store:
+        students = load_students_from_store(store, exam_id)
+    else:
+        students = load_students(source_dir, pattern)
+    if not students:
+        print(f"Uyarı: {exam_id if from_store else source_dir} için öğrenci kaydı bulunamadı!")
+        return None
+
+    # 1. Soru bazında benzersiz cevapları topla
+    unique = {}
+    total_pairs = 0
+    for _, ocr_data in students:
+        answers = ocr_data.get("answers", {})
+        for q_num in correct_answers:
+            student_ans = answers.get(str(q_num), "")
+            key = answer_group_key(q_num, student_ans, numerical[q_num])
+            unique.setdefault(key, (q_num, student_ans))
+            total_pairs += 1
+
+    print(f"\n👥 {len(students)} öğrenci, {total_pairs} cevap, {len(unique)} benzersiz (soru, cevap) çifti")
+
+    # 2. Her benzersiz çifti bir kez değerlendir (string + LLM)
+    verdicts = {}
+    with ThreadPoolExecutor(max(1, parallelism)) as llm_executor, \
+            ThreadPoolExecutor(max(1, parallelism)) as pair_executor:
+        futures = {
+            key: pair_executor.submit(evaluate_answer, student_ans, correct_answers[q_num], llm_executor)
+            for key, (q_num, student_ans) in unique.items()
+        }
+        for key, future in futures.items():
+            verdicts[key] = future.result()
+
+    eval_time = time.time() - start_time
+
+    # 3. Kararları öğrencilere dağıt ve kaydet
+    os.makedirs(output_dir, exist_ok=True)
+    class_results = []
+    store_records = []
+    question_stats = {str(q): {"dogru": 0, "yanlis": 0, "bos": 0} for q in correct_answers}
+
+    for path, ocr_data in students:
+        answers = ocr_data.get("answers", {})
+        eval_results = [
+            verdicts[answer_group_key(q_num, answers.get(str(q_num), ""), numerical[q_num])]
+            for q_num in correct_answers
+        ]
+        final_result = build_evaluation(ocr_data, correct_answers, eval_results, verbose=False)
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        store_records.append({"kind": "evaluation", "data": final_result, "exam_id": eval_exam_id, "name": name})
+        if WRITE_JSON_FILES:
+            output_file = f"{output_dir}/{name}_evaluation.json"
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(final_result, f, indent=2, ensure_ascii=False)
+
+        for q_num, result in final_result["sorular"].items():
+            if not result["ogrenci_cevabi"]:
+                question_stats[str(q_num)]["bos"] += 1
+            elif result["puan_katsayi"] == 1.0:
+                question_stats[str(q_num)]["dogru"] += 1
+            else:
+                question_stats[str(q_num)]["yanlis"] += 1
+
+        ozet = final_result["ozet"]
+        class_results.append({
+            "dosya": os.path.basename(path),
+            "ogrenci_no": final_result["ogrenci_no"],
+            "ogrenci_adi": final_result["ogrenci_adi"],
+            "toplam_puan": ozet["toplam_puan"],
+            "dogru": ozet["dogru"],
+            "yanlis": ozet["yanlis"],
+            "bos": ozet["bos"],
+        })
+
+        print(f"✓ {final_result['ogrenci_adi'] or os.path.basename(path)}: {ozet['toplam_puan']:.1f}/100")
+
+    if store is not None:
+        store.put_many(store_records)
+
+    scores = [r["toplam_puan"] for r in class_results]
+    for q_num, stats in question_stats.items():
+        stats["benzersiz_cevap"] = sum(1 for key in unique if key[0] == q_num)
+        stats["dogru_orani"] = round(stats["dogru"] / len(students), 3)
+
+    summary = {
+        "cevap_anahtari": correct_file,
+        "sinav": eval_exam_id,
+        "ogrenci_sayisi": len(students),
+        "ortalama_puan": round(sum(scores) / len(scores), 2),
+        "en_yuksek_puan": max(scores),
+        "en_dusuk_puan": min(scores),
+        "ogrenciler": class_results,
+        "sorular": question_stats,
+        "degerlendirme": {
+            "toplam_cevap": total_pairs,
+            "benzersiz_cift": len(unique),
+            "sure_saniye": round(eval_time, 2),
+        },
+    }
+
+    summary_path = os.path.join(output_dir, SUMMARY_FILE)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'='*60}")
+    print(f"📊 Sınıf ortalaması: {summary['ortalama_puan']:.1f}/100 ({len(students)} öğrenci)")
+    print(f"   {total_pairs} cevap için {len(unique)} değerlendirme yapıldı ({eval_time:.2f} saniye)")
+    print(f"💾 Sınıf özeti: {summary_path}")
+    print(f"{'='*60}\n")
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Bir sınıfın tüm cevap kağıtlarını tek anahtarla değerlendir")
+    parser.add_argument("source_dir", nargs="?", help="_processed.json dosyalarının bulunduğu klasör")
+    parser.add_argument("correct_file", help="Doğru cevaplar JSON dosyası")
+    parser.add_argument("--pattern", default="*_processed.json", help="Öğrenci dosyası deseni")
+    parser.add_argument("--parallel", type=int, default=EVAL_PARALLELISM, help="Eşzamanlı değerlendirme sayısı")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Çıktı klasörü")
+    parser.add_argument("--exam-id", help="Sınav kimliği (verilmezse cevap anahtarının kimliği)")
+    parser.add_argument("--from-store", action="store_true",
+                        help="Kağıtları klasör yerine sonuç deposundan oku (--exam-id ile)")
+    args = parser.parse_args()
+
+    store = get_default_result_store()
+    if args.from_store and (store is None or not args.exam_id):
+        parser.error("--from-store için sonuç deposu ve --exam-id gerekli")
+    if not args.from_store and not args.source_dir:
+        parser.error("source_dir ya da --from-store gerekli")
+
+    run_cohort(args.source_dir, args.correct_file, args.pattern, args.parallel, args.output,
+               store=store, exam_id=args.exam_id, from_store=args.from_store)
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,20 @@
+import contextvars
 import json
 import sys
 import os
-import subprocess
-from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from text_normalize import normalize_ocr_text, normalize_text
+from similarity import string_similarity, normalized_similarity
+from llm_cache import get_default_llm_cache
+from llm_client import get_default_client
+from metrics import LLM_CALLS, LLM_ERRORS, stage_timer
 
-def normalize_ocr_text(text: str):
-    """OCR hatalarını düzelt: Türkçede olmayan karakterleri benzer Türkçe karakterlere çevir"""
-    if not text:
-        return ""
-    
-    # Karakter dönüşümleri
-    char_map = {
-        'ä': 'ö', 'à': 'a', 'á': 'a', 'â': 'ö', 'ã': 'ö', 'å': 'a', 'ā': 'ö', 'ă': 'ö', 'ą': 'a',
-        'ë': 'e', 'è': 'e', 'é': 'e', 'ê': 'e', 'ē': 'e', 'ĕ': 'e', 'ę': 'ç', 'ė': 'e',
-        'ï': 'i', 'ì': 'i', 'í': 'i', 'î': 'i', 'ĩ': 'i', 'ī': 'i', 'ĭ': 'i', 'į': 'i',
-        'ò': 'ö', 'ó': 'ö', 'ô': 'ö', 'õ': 'ö', 'ø': 'o', 'ō': 'ö', 'ŏ': 'ö', 'ő': 'ö',
-        'ù': 'ü', 'ú': 'ü', 'û': 'ü', 'ũ': 'ü', 'ū': 'ü', 'ŭ': 'ü', 'ů': 'ü', 'ű': 'ü',
-        'ÿ': 'y', 'ý': 'y', 'ŷ': 'g',
-        'ć': 'c', 'ĉ': 'c', 'ċ': 'c', 'č': 'c',
-        'ġ': 'ğ', 'ģ': 'ğ',
-        'ś': 's', 'ŝ': 's','š': 's',
-        'ž': 'z', 'ź': 'z', 'ż': 'z',
-        'ñ': 'n', 'ń': 'n', 'ņ': 'n', 'ň': 'n', 'ŉ': 'n',
-    }
-    
-    # Karakterleri dönüştür
-    normalized = []
-    for c in text:
-        if c in char_map:
-            normalized.append(char_map[c])
-        else:
-            normalized.append(c)
-    
-    return ''.join(normalized)
+LLM_MODEL = "gemma3:270m"
 
-def normalize_text(text: str):
-    """Metni normalize et: küçük harf + boşlukları temizle + OCR karakter düzeltmeleri"""
-    if not text:
-        return ""
-    
-    # Önce OCR karakterlerini düzelt
-    text = normalize_ocr_text(text)
-    
-    # Sonra normal normalize işlemleri
-    text = text.lower()
-    text = text.strip()
-    text = ' '.join(text.split())  # Birden fazla boşluğu teke indir
-    
-    return text
-
-def string_similarity(s1: str, s2: str):
-    """İki string arasındaki benzerlik (0-100)"""
-    s1_norm = normalize_text(s1)
-    s2_norm = normalize_text(s2)
-    
-    if not s1_norm or not s2_norm:
-        return 0
-    
-    # Tam eşleşme
-    if s1_norm == s2_norm:
-        return 100
-    
-    # Kelime kelime karşılaştır
-    words1 = s1_norm.split()
-    words2 = s2_norm.split()
-    
-    # Kısa cevaplar için karakter benzerliği
-    char_similarity = SequenceMatcher(None, s1_norm, s2_norm).ratio() * 100
-    
-    # Kelime eşleşme oranı
-    if words1 and words2:
-        matching_words = sum(1 for w in words1 if any(
-            SequenceMatcher(None, w, w2).ratio() > 0.75 for w2 in words2
-        ))
-        word_similarity = (matching_words / max(len(words1), len(words2))) * 100
-        
-        # İkisinin ortalamasını al
-        return (char_similarity + word_similarity) / 2
-    
-    return char_similarity
+# Aynı anda değerlendirilen soru / yapılan LLM çağrısı sayısı
+EVAL_PARALLELISM = int(os.environ.get("EVAL_PARALLELISM", "4"))
 
 def is_numerical_answer(answer: str) -> bool:
     """Cevabın sayısal olup olmadığını kontrol et"""
@@ -95,26 +31,71 @@ def is_numerical_answer(answer: str) -> bool:
     except ValueError:
         return False
 
-def run_ollama(prompt: str, model: str = "gemma3:270m"):
-    """Ollama modelini çalıştır"""
+def parse_number(answer: str):
+    """Cevabı sayıya çevir ("3,5" -> 3.5), çevrilemiyorsa None"""
     try:
-        env = os.environ.copy()
-        env['OLLAMA_NUM_GPU'] = '0'
-        
-        result = subprocess.run(
-            ["ollama", "run", model],
-            input=prompt,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            check=True,
-            env=env,
-            timeout=30
-        )
-        return result.stdout.strip()
+        return float(answer.strip().replace(',', '.'))
+    except ValueError:
+        return None
+
+@dataclass(frozen=True)
+class CompiledAlternative:
+    text: str                  # "/" ile ayrılmış, kırpılmış alternatif
+    normalized: str            # normalize_text(text)
+    number: Optional[float]    # parse_number(text)
+
+@dataclass(frozen=True)
+class CompiledAnswer:
+    """Her öğrencide tekrar hesaplanmaması için önceden işlenmiş doğru cevap"""
+    raw: str
+    alternatives: Tuple[CompiledAlternative, ...]
+    is_numerical: bool
+
+def compile_answer(correct_answer: str) -> CompiledAnswer:
+    """Doğru cevabı alternatiflerine ayır, normalize et ve sayısal değerlerini çöz"""
+    alternatives = tuple(
+        CompiledAlternative(ans, normalize_text(ans), parse_number(ans))
+        for ans in (a.strip() for a in correct_answer.split('/'))
+    )
+    is_numerical = any(is_numerical_answer(alt.text) for alt in alternatives)
+    return CompiledAnswer(correct_answer, alternatives, is_numerical)
+
+def compile_answer_key(correct_answers: dict) -> dict:
+    """{soru: doğru cevap} -> {soru: CompiledAnswer}"""
+    return {
+        q_num: ans if isinstance(ans, CompiledAnswer) else compile_answer(ans)
+        for q_num, ans in correct_answers.items()
+    }
+
+def run_ollama(prompt: str, model: str = LLM_MODEL):
+    """Ollama modelini yerel HTTP API üzerinden çalıştır (kalıcı bağlantı havuzu)"""
+    try:
+        with stage_timer("evaluate", "llm"):
+            return get_default_client().generate(prompt, model).strip()
     except Exception as e:
+        LLM_ERRORS.inc()
         return ""
 
+def cached_llm_judgement(prompt: str, prompt_type: str, norm_correct: str, norm_student: str,
+                         model: str = LLM_MODEL):
+    """Aynı (model, prompt tipi, doğru, öğrenci) için LLM'i tekrar çağırma"""
+    cache = get_default_llm_cache()
+    
+    if cache is not None:
+        response = cache.get(model, prompt_type, norm_correct, norm_student)
+        if response is not None:
+            LLM_CALLS.inc(source="cache")
+            return response
+    
+    response = run_ollama(prompt, model)
+    LLM_CALLS.inc(source="model")
+    
+    # Başarısız çağrılar (boş yanıt) önbelleğe alınmaz
+    if cache is not None and response:
+        cache.put(model, prompt_type, norm_correct, norm_student, response)
+    
+    return response
+
 def score_to_points(score: int, is_numerical: bool = False):
     """Benzerlik skorunu puana çevir"""
     if is_numerical:
@@ -124,64 +105,11 @@ def score_to_points(score: int, is_numerical: bool = False):
         # Sözel cevaplar için binary değerlendirme (30 ve üzeri doğru)
         return 1.0 if score >= 30 else 0.0
 
-def evaluate_answer(student_answer: str, correct_answer: str):
-    """Öğrenci cevabını değerlendir (alternatif cevapları da kontrol et)"""
-    
-    if not student_answer or student_answer.strip() == "":
-        return {"puan_katsayi": 0.0, "durum": "Boş", "yontem": "Boş", "eslesen_cevap": ""}
-    
-    # Alternatif cevapları ayır (/ ile)
-    alternative_answers = [ans.strip() for ans in correct_answer.split('/')]
-    
-    # Cevabın sayısal olup olmadığını kontrol et (ilk alternatif üzerinden)
-    is_numerical = any(is_numerical_answer(ans) for ans in alternative_answers)
-    
-    best_score = 0
-    best_method = ""
-    best_answer = alternative_answers[0]
-    best_str_sim = 0
-    best_llm_sim = 0
-    
-    # Her alternatif için kontrol et
-    for alt_answer in alternative_answers:
-        # 1. String benzerliği hesapla (OCR düzeltmeli)
-        str_similarity = string_similarity(student_answer, alt_answer)
-        
-        # Sayısal cevaplar için tam eşleşme kontrolü
-        if is_numerical:
-            # Sayısal değerleri karşılaştır
-            try:
-                # Sayısal değerleri normalize et
-                student_num = float(student_answer.strip().replace(',', '.'))
-                correct_num = float(alt_answer.strip().replace(',', '.'))
-                
-                # Tam eşleşme kontrolü
-                if abs(student_num - correct_num) < 0.01:  # Küçük tolerans
-                    str_similarity = 100
-                else:
-                    str_similarity = 0
-            except ValueError:
-                # Sayısal dönüşüm başarısız, normal string benzerliğini kullan
-                pass
-        
-        # Yüksek string benzerliği varsa LLM'e gerek yok
-        if str_similarity >= 85:
-            if str_similarity > best_score:
-                best_score = str_similarity
-                best_method = "String"
-                best_answer = alt_answer
-                best_str_sim = str_similarity
-                best_llm_sim = 0
-            continue
-        
-        # 2. LLM ile anlam benzerliği kontrol et (OCR düzeltmeli)
-        # Öğrenci cevabını da normalize et
-        norm_student = normalize_text(student_answer)
-        norm_correct = normalize_text(alt_answer)
-        
-        # Sayısal cevaplar için farklı prompt kullan
-        if is_numerical:
-            prompt = f"""İki cevap sayısal olarak aynı mı? OCR hataları olabilir.
+def build_llm_prompt(norm_correct: str, norm_student: str, is_numerical: bool) -> str:
+    """Normalize edilmiş cevaplar için LLM benzerlik prompt'unu oluştur"""
+    # Sayısal cevaplar için farklı prompt kullan
+    if is_numerical:
+        return f"""İki cevap sayısal olarak aynı mı? OCR hataları olabilir.
 
 Doğru (normalize): {norm_correct}
 Öğrenci (normalize): {norm_student}
@@ -192,8 +120,8 @@ Yanıt sadece sayı olmalı (0 veya 100):
 0: Sayısal olarak farklı
 
 Sadece sayı yaz:"""
-        else:
-            prompt = f"""İki cevap aynı anlamda mı? OCR hataları olabilir (ä->a, ö->o, ü->u, ß->ss gibi dönüşümler yapıldı).
+    else:
+        return f"""İki cevap aynı anlamda mı? OCR hataları olabilir (ä->a, ö->o, ü->u, ß->ss gibi dönüşümler yapıldı).
 
 Doğru (normalize): {norm_correct}
 Öğrenci (normalize): {norm_student}
@@ -207,7 +135,97 @@ Sözel olan cevaplar için benzerlik puanı ver (0-100):
 
 Sadece sayı yaz:"""
 
-        response = run_ollama(prompt)
+def evaluate_answer(student_answer: str, correct_answer, llm_executor=None):
+    """Öğrenci cevabını değerlendir (alternatif cevapları da kontrol et)
+
+    correct_answer metin ya da compile_answer çıktısı olabilir; derlenmiş
+    anahtarla yalnızca öğrenci tarafı işlenir.
+    llm_executor verilirse LLM gerektiren alternatifler eşzamanlı sorgulanır;
+    sonuçlar yine alternatif sırasıyla birleştirildiği için çıktı aynıdır.
+    """
+    
+    # Alternatif cevapları ayır (/ ile), normalize et, sayısal olup olmadığını belirle
+    if not isinstance(correct_answer, CompiledAnswer):
+        correct_answer = compile_answer(correct_answer)
+    
+    alternatives = correct_answer.alternatives
+    is_numerical = correct_answer.is_numerical
+    
+    if not student_answer or student_answer.strip() == "":
+        # Özet/istatistik alanları boş cevapta da bulunsun
+        return {
+            "puan_katsayi": 0.0,
+            "durum": "Boş",
+            "yontem": "Boş",
+            "eslesen_cevap": "",
+            "string_benzerlik": 0,
+            "llm_benzerlik": 0,
+            "sayisal_cevap": is_numerical,
+            "benzerlik_skoru": 0
+        }
+    
+    best_score = 0
+    best_method = ""
+    best_answer = alternatives[0].text
+    best_str_sim = 0
+    best_llm_sim = 0
+    
+    # Öğrenci tarafı bir kez hesaplanır
+    norm_student = normalize_text(student_answer)
+    student_num = parse_number(student_answer) if is_numerical else None
+    
+    # 1. Her alternatif için string benzerliği, gerekiyorsa LLM sorgusu hazırla
+    checks = []
+    for alt in alternatives:
+        alt_answer = alt.text
+        
+        # String benzerliği hesapla (OCR düzeltmeli)
+        str_similarity = normalized_similarity(norm_student, alt.normalized)
+        
+        # Sayısal cevaplar için tam eşleşme kontrolü
+        # (dönüşüm başarısızsa normal string benzerliği kullanılır)
+        if is_numerical and student_num is not None and alt.number is not None:
+            # Tam eşleşme kontrolü
+            if abs(student_num - alt.number) < 0.01:  # Küçük tolerans
+                str_similarity = 100
+            else:
+                str_similarity = 0
+        
+        # Yüksek string benzerliği varsa LLM'e gerek yok
+        if str_similarity >= 85:
+            checks.append((alt_answer, str_similarity, None))
+            continue
+        
+        # LLM ile anlam benzerliği kontrol et (OCR düzeltmeli)
+        norm_correct = alt.normalized
+        
+        # Sayısal cevaplar için farklı prompt kullan
+        prompt = build_llm_prompt(norm_correct, norm_student, is_numerical)
+        prompt_type = "sayisal" if is_numerical else "sozel"
+        llm_args = (prompt, prompt_type, norm_correct, norm_student)
+        
+        if llm_executor is not None:
+            # contextvars kopyası: LLM süresi isteğin aşama kaydına da eklensin
+            future = llm_executor.submit(contextvars.copy_context().run, cached_llm_judgement, *llm_args)
+            checks.append((alt_answer, str_similarity, future))
+        else:
+            checks.append((alt_answer, str_similarity, llm_args))
+    
+    # 2. Sonuçları alternatif sırasıyla birleştir
+    for alt_answer, str_similarity, llm_call in checks:
+        if llm_call is None:
+            if str_similarity > best_score:
+                best_score = str_similarity
+                best_method = "String"
+                best_answer = alt_answer
+                best_str_sim = str_similarity
+                best_llm_sim = 0
+            continue
+        
+        if isinstance(llm_call, tuple):
+            response = cached_llm_judgement(*llm_call)
+        else:
+            response = llm_call.result()
         
         try:
             llm_score = int(''.join(filter(str.isdigit, response[:10])))
@@ -253,23 +271,28 @@ Sadece sayı yaz:"""
         "benzerlik_skoru": round(best_score, 1)
     }
 
-def load_json(file_path: str):
-    """JSON dosyasını yükle"""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def main():
-    if len(sys.argv) < 3:
-        print("Kullanım: python evaluate.py <ocr_sonuc.json> <dogru_cevaplar.json>")
-        return
-    
-    ocr_file = sys.argv[1]
-    correct_file = sys.argv[2]
-    
-    # Dosyaları yükle
-    ocr_data = load_json(ocr_file)
-    correct_answers = load_json(correct_file)
+def evaluate_questions(student_answers: dict, correct_answers: dict, parallelism: int = EVAL_PARALLELISM):
+    """Tüm soruları değerlendir; sonuçlar correct_answers sırasıyla döner"""
+    items = list(correct_answers.items())
     
+    with stage_timer("evaluate", "questions"):
+        if parallelism <= 1:
+            return [evaluate_answer(student_answers.get(str(q_num), ""), correct_ans) for q_num, correct_ans in items]
+        
+        # Sorular ve LLM çağrıları ayrı havuzlarda: soru işleri LLM sonuçlarını beklerken kilitlenmez
+        with ThreadPoolExecutor(parallelism) as llm_executor, ThreadPoolExecutor(parallelism) as question_executor:
+            futures = [
+                question_executor.submit(contextvars.copy_context().run, evaluate_answer,
+                                         student_answers.get(str(q_num), ""), correct_ans, llm_executor)
+                for q_num, correct_ans in items
+            ]
+            return [future.result() for future in futures]
+
+def build_evaluation(ocr_data: dict, correct_answers: dict, eval_results: list, verbose: bool = True):
+    """Soru bazlı değerlendirmelerden öğrenci sonucunu (sorular + ozet) oluştur
+
+    eval_results, correct_answers sırasıyla evaluate_answer çıktılarıdır.
+    """
     student_answers = ocr_data.get("answers", {})
     
     # Değerlendirme
@@ -281,18 +304,13 @@ def main():
     sayisal_sayisi = 0
     sozel_sayisi = 0
     
-    print(f"\n🔍 Değerlendiriliyor (OCR karakter düzeltmeleri aktif)...")
-    print(f"📝 Sözel sorular: 30 ve üzeri benzerlik DOĞRU, 29 ve altı YANLIŞ\n")
-    
-    for q_num, correct_ans in correct_answers.items():
+    for (q_num, correct_ans), eval_result in zip(correct_answers.items(), eval_results):
         student_ans = student_answers.get(str(q_num), "")
         
-        eval_result = evaluate_answer(student_ans, correct_ans)
-        
         results[q_num] = {
             "ogrenci_cevabi": student_ans,
             "ogrenci_cevabi_normalized": normalize_text(student_ans),
-            "dogru_cevap": correct_ans,
+            "dogru_cevap": correct_ans.raw if isinstance(correct_ans, CompiledAnswer) else correct_ans,
             **eval_result
         }
         
@@ -311,6 +329,9 @@ def main():
         
         toplam_katsayi += eval_result["puan_katsayi"]
         
+        if not verbose:
+            continue
+        
         # İlerleme göster
         if not student_ans:
             status = "⭕"
@@ -352,6 +373,41 @@ def main():
         }
     }
     
+    return final_result
+
+def load_json(file_path: str):
+    """JSON dosyasını yükle"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    if len(sys.argv) < 3:
+        print("Kullanım: python evaluate.py <ocr_sonuc.json> <dogru_cevaplar.json> [--parallel N]")
+        return
+    
+    ocr_file = sys.argv[1]
+    correct_file = sys.argv[2]
+    
+    parallelism = EVAL_PARALLELISM
+    if "--parallel" in sys.argv[3:]:
+        parallelism = int(sys.argv[sys.argv.index("--parallel") + 1])
+    
+    # Dosyaları yükle
+    ocr_data = load_json(ocr_file)
+    correct_answers = load_json(correct_file)
+    
+    student_answers = ocr_data.get("answers", {})
+    
+    print(f"\n🔍 Değerlendiriliyor (OCR karakter düzeltmeleri aktif)...")
+    print(f"📝 Sözel sorular: 30 ve üzeri benzerlik DOĞRU, 29 ve altı YANLIŞ\n")
+    
+    eval_results = evaluate_questions(student_answers, correct_answers, parallelism)
+    final_result = build_evaluation(ocr_data, correct_answers, eval_results)
+    ozet = final_result["ozet"]
+    yuzdelik_puan = ozet["toplam_puan"]
+    dogru, yanlis, bos = ozet["dogru"], ozet["yanlis"], ozet["bos"]
+    sayisal_sayisi, sozel_sayisi = ozet["sayisal_soru_sayisi"], ozet["sozel_soru_sayisi"]
+    
     # Kaydet
     output_file = f"output_llm/{os.path.splitext(os.path.basename(ocr_file))[0]}_evaluation.json"
     os.makedirs("output_llm", exist_ok=True)
@@ -365,6 +421,11 @@ def main():
     print(f"   Sayısal Soru: {sayisal_sayisi} | Sözel Soru: {sozel_sayisi}")
     print(f"   Kriter: Sözel sorularda %30 ve üzeri benzerlik DOĞRU kabul edildi")
     print(f"💾 Kaydedildi: {output_file}")
+    
+    llm_cache = get_default_llm_cache()
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        print(f"🧠 LLM önbelleği: {stats['hits']} isabet, {stats['misses']} ıska (oran: {stats['hit_rate']:.0%})")
     print(f"{'='*60}\n")
 
 if __name__ == "__main__":
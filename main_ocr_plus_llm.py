@@ -1,6 +1,3 @@
-import os
+from main_cohort import run_cohort
 
-a = os.listdir("yonetim_output")
-
-for i in a:
-    os.system(f'python main_evaluate.py "yonetim_output/{i}" "dogru_cevaplar.json"')
\ No newline at end of file
+run_cohort("yonetim_output", "dogru_cevaplar.json", pattern="*")
\ No newline at end of file
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import main_v3
+import main_puan
+from main_batch import collect_images
+from ocr_engine import create_ocr_engine, load_ocr_profile
+from ocr_cache import get_default_cache
+
+# Bir PaddleOCR motorunun verimli kullanabildiği yaklaşık thread sayısı
+THREADS_PER_ENGINE = 4
+
+# mod -> (görüntü işleyici, özet klasörü)
+PIPELINES = {
+    "v3": (main_v3.process_image, "output"),
+    "puan": (main_puan.process_image, main_puan.folder_path),
+}
+
+# Her worker sürecinde bir kez oluşturulan OCR motoru
+_worker_ocr = None
+_worker_mode = None
+_worker_cache = None
+
+def plan_workers(workers: int = None, cpu_count: int = None, image_count: int = None):
+    """Çekirdekleri worker sayısı ve motor başına thread sayısı arasında paylaştır
+
+    Ayar profili (main_tune.py) varsa, worker sayısı verilmediğinde
+    profildeki worker ve thread sayıları kullanılır. image_count verilirse
+    worker sayısı görüntü sayısını aşmaz; thread sayısı bu sınırdan sonra
+    hesaplanır, böylece boşta çekirdek kalmaz.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    profile = load_ocr_profile()
+
+    if not workers and profile.get("workers"):
+        workers = int(profile["workers"])
+        if image_count:
+            workers = max(1, min(workers, image_count))
+        threads = profile.get("engine", {}).get("cpu_threads") or max(1, cpu_count // workers)
+        return workers, int(threads)
+
+    if not workers:
+        workers = max(1, cpu_count // THREADS_PER_ENGINE)
+
+    workers = max(1, min(workers, cpu_count, image_count or cpu_count))
+    threads = max(1, cpu_count // workers)
+
+    return workers, threads
+
+def _init_worker(mode: str, cpu_threads: int, use_cache: bool = True):
+    global _worker_ocr, _worker_mode, _worker_cache
+    _worker_mode = mode
+    _worker_ocr = create_ocr_engine(cpu_threads=cpu_threads)
+    _worker_cache = get_default_cache() if use_cache else None
+
+def _process_one(image_path: str):
+    process, _ = PIPELINES[_worker_mode]
+    start = time.time()
+    result = process(image_path, _worker_ocr, _worker_cache)
+    return image_path, result, time.time() - start
+
+def run_serial_baseline(image_paths, mode: str, cpu_threads: int):
+    """Seri çalışmada görüntü başına ortalama süreyi ölç (hızlanma karşılaştırması için)"""
+    process, _ = PIPELINES[mode]
+    ocr = create_ocr_engine(cpu_threads=cpu_threads)
+
+    start = time.time()
+    for image_path in image_paths:
+        process(image_path, ocr)
+
+    return (time.time() - start) / len(image_paths)
+
+def run_parallel(source: str, mode: str = "v3", workers: int = None, baseline_samples: int = 0):
+    """Görüntüleri N worker sürecine dağıtıp sonuçları tek özette birleştir"""
+    process, output_dir = PIPELINES[mode]
+    os.makedirs("output", exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    image_paths = collect_images(source)
+    if not image_paths:
+        print(f"Uyarı: {source} içinde görüntü bulunamadı!")
+        return None
+
+    workers, threads = plan_workers(workers, image_count=len(image_paths))
+    print(f"{len(image_paths)} görüntü, {workers} worker x {threads} thread ({mode} modu)")
+
+    # Hızlanma ölçülürken iki taraf da önbelleksiz: aksi halde ikinci çalıştırmada
+    # paralel sayfalar önbellekten gelir, seri örnek tam OCR çalıştırır
+    use_cache = baseline_samples <= 0
+    if not use_cache:
+        print("Hızlanma ölçümü: OCR önbelleği kullanılmıyor")
+
+    start_time = time.time()
+    results = {}
+    durations = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(mode, threads, use_cache)) as executor:
+        futures = [executor.submit(_process_one, image_path) for image_path in image_paths]
+
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                image_path, result, elapsed = future.result()
+            except Exception as e:
+                print(f"Hata: {e}")
+                continue
+
+            results[image_path] = result
+            durations[image_path] = elapsed
+            print(f"[{done}/{len(image_paths)}] {image_path}: {elapsed:.2f} saniye")
+
+    wall_time = time.time() - start_time
+    busy_time = sum(durations.values())
+
+    summary = {
+        "mode": mode,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "image_count": len(image_paths),
+        "processed": sum(1 for r in results.values() if r is not None),
+        "failed": len(image_paths) - sum(1 for r in results.values() if r is not None),
+        "wall_time": round(wall_time, 2),
+        "throughput": round(len(results) / wall_time, 3) if wall_time > 0 else 0,
+        "cache": use_cache,
+        "results": {path: results.get(path) for path in image_paths},
+    }
+
+    print("\n" + "=" * 50)
+    print(f"İşlenen görüntü: {summary['processed']}/{len(image_paths)}")
+    print(f"Duvar saati: {wall_time:.2f} saniye, verim: {summary['throughput']:.2f} görüntü/saniye")
+    if wall_time > 0:
+        print(f"Etkin paralellik: {busy_time / wall_time:.2f}x")
+
+    # Seri referans: tam thread sayısıyla tek motor, önbelleksiz
+    if baseline_samples > 0:
+        samples = image_paths[:baseline_samples]
+        serial_per_image = run_serial_baseline(samples, mode, workers * threads)
+        serial_estimate = serial_per_image * len(image_paths)
+        speedup = serial_estimate / wall_time if wall_time > 0 else 0
+        summary["serial_per_image"] = round(serial_per_image, 3)
+        summary["speedup"] = round(speedup, 2)
+        print(f"Seri tahmini: {serial_estimate:.2f} saniye ({len(samples)} örnekten)")
+        print(f"Hızlanma: {speedup:.2f}x")
+    print("=" * 50)
+
+    summary_path = os.path.join(output_dir, "parallel_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"Özet kaydedildi: {summary_path}")
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Sınav kağıtlarını çok çekirdekte paralel işle")
+    parser.add_argument("source", help="Görüntü klasörü ya da glob deseni")
+    parser.add_argument("--mode", choices=sorted(PIPELINES), default="v3",
+                        help="v3: cevap kağıdı, puan: puan kağıdı")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker süreç sayısı (varsayılan: çekirdek sayısı / 4)")
+    parser.add_argument("--baseline", type=int, default=0, metavar="N",
+                        help="Hızlanmayı ölçmek için ilk N görüntüyü ayrıca seri çalıştır")
+    args = parser.parse_args()
+
+    run_parallel(args.source, args.mode, args.workers, args.baseline)
+
+if __name__ == "__main__":
+    main()
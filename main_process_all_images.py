@@ -1,6 +1,5 @@
-import os
+from main_batch import run_batch
+from ocr_cache import get_default_cache
+from result_store import get_default_result_store
 
-a = os.listdir("projeyonetimi")
-
-for i in a:
-    os.system(f'python main_v3.py "projeyonetimi/{i}"')
\ No newline at end of file
+run_batch("projeyonetimi", mode="v3", cache=get_default_cache(), store=get_default_result_store())
\ No newline at end of file
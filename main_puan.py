@@ -2,84 +2,37 @@ import cv2
 import json
 import sys
 import os
-import re
-from paddleocr import PaddleOCR
 import time
+from ocr_engine import create_ocr_engine, extract_payload
+from ocr_cache import get_default_cache, write_ocr_json
+from image_io import read_image_bytes, decode_image
+from roi import apply_roi, variant_suffix
+from metrics import stage_timer
+from result_store import WRITE_JSON_FILES
+from ocr_parsing import correct_ocr_errors, extract_scores_from_text, parse_score_sheet
 
 folder_path = "output(puan)"
 
-def correct_ocr_errors(text: str) -> str:
-    replacements = {
-        's': '3', 'S': '3',
-        'f': 'p', 'F': 'p',
-        'l': '1', 'I': '1',
-        'o': '0', 'O': '0',
-        'ğ': '9', 'Ğ': '9',
-        'ş': '6', 'Ş': '6',
-        'ı': '1', 'İ': '1',
-        'ρ': 'p', 'P': 'p'  # rho karakteri de p'ye dönüşsün
-    }
-    
-    for wrong, correct in replacements.items():
-        text = text.replace(wrong, correct)
-    
-    return text
+# Puan akışında eşikleme yok, OCR orijinal görüntüde (ROI kırpma/küçültme sonrası) çalışır
+PREPROCESS_VARIANT = "raw" + variant_suffix()
 
-def extract_scores_from_text(text: str, all_scores: dict):
-    corrected_text = correct_ocr_errors(text)
-    original_text = text
-    
-    # Format: 1p=7, 5p=7, 6p=7 (p harfi yerine f, ρ de olabilir)
-    pattern1 = r'(\d+)\s*[pPρ]\s*=\s*(\d+)'
-    matches = re.findall(pattern1, corrected_text)
-    for match in matches:
-        if len(match) == 2:
-            q_num = int(match[0])
-            score = int(match[1])
-            all_scores[q_num] = score
-    
-    # Format: p=7, p= 7 (boşluklu)
-    pattern2 = r'[pPρ]\s*=\s*(\d+)'
-    matches = re.findall(pattern2, corrected_text)
-    
-    if matches:
-        numbers_in_text = re.findall(r'(\d+)', original_text)
-        
-        for score_match in matches:
-            score = int(score_match)
-            
-            # Önce aynı satırda soru numarası ara (örn: "7. ... p=7")
-            question_match = re.search(r'(\d+)\.', original_text)
-            if question_match:
-                q_num = int(question_match.group(1))
-                if q_num not in all_scores and 1 <= q_num <= 50:
-                    all_scores[q_num] = score
-                    continue
-            
-            # Yoksa diğer sayıları dene
-            for num in numbers_in_text:
-                num_int = int(num)
-                if num_int not in all_scores and 1 <= num_int <= 50:
-                    if f"{num}p" in corrected_text.lower() or f"{num} p" in corrected_text.lower():
-                        all_scores[num_int] = score
-                        break
+# Sonuç deposundaki kayıt türü (result_store.LAYOUT)
+RESULT_KIND = "scores"
 
 def process_ocr_json(json_file_path: str, original_image_path: str):
     with open(json_file_path, 'r', encoding='utf-8') as f:
         ocr_data = json.load(f)
     
+    return process_ocr_data(ocr_data, original_image_path)
+
+def process_ocr_data(ocr_data: dict, original_image_path: str):
     rec_texts = ocr_data.get('rec_texts', [])
     
     if not rec_texts:
         print("Uyarı: rec_texts boş!")
         return None
     
-    all_scores = {}
-    
-    for text in rec_texts:
-        text = text.strip()
-        if text:
-            extract_scores_from_text(text, all_scores)
+    all_scores = parse_score_sheet(rec_texts)
     
     print("\nBULUNAN NOTLAR:")
     print("-" * 30)
@@ -101,21 +54,19 @@ def process_ocr_json(json_file_path: str, original_image_path: str):
         "question_count": len(all_scores)
     }
     
-    base_name = os.path.splitext(os.path.basename(original_image_path))[0]
-    processed_json = f"{folder_path}/{base_name}_scores.json"
-    
-    with open(processed_json, 'w', encoding='utf-8') as f:
-        json.dump(result_data, f, indent=2, ensure_ascii=False)
+    # RESULT_JSON_FILES=0 ise dosya yazılmaz, sonuç çağıranın sonuç deposuna kaydedilir
+    if WRITE_JSON_FILES:
+        base_name = os.path.splitext(os.path.basename(original_image_path))[0]
+        processed_json = f"{folder_path}/{base_name}_scores.json"
+        
+        with stage_timer("puan", "write"), open(processed_json, 'w', encoding='utf-8') as f:
+            json.dump(result_data, f, indent=2, ensure_ascii=False)
     
     return result_data
 
-def run_ocr_on_image(image_path: str):
-    ocr = PaddleOCR(
-        use_doc_orientation_classify=False, 
-        use_doc_unwarping=False, 
-        use_textline_orientation=True,
-        lang='tr',
-    )
+def run_ocr_on_image(image_path: str, ocr=None):
+    if ocr is None:
+        ocr = create_ocr_engine()
     
     result = ocr.predict(image_path)
     
@@ -124,15 +75,68 @@ def run_ocr_on_image(image_path: str):
     
     return result
 
+def ocr_json_path(image_path: str) -> str:
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return f"{folder_path}/{base_name}_res.json"
+
+def prepare_ocr_input(img):
+    # Puan kağıtlarında eşikleme yok; sadece içerik alanına kırpma/küçültme
+    return apply_roi(img)
+
+def process_image(image_path: str, ocr=None, cache=None, debug: bool = False):
+    # OCR -> ayrıştırma bellekte; _res.json sadece debug=True ise yazılır
+    with stage_timer("puan", "read"):
+        image_bytes = read_image_bytes(image_path)
+    
+    return process_image_bytes(image_bytes, image_path, ocr, cache, debug)
+
+def process_image_bytes(image_bytes: bytes, image_path: str, ocr=None, cache=None, debug: bool = False):
+    # Bellekteki görüntü baytlarını işler; image_path sonuçtaki ad ve çıktı dosyası adı için
+    cache_key = None
+    payload = None
+    if cache is not None:
+        with stage_timer("puan", "cache"):
+            cache_key = cache.make_key(image_bytes, PREPROCESS_VARIANT)
+            payload = cache.get(cache_key)
+        if payload is not None:
+            print(f"OCR sonucu önbellekten alındı: {image_path}")
+    
+    if payload is None:
+        with stage_timer("puan", "decode"):
+            img = decode_image(image_bytes)
+        if img is None:
+            print(f"Hata: {image_path} okunamadı!")
+            return None
+        
+        if ocr is None:
+            with stage_timer("puan", "model_load"):
+                ocr = create_ocr_engine()
+        
+        with stage_timer("puan", "preprocess"):
+            ocr_input, transform = prepare_ocr_input(img)
+        with stage_timer("puan", "ocr"):
+            payload = extract_payload(ocr.predict(ocr_input), transform)
+        
+        if cache is not None:
+            with stage_timer("puan", "cache"):
+                cache.put(cache_key, payload)
+    
+    if debug:
+        write_ocr_json(payload, ocr_json_path(image_path))
+    
+    with stage_timer("puan", "parse"):
+        return process_ocr_data(payload, image_path)
+
 def main():
     start_time = time.time()
     
     if len(sys.argv) < 2:
-        print("Kullanım: python main_puan.py \"resim_yolu\"")
+        print("Kullanım: python main_puan.py \"resim_yolu\" [--debug]")
         print('Örnek: python main_puan.py "p1.jpeg"')
         return
     
     image_path = sys.argv[1]
+    debug = "--debug" in sys.argv[2:]
     
     if not os.path.exists(image_path):
         print(f"Hata: {image_path} dosyası bulunamadı!")
@@ -143,15 +147,7 @@ def main():
     
     print(f"Dosya: {image_path}")
     
-    run_ocr_on_image(image_path)
-    
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    json_file = f"{folder_path}/{base_name}_res.json"
-    
-    if os.path.exists(json_file):
-        process_ocr_json(json_file, image_path)
-    else:
-        print(f"Hata: {json_file} oluşturulamadı!")
+    process_image(image_path, cache=get_default_cache(), debug=debug)
     
     end_time = time.time()
     print(f"İşlem süresi: {end_time - start_time:.2f} saniye")
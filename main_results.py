@@ -0,0 +1,44 @@
+import argparse
+import json
+
+from result_store import LAYOUT, ResultStore, RESULT_STORE_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="Sonuç deposu: sorgu, JSON düzenine aktarma, eski dosyaları içe alma")
+    parser.add_argument("--db", default=RESULT_STORE_PATH, help="Sonuç deposu dosyası")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("query", "Kayıtları JSON satırları olarak yazdır"),
+                            ("export", "Kayıtları output/, output(puan)/, output_llm/ düzenine yaz")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--kind", choices=sorted(LAYOUT), help="Sonuç türü")
+        p.add_argument("--exam-id", help="Sınav kimliği")
+        p.add_argument("--student-id", help="Öğrenci numarası")
+        if name == "query":
+            p.add_argument("--limit", type=int, help="En fazla kayıt sayısı")
+        else:
+            p.add_argument("--root", default=".", help="Klasörlerin oluşturulacağı kök dizin")
+
+    p = sub.add_parser("import", help="Mevcut JSON dosyalarını depoya aktar")
+    p.add_argument("--root", default=".", help="output/ klasörlerinin bulunduğu kök dizin")
+    p.add_argument("--exam-id", help="Aktarılan kayıtların sınav kimliği")
+
+    sub.add_parser("stats", help="Türlere göre kayıt sayıları")
+
+    args = parser.parse_args()
+    store = ResultStore(args.db)
+
+    if args.command == "query":
+        for record in store.query(args.kind, args.exam_id, args.student_id, limit=args.limit):
+            print(json.dumps(record, ensure_ascii=False))
+    elif args.command == "export":
+        count = store.export(args.root, args.kind, args.exam_id, args.student_id)
+        print(f"💾 {count} sonuç dosyası yazıldı: {args.root}")
+    elif args.command == "import":
+        count = store.import_layout(args.root, args.exam_id)
+        print(f"✓ {count} sonuç depoya aktarıldı: {args.db}")
+    else:
+        print(json.dumps(store.stats(), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
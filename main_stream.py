@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+import cv2
+
+import main_puan
+import main_v3
+from grading import grade_sheet
+from image_io import decode_image, read_image_bytes
+from main_batch import collect_images
+from main_evaluate import compile_answer_key, load_json
+from metrics import stage_timer
+from ocr_cache import get_default_cache, write_ocr_json
+from ocr_engine import create_ocr_engine, extract_payload
+from result_store import WRITE_JSON_FILES, get_default_result_store, write_result_json
+
+# Aşamalar arası kuyruk boyu: bellekte en fazla bu kadar sayfa bekler
+STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", "8"))
+
+# Çözme/önişleme ve ayrıştırma/değerlendirme thread sayıları (cv2 ve LLM beklemesi GIL'i bırakır)
+STREAM_DECODE_WORKERS = int(os.environ.get("STREAM_DECODE_WORKERS", "2"))
+STREAM_POST_WORKERS = int(os.environ.get("STREAM_POST_WORKERS", "2"))
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+PIPELINES = {"v3": main_v3, "puan": main_puan}
+
+# Kuyruk sonu işareti
+_DONE = object()
+
+class Page:
+    """Akıştaki tek sayfa: ham bayt (dosya) ya da çözülmüş görüntü (çok sayfalı TIFF)"""
+
+    __slots__ = ("index", "name", "data", "image", "cache_key", "ocr_input", "transform",
+                 "payload", "result", "evaluation", "error")
+
+    def __init__(self, index: int, name: str, data: bytes = None, image=None):
+        self.index = index
+        self.name = name
+        self.data = data
+        self.image = image
+        self.cache_key = None
+        self.ocr_input = None
+        self.transform = None
+        self.payload = None
+        self.result = None
+        self.evaluation = None
+        self.error = None
+
+def iter_tiff_pages(path: str):
+    """Çok sayfalı TIFF'i sayfa sayfa oku (tüm sayfalar belleğe alınmaz)"""
+    base_name, extension = os.path.splitext(os.path.basename(path))
+    for page in range(cv2.imcount(path)):
+        ok, images = cv2.imreadmulti(path, start=page, count=1, flags=cv2.IMREAD_COLOR)
+        yield f"{base_name}_p{page + 1:03d}{extension}", None, images[0] if ok and images else None
+
+def source_paths(source: str):
+    # Tek dosya ya da klasör / glob deseni
+    if os.path.isfile(source):
+        return [source]
+    return collect_images(source)
+
+def iter_file_pages(path: str):
+    """Tek dosyanın sayfaları: görüntü için bir, çok sayfalı TIFF için her sayfa"""
+    if path.lower().endswith(TIFF_EXTENSIONS) and cv2.imcount(path) > 1:
+        yield from iter_tiff_pages(path)
+    else:
+        yield path, read_image_bytes(path), None
+
+def iter_pages(source: str):
+    """Klasör, glob, tek görüntü ya da çok sayfalı TIFF'ten (ad, bayt, görüntü) üret
+
+    Görüntüler tembel okunur; ham bayt ya da çözülmüş sayfa sadece akış
+    o sayfaya geldiğinde belleğe alınır.
+    """
+    for path in source_paths(source):
+        yield from iter_file_pages(path)
+
+class StreamStats:
+    """Aşama başına meşgul süre ve işlenen sayfa sayısı"""
+
+    def __init__(self):
+        self.busy = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, elapsed: float, pages: int = 1):
+        with self._lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + elapsed
+            self.counts[stage] = self.counts.get(stage, 0) + pages
+
+def _run_workers(target, count: int, q_in: queue.Queue, name: str):
+    # Aynı kuyruktan okuyan count thread; kuyruk sonu işareti kardeşler için geri konur
+    def loop():
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                q_in.put(_DONE)
+                return
+            # Tek sayfadaki beklenmeyen hata akışı durdurmasın (kuyruklar tıkanırdı)
+            try:
+                target(item)
+            except Exception as e:
+                print(f"Hata ({name}): {e}")
+
+    threads = [threading.Thread(target=loop, name=f"{name}-{i}", daemon=True) for i in range(max(1, count))]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def run_stream(source: str, mode: str = "v3", ocr=None, cache=None, store=None, compiled_key: dict = None,
+               exam_id: str = None, batch_size: int = 4, queue_size: int = STREAM_QUEUE_SIZE,
+               decode_workers: int = STREAM_DECODE_WORKERS, post_workers: int = STREAM_POST_WORKERS,
+               debug: bool = False, on_result=None):
+    """Çözme/önişleme -> OCR -> ayrıştırma/değerlendirme aşamalarını sınırlı kuyruklarla üst üste çalıştır
+
+    OCR motoru sayfaları işlerken sonraki sayfalar çözülür ve önceki sayfalar
+    ayrıştırılır/değerlendirilir. Kuyruklar sınırlı olduğu için sayfa sayısı
+    ne olursa olsun bellekte en fazla birkaç kuyruk boyu sayfa bulunur.
+    compiled_key verilirse (v3) her kağıt ayrıca değerlendirilir.
+    on_result(page) her sayfa bittiğinde çağrılır; özet sözlük döner.
+    """
+    pipeline = PIPELINES[mode]
+    os.makedirs("output", exist_ok=True)
+    os.makedirs(main_puan.folder_path, exist_ok=True)
+    if compiled_key is not None and WRITE_JSON_FILES:
+        os.makedirs("output_llm", exist_ok=True)
+
+    start_time = time.time()
+    if ocr is None:
+        ocr = create_ocr_engine()
+    load_time = time.time() - start_time
+
+    stats = StreamStats()
+    q_decode = queue.Queue(queue_size)
+    q_ocr = queue.Queue(queue_size)
+    q_post = queue.Queue(queue_size)
+    summary = {"pages": 0, "processed": 0, "failed": 0, "cache_hits": 0}
+    summary_lock = threading.Lock()
+    feed_error = []
+    # Önbellek süreç genelinde paylaşılır: bu akışın isabetleri başlangıca göre fark
+    cache_hits_start = cache.stats()["hits"] if cache is not None else 0
+
+    def feed():
+        index = 0
+        try:
+            for path in source_paths(source):
+                # Okunamayan / silinmiş dosya sadece kendi sayfası için hata olur, akış devam eder
+                try:
+                    for name, data, image in iter_file_pages(path):
+                        q_decode.put(Page(index, name, data, image))
+                        index += 1
+                except Exception as e:
+                    page = Page(index, path)
+                    page.error = f"dosya okunamadı: {e}"
+                    q_decode.put(page)
+                    index += 1
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            q_decode.put(_DONE)
+
+    def decode(page: Page):
+        if page.error is not None:
+            # Besleme aşamasında okunamayan dosya: hata sonuca kadar taşınır
+            q_ocr.put(page)
+            return
+
+        start = time.perf_counter()
+        with stage_timer("stream", "decode"):
+            try:
+                if page.data is not None:
+                    image_bytes, variant = page.data, pipeline.PREPROCESS_VARIANT
+                elif page.image is not None:
+                    # TIFF sayfası: önbellek anahtarı piksel verisi + boyuttan
+                    image_bytes = page.image.tobytes()
+                    variant = f"{pipeline.PREPROCESS_VARIANT}:pixels{'x'.join(map(str, page.image.shape))}"
+                else:
+                    raise ValueError("sayfa okunamadı")
+
+                if cache is not None:
+                    page.cache_key = cache.make_key(image_bytes, variant)
+                    page.payload = cache.get(page.cache_key)
+
+                if page.payload is None:
+                    img = page.image if page.image is not None else decode_image(page.data)
+                    if img is None:
+                        raise ValueError("görüntü çözülemedi")
+                    page.ocr_input, page.transform = pipeline.prepare_ocr_input(img)
+            except Exception as e:
+                page.error = str(e)
+            # Ham veri bir sonraki aşamada gerekmez
+            page.data = page.image = None
+        stats.add("decode", time.perf_counter() - start)
+        q_ocr.put(page)
+
+    def run_ocr():
+        # Tek motor; kuyrukta bekleyen sayfalar batch_size'a kadar tek predict çağrısında işlenir
+        finished = False
+        while not finished:
+            batch = [q_ocr.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(q_ocr.get_nowait())
+                except queue.Empty:
+                    break
+            if _DONE in batch:
+                batch.remove(_DONE)
+                finished = True
+
+            pending = [page for page in batch if page.payload is None and page.error is None]
+            if pending:
+                start = time.perf_counter()
+                with stage_timer("stream", "ocr"):
+                    try:
+                        results = ocr.predict([page.ocr_input for page in pending])
+                        for page, res in zip(pending, results):
+                            page.payload = extract_payload([res], page.transform)
+                            if cache is not None:
+                                cache.put(page.cache_key, page.payload)
+                    except Exception as e:
+                        for page in pending:
+                            page.error = str(e)
+                stats.add("ocr", time.perf_counter() - start, len(pending))
+
+            for page in batch:
+                page.ocr_input = None
+                q_post.put(page)
+
+    def post(page: Page):
+        start = time.perf_counter()
+        with stage_timer("stream", "post"):
+            if page.error is None:
+                try:
+                    if debug:
+                        write_ocr_json(page.payload, pipeline.ocr_json_path(page.name))
+                    page.result = pipeline.process_ocr_data(page.payload, page.name)
+                    if page.result is None:
+                        page.error = "Sonuç oluşturulamadı"
+                    elif compiled_key is not None:
+                        page.evaluation = grade_sheet(page.result, compiled_key)
+                    if store is not None and page.result is not None:
+                        # /grade ile aynı düzen: değerlendirme job_id, kağıt {job_id}-sheet
+                        job_id = str(uuid.uuid4())
+                        if page.evaluation is not None:
+                            store.put("evaluation", page.evaluation, job_id, exam_id)
+                            job_id += "-sheet"
+                        store.put(pipeline.RESULT_KIND, page.result, job_id, exam_id)
+                    if page.evaluation is not None and WRITE_JSON_FILES:
+                        # main_evaluate ile aynı ad: output_llm/{kağıt}_processed_evaluation.json
+                        base_name = os.path.splitext(os.path.basename(page.name))[0]
+                        write_result_json("evaluation", page.evaluation, f"{base_name}_processed")
+                except Exception as e:
+                    page.error = str(e)
+        stats.add("post", time.perf_counter() - start)
+
+        page.payload = None
+        with summary_lock:
+            summary["pages"] += 1
+            summary["processed" if page.error is None else "failed"] += 1
+        if on_result is not None:
+            on_result(page)
+
+    feeder = threading.Thread(target=feed, name="stream-feed", daemon=True)
+    feeder.start()
+    decoders = _run_workers(decode, decode_workers, q_decode, "stream-decode")
+    ocr_thread = threading.Thread(target=run_ocr, name="stream-ocr", daemon=True)
+    ocr_thread.start()
+    posters = _run_workers(post, post_workers, q_post, "stream-post")
+
+    # Aşamalar sırayla kapanır: bir aşamanın tüm thread'leri bitince sonrakine kuyruk sonu gönderilir
+    feeder.join()
+    for thread in decoders:
+        thread.join()
+    q_ocr.put(_DONE)
+    ocr_thread.join()
+    q_post.put(_DONE)
+    for thread in posters:
+        thread.join()
+
+    if feed_error:
+        print(f"Hata: kaynak okunamadı ({feed_error[0]})")
+
+    wall_time = time.time() - start_time - load_time
+    workers = {"decode": len(decoders), "ocr": 1, "post": len(posters)}
+    summary.update({
+        "mode": mode,
+        "load_time": round(load_time, 2),
+        "wall_time": round(wall_time, 2),
+        "throughput": round(summary["pages"] / wall_time, 3) if wall_time > 0 else 0,
+        # Aşama meşguliyeti / (duvar saati x thread sayısı): 1'e yakın olan aşama darboğazdır
+        "stage_busy": {stage: round(busy, 3) for stage, busy in stats.busy.items()},
+        "stage_utilization": {stage: round(busy / (wall_time * workers[stage]), 3) if wall_time > 0 else 0
+                              for stage, busy in stats.busy.items()},
+    })
+    if cache is not None:
+        summary["cache_hits"] = cache.stats()["hits"] - cache_hits_start
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Çok sayfalı / toplu işlerde aşamaları üst üste çalıştıran akış")
+    parser.add_argument("source", help="Görüntü, klasör, glob deseni ya da çok sayfalı TIFF")
+    parser.add_argument("--mode", choices=sorted(PIPELINES), default="v3",
+                        help="v3: cevap kağıdı, puan: puan kağıdı")
+    parser.add_argument("--key", help="Doğru cevaplar JSON dosyası (v3: her kağıdı ayrıca değerlendir)")
+    parser.add_argument("--exam-id", help="Sonuç deposunda kayıtların sınav kimliği")
+    parser.add_argument("--batch-size", type=int, default=4, help="predict çağrısı başına en fazla sayfa")
+    parser.add_argument("--queue-size", type=int, default=STREAM_QUEUE_SIZE, help="Aşamalar arası kuyruk boyu")
+    parser.add_argument("--decode-workers", type=int, default=STREAM_DECODE_WORKERS)
+    parser.add_argument("--post-workers", type=int, default=STREAM_POST_WORKERS)
+    parser.add_argument("--no-cache", action="store_true", help="OCR önbelleğini kullanma")
+    parser.add_argument("--debug", action="store_true", help="OCR JSON çıktılarını da diske yaz")
+    args = parser.parse_args()
+
+    if args.key and args.mode != "v3":
+        parser.error("--key sadece v3 modunda kullanılabilir")
+
+    compiled_key = compile_answer_key(load_json(args.key)) if args.key else None
+
+    def report(page: Page):
+        status = "✓" if page.error is None else f"✗ {page.error}"
+        score = f" ({page.evaluation['ozet']['toplam_puan']:.1f}/100)" if page.evaluation else ""
+        print(f"[{page.index + 1}] {page.name}: {status}{score}")
+
+    summary = run_stream(args.source, args.mode,
+                         cache=None if args.no_cache else get_default_cache(),
+                         store=get_default_result_store(), compiled_key=compiled_key, exam_id=args.exam_id,
+                         batch_size=max(1, args.batch_size), queue_size=max(1, args.queue_size),
+                         decode_workers=args.decode_workers, post_workers=args.post_workers,
+                         debug=args.debug, on_result=report)
+
+    print("\n" + "=" * 50)
+    print(f"İşlenen sayfa: {summary['processed']}/{summary['pages']} (başarısız: {summary['failed']})")
+    print(f"Süre: {summary['wall_time']:.2f} saniye (model yükleme: {summary['load_time']:.2f} saniye)")
+    print(f"Verim: {summary['throughput']:.2f} sayfa/saniye")
+    for stage, utilization in summary["stage_utilization"].items():
+        print(f"  {stage:<8} meşguliyet: {utilization:.0%}")
+    print("=" * 50)
+
+    with open(os.path.join("output" if args.mode == "v3" else main_puan.folder_path, "stream_summary.json"),
+              "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
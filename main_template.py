@@ -0,0 +1,82 @@
+import argparse
+import functools
+import os
+import time
+
+from image_io import decode_image, read_image_bytes
+from main_batch import collect_images
+from ocr_cache import get_default_cache
+from ocr_engine import create_ocr_engine, create_text_recognizer
+from templates import TemplateRegistry, process_image_with_template
+
+def register(args, registry: TemplateRegistry):
+    img = decode_image(read_image_bytes(args.image))
+    if img is None:
+        print(f"Hata: {args.image} okunamadı!")
+        return
+
+    template = registry.register(args.name, img)
+    counts = {}
+    for field in template.fields:
+        counts[field["kind"]] = counts.get(field["kind"], 0) + 1
+    print(f"✓ Şablon kaydedildi: {template.name} "
+          f"(ad: {counts.get('name', 0)}, numara: {counts.get('id', 0)}, soru: {counts.get('answer', 0)})")
+
+def run(args, registry: TemplateRegistry):
+    image_paths = collect_images(args.source)
+    if not image_paths:
+        print(f"Uyarı: {args.source} içinde görüntü bulunamadı!")
+        return
+
+    os.makedirs("output", exist_ok=True)
+    start_time = time.time()
+    recognizer = create_text_recognizer()
+    load_time = time.time() - start_time
+    # Hizalanamayan kağıtlar için tam motor: ilk gerekince bir kez yüklenir
+    full_ocr = functools.lru_cache(maxsize=None)(create_ocr_engine)
+
+    for i, image_path in enumerate(image_paths, 1):
+        image_start = time.time()
+        process_image_with_template(image_path, registry, args.template, recognizer,
+                                    cache=get_default_cache(), debug=args.debug, ocr_factory=full_ocr)
+        print(f"[{i}/{len(image_paths)}] {image_path}: {time.time() - image_start:.2f} saniye")
+
+    total_time = time.time() - start_time
+    print("\n" + "=" * 50)
+    print(f"Toplam süre: {total_time:.2f} saniye (model yükleme: {load_time:.2f} saniye)")
+    print(f"Ortalama: {(total_time - load_time) / len(image_paths):.2f} saniye/görüntü")
+    print("=" * 50)
+
+def main():
+    parser = argparse.ArgumentParser(description="Şablon modu: bilinen formlarda algılama yapmadan sadece tanıma")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("register", help="Boş formdan şablon kaydet (tam OCR bir kez çalışır)")
+    p.add_argument("image", help="Boş ya da örnek form görüntüsü")
+    p.add_argument("--name", required=True, help="Şablon adı")
+
+    sub.add_parser("list", help="Kayıtlı şablonları listele")
+
+    p = sub.add_parser("run", help="Kağıtları şablona hizalayıp oku")
+    p.add_argument("source", help="Görüntü, klasör ya da glob deseni")
+    p.add_argument("--template", help="Şablon adı (verilmezse en iyi eşleşen seçilir)")
+    p.add_argument("--debug", action="store_true", help="Hizalanmış görüntüyü output/ klasörüne yaz")
+
+    args = parser.parse_args()
+    registry = TemplateRegistry()
+
+    if args.command == "register":
+        register(args, registry)
+    elif args.command == "list":
+        for name in registry.names():
+            print(name)
+    else:
+        # Bilinmeyen şablon adında her sayfa sessizce tam OCR'a düşerdi
+        if args.template and registry.get(args.template) is None:
+            parser.error(f"Şablon bulunamadı: {args.template} (kayıtlı: {', '.join(registry.names()) or 'yok'})")
+        if not args.template and not registry.names():
+            parser.error("Kayıtlı şablon yok; önce 'register' ile şablon kaydedin")
+        run(args, registry)
+
+if __name__ == "__main__":
+    main()
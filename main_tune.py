@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from difflib import SequenceMatcher
+
+import main_puan
+import main_v3
+from image_io import decode_image, read_image_bytes
+from main_batch import collect_images
+from ocr_engine import OCR_PROFILE_PATH, create_ocr_engine, extract_payload, warm_up_image
+
+PIPELINES = {"v3": main_v3, "puan": main_puan}
+
+# Bu benzerliğin altındaki ayarlar (referansa göre OCR metni) elenir
+MIN_TEXT_SIMILARITY = 0.98
+
+# Her worker sürecinde bir kez oluşturulan motor
+_worker_ocr = None
+_worker_mode = None
+
+def _init_worker(mode: str, settings: dict):
+    global _worker_ocr, _worker_mode
+    _worker_mode = mode
+    # Eski profil ölçümü etkilemesin: sadece adayın ayarları
+    _worker_ocr = create_ocr_engine(use_profile=False, **settings)
+    _worker_ocr.predict(warm_up_image())
+
+def _ping(delay: float):
+    # Tüm worker'ların motor yüklemesini ölçüm başlamadan tetikler
+    time.sleep(delay)
+    return os.getpid()
+
+def _run_one(image_path: str):
+    # Uçtan uca kağıt süresi: okuma + çözme + önişleme + OCR
+    start = time.perf_counter()
+    img = decode_image(read_image_bytes(image_path))
+    ocr_input, transform = PIPELINES[_worker_mode].prepare_ocr_input(img)
+    payload = extract_payload(_worker_ocr.predict(ocr_input), transform)
+    return image_path, time.perf_counter() - start, "\n".join(payload["rec_texts"])
+
+def engine_settings(threads: int, mkldnn: bool, det_size: int) -> dict:
+    settings = {"cpu_threads": threads, "enable_mkldnn": mkldnn}
+    # 0: modelin varsayılan algılama boyutu
+    if det_size:
+        settings["text_det_limit_side_len"] = det_size
+        settings["text_det_limit_type"] = "max"
+    return settings
+
+def build_candidates(cpu_count: int, workers_list, threads_list, mkldnn_list, det_sizes):
+    """(worker, motor ayarları) adayları; worker x thread çekirdek sayısını aşmaz"""
+    candidates = []
+    for det_size, mkldnn, workers in itertools.product(det_sizes, mkldnn_list, workers_list):
+        if workers > cpu_count:
+            continue
+        for threads in threads_list or [max(1, cpu_count // workers)]:
+            if workers * threads <= cpu_count:
+                candidates.append((workers, engine_settings(threads, mkldnn, det_size)))
+    return candidates
+
+def percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def measure(image_paths, mode: str, workers: int, settings: dict, repeat: int):
+    """Adayı worker süreçleriyle çalıştır: (verim, gecikmeler, görüntü -> metin)"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(mode, settings)) as executor:
+        # Motor yükleme + ısınma ölçüme girmesin
+        list(executor.map(_ping, [0.2] * workers))
+
+        start = time.perf_counter()
+        futures = [executor.submit(_run_one, path) for _ in range(repeat) for path in image_paths]
+        results = [future.result() for future in futures]
+        wall_time = time.perf_counter() - start
+
+    latencies = sorted(elapsed for _, elapsed, _ in results)
+    texts = {path: text for path, _, text in results}
+    return len(results) / wall_time, latencies, texts
+
+def text_similarity(reference: dict, texts: dict) -> float:
+    return sum(SequenceMatcher(None, reference[p], texts.get(p, "")).ratio() for p in reference) / len(reference)
+
+def parse_list(value: str, cast=int):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Bu makine için en hızlı OCR worker / motor ayarlarını ölç ve profile yaz")
+    parser.add_argument("source", help="Örnek kağıt klasörü ya da glob deseni")
+    parser.add_argument("--mode", choices=sorted(PIPELINES), default="v3")
+    parser.add_argument("--workers", default="1,2,4", help="Denenecek worker (motor) sayıları")
+    parser.add_argument("--threads", help="Motor başına thread sayıları (verilmezse çekirdek / worker)")
+    parser.add_argument("--mkldnn", default="1,0", help="MKLDNN açık/kapalı (1,0)")
+    parser.add_argument("--det-sizes", default="0,1280,960",
+                        help="Algılama giriş boyutu üst sınırları (0: model varsayılanı)")
+    parser.add_argument("--samples", type=int, default=8, help="Kullanılacak en fazla örnek kağıt")
+    parser.add_argument("--repeat", type=int, default=2, help="Her aday için örneklerin kaç kez işleneceği")
+    parser.add_argument("--min-similarity", type=float, default=MIN_TEXT_SIMILARITY,
+                        help="Referansa göre en düşük OCR metin benzerliği")
+    parser.add_argument("--max-p95-ms", type=float, help="Kağıt başına p95 gecikme üst sınırı (API için)")
+    parser.add_argument("--output", default=OCR_PROFILE_PATH, help="Profil dosyası")
+    args = parser.parse_args()
+
+    image_paths = collect_images(args.source)[:max(1, args.samples)]
+    if not image_paths:
+        print(f"Uyarı: {args.source} içinde görüntü bulunamadı!")
+        return
+
+    cpu_count = os.cpu_count() or 1
+    candidates = build_candidates(cpu_count, parse_list(args.workers),
+                                  parse_list(args.threads) if args.threads else None,
+                                  [bool(v) for v in parse_list(args.mkldnn)], parse_list(args.det_sizes))
+    print(f"{len(image_paths)} örnek kağıt, {cpu_count} çekirdek, {len(candidates)} aday ({args.mode} modu)\n")
+
+    # Metin referansı: her zaman profilsiz varsayılan motor (1 worker, ek ayar yok)
+    try:
+        _, _, reference = measure(image_paths, args.mode, 1, {}, 1)
+    except Exception as e:
+        print(f"❌ Varsayılan ayarlarla referans çalıştırılamadı, ayar aranmadı: {e}")
+        return
+
+    print(f"{'Worker':>6}{'Thread':>7}{'MKLDNN':>8}{'Algılama':>10}{'Verim':>10}{'p50':>9}{'p95':>9}{'Metin':>8}")
+
+    rows = []
+    for workers, settings in candidates:
+        try:
+            throughput, latencies, texts = measure(image_paths, args.mode, workers, settings, max(1, args.repeat))
+        except Exception as e:
+            print(f"Hata: {workers} worker, {settings}: {e}")
+            continue
+
+        row = {
+            "workers": workers,
+            "engine": settings,
+            "throughput": round(throughput, 3),
+            "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+            "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "text_similarity": round(text_similarity(reference, texts), 4),
+        }
+        rows.append(row)
+        print(f"{workers:>6}{settings['cpu_threads']:>7}{'açık' if settings['enable_mkldnn'] else 'kapalı':>8}"
+              f"{settings.get('text_det_limit_side_len', 'vars.'):>10}{row['throughput']:>7.2f}/sn"
+              f"{row['latency_p50_ms']:>7.0f}ms{row['latency_p95_ms']:>7.0f}ms{row['text_similarity']:>8.1%}")
+
+    eligible = [row for row in rows if row["text_similarity"] >= args.min_similarity
+                and (args.max_p95_ms is None or row["latency_p95_ms"] <= args.max_p95_ms)]
+    if not eligible:
+        print("\n❌ Koşulları sağlayan ayar bulunamadı, profil yazılmadı")
+        return
+
+    # En yüksek verim; eşitlikte düşük p95 gecikme
+    best = max(eligible, key=lambda row: (row["throughput"], -row["latency_p95_ms"]))
+    profile = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"cpu_count": cpu_count, "platform": platform.platform(), "processor": platform.processor()},
+        "mode": args.mode,
+        "samples": len(image_paths),
+        "workers": best["workers"],
+        "engine": best["engine"],
+        "metrics": {key: best[key] for key in ("throughput", "latency_p50_ms", "latency_p95_ms", "text_similarity")},
+        "candidates": rows,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✓ Seçilen: {best['workers']} worker, {best['engine']} "
+          f"({best['throughput']:.2f} kağıt/sn, p95 {best['latency_p95_ms']:.0f}ms)")
+    print(f"💾 Profil kaydedildi: {args.output} (API, main_batch, main_parallel ve main_stream açılışta okur)")
+
+if __name__ == "__main__":
+    main()
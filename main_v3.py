@@ -4,9 +4,33 @@ import cv2
 import json
 import sys
 import os
-import re
-from paddleocr import PaddleOCR
 import time
+from ocr_engine import create_ocr_engine, extract_payload
+from ocr_cache import get_default_cache, write_ocr_json
+from image_io import read_image_bytes, decode_image
+from roi import apply_roi, variant_suffix
+from metrics import stage_timer
+from result_store import WRITE_JSON_FILES
+from ocr_parsing import correct_common_ocr_errors, parse_answer_sheet
+
+# Önbellek anahtarındaki önişleme varyantı (Otsu, bellekte; JPEG ara dosyası yok)
+# ROI kırpma / küçültme ayarları da anahtara dahil edilir
+PREPROCESS_VARIANT = "otsu" + variant_suffix()
+
+# Sonuç deposundaki kayıt türü (result_store.LAYOUT)
+RESULT_KIND = "processed"
+
+def threshold_image(img):
+    # Gri tonlama + Otsu thresholding (bellekte, dosya yazmadan)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh
+
+def prepare_ocr_input(img):
+    # İçerik alanına kırp/küçült, sonra Otsu; PaddleOCR 3 kanallı girdi beklediği için BGR'ye çevrilir
+    # (girdi, dönüşüm) döner; dönüşüm OCR kutularını orijinal görüntüye taşır
+    img, transform = apply_roi(img)
+    return cv2.cvtColor(threshold_image(img), cv2.COLOR_GRAY2BGR), transform
 
 def preprocess_image(image_path: str):
     # Görüntüyü Otsu thresholding ile önişlemeden geçirir
@@ -18,11 +42,11 @@ def preprocess_image(image_path: str):
         print(f"Hata: {image_path} okunamadı!")
         return None
     
-    # Gri Tonlama
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # İçerik alanına kırpma + küçültme (ROI_* ayarları)
+    img, _ = apply_roi(img)
     
-    # Otsu Thresholding
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Gri Tonlama + Otsu Thresholding
+    thresh = threshold_image(img)
     
     # Önişlenmiş görüntüyü kaydet
     base_name = os.path.splitext(os.path.basename(image_path))[0]
@@ -33,16 +57,13 @@ def preprocess_image(image_path: str):
     
     return preprocessed_path
 
-def run_ocr_on_image(image_path: str):
+def run_ocr_on_image(image_path: str, ocr=None):
     #Resim üzerinde PaddleOCR çalıştırır ve sonuçları JSON olarak kaydeder
+    # ocr verilmezse yeni bir motor oluşturulur (tek seferlik CLI kullanımı)
     print(f"OCR çalıştırılıyor: {image_path}")
     
-    ocr = PaddleOCR(
-        use_doc_orientation_classify=False, 
-        use_doc_unwarping=False, 
-        use_textline_orientation=True,
-        lang = 'tr'
-    )
+    if ocr is None:
+        ocr = create_ocr_engine()
     
     result = ocr.predict(image_path)
     
@@ -52,31 +73,6 @@ def run_ocr_on_image(image_path: str):
     
     return result
 
-def correct_common_ocr_errors(text: str) -> str:
-    # OCR hatalarını düzelt
-    char_map = {
-        'ä': 'ö', 'à': 'a', 'á': 'a', 'â': 'ö', 'ã': 'ö', 'å': 'a', 'ā': 'ö', 'ă': 'ö', 'ą': 'a',
-        'ë': 'e', 'è': 'e', 'é': 'e', 'ê': 'e', 'ē': 'e', 'ĕ': 'e', 'ę': 'ç', 'ė': 'e',
-        'ï': 'i', 'ì': 'i', 'í': 'i', 'î': 'i', 'ĩ': 'i', 'ī': 'i', 'ĭ': 'i', 'į': 'i',
-        'ò': 'ö', 'ó': 'ö', 'ô': 'ö', 'õ': 'ö', 'ø': 'o', 'ō': 'ö', 'ŏ': 'ö', 'ő': 'ö',
-        'ù': 'ü', 'ú': 'ü', 'û': 'ü', 'ũ': 'ü', 'ū': 'ü', 'ŭ': 'ü', 'ů': 'ü', 'ű': 'ü',
-        'ÿ': 'y', 'ý': 'y', 'ŷ': 'g',
-        'ć': 'c', 'ĉ': 'c', 'ċ': 'c', 'č': 'c',
-        'ġ': 'ğ', 'ģ': 'ğ',
-        'ś': 's', 'ŝ': 's','š': 's',
-        'ž': 'z', 'ź': 'z', 'ż': 'z',
-        'ñ': 'n', 'ń': 'n', 'ņ': 'n', 'ň': 'n', 'ŉ': 'n'
-    }
-    
-    text = text.translate(str.maketrans(char_map))
-
-    # sayısal OCR düzeltmeleri
-    text = text.replace('u', '4').replace('U', '4')
-    text = text.replace('o', '0').replace('O', '0')
-    text = text.replace('l', '1').replace('I', '1')
-    
-    return text
-
 def process_ocr_json(json_file_path: str, original_image_path: str):
     # JSON dosyasındaki rec_texts'i işler ve düzenlenmiş çıktı üretir
     print(f"\nJSON işleniyor: {json_file_path}")
@@ -84,6 +80,10 @@ def process_ocr_json(json_file_path: str, original_image_path: str):
     with open(json_file_path, 'r', encoding='utf-8') as f:
         ocr_data = json.load(f)
     
+    return process_ocr_data(ocr_data, original_image_path)
+
+def process_ocr_data(ocr_data: dict, original_image_path: str):
+    # rec_texts / rec_scores içeren OCR verisini (dosya ya da bellek) işler
     rec_texts = ocr_data.get('rec_texts', [])
     rec_scores = ocr_data.get('rec_scores', [])  # Skorları al
     
@@ -91,80 +91,8 @@ def process_ocr_json(json_file_path: str, original_image_path: str):
         print("⚠️ Uyarı: rec_texts boş!")
         return None
     
-    # Verileri düzenle
-    student_name = None
-    student_id = None
-    answers = {}
-    answer_warnings = {}  # Düşük güvenilirlik uyarıları için
-    
-    for i, text in enumerate(rec_texts):
-        text = text.strip()
-        
-        # Ad Soyad bul
-        if "Ad Soyad" in text or "ad soyad" in text.lower() or "Ad soyad" in text:
-            parts = text.split(":")
-            if len(parts) > 1:
-                student_name = parts[1].strip()
-        
-        # Öğrenci Numarası bul
-        elif "Ogrenci No" in text or "Öğrenci No" in text or "ogrenci no" in text.lower():
-            parts = text.split(":")
-            if len(parts) > 1:
-                # OCR hatalarını düzelt
-                raw_id = parts[1].strip()
-                student_id = correct_common_ocr_errors(raw_id)
-                # Sadece rakamları al
-                student_id = ''.join(filter(str.isdigit, student_id))
-        
-        # Soru cevaplarını bul
-        elif "Soru" in text or "soru" in text.lower():
-            # Soru numarasını çıkar
-            match = re.search(r'[Ss]oru\s*(\d+)', text)
-            if match:
-                question_num = int(match.group(1))
-                answer = None
-                low_confidence_indices = []  # Düşük güvenilirlik olan indeksler
-                
-                # Cevabı çıkar
-                if ":" in text:
-                    parts = text.split(":", 1)
-                    if len(parts) > 1:
-                        answer = parts[1].strip()
-                        # İlk satırın skorunu kontrol et
-                        if i < len(rec_scores) and rec_scores[i] < 0.85:
-                            low_confidence_indices.append(i)
-                
-                # Alt satırlara kayan cevaplar için kontrol - sonraki "Soru" görülene kadar devam et
-                j = i + 1
-                while j < len(rec_texts):
-                    next_text = rec_texts[j].strip()
-                    # Sonraki satır yeni bir soru mu kontrol et
-                    if re.search(r'[Ss]oru\s*\d+', next_text):
-                        break
-                    # Soru değilse ve boş değilse, cevaba ekle
-                    if next_text:
-                        # Skorunu kontrol et
-                        if j < len(rec_scores) and rec_scores[j] < 0.85:
-                            low_confidence_indices.append(j)
-                        
-                        if answer:
-                            answer += " " + next_text
-                        else:
-                            answer = next_text
-                    j += 1
-                
-                # Boş cevap kontrolü
-                if not answer or answer == "" or answer.lower() == "boş" or answer.lower() == "bos":
-                    answers[question_num] = "Boş"
-                else:
-                    answers[question_num] = answer
-                    # Düşük güvenilirlik uyarısı ekle
-                    if low_confidence_indices:
-                        answer_warnings[question_num] = {
-                            "warning": "Düşük OCR güvenilirliği",
-                            "low_confidence_scores": [rec_scores[idx] for idx in low_confidence_indices if idx < len(rec_scores)]
-                        }
-    
+    # Ad, numara ve cevaplar tek geçişte ayrıştırılır (ocr_parsing)
+    student_name, student_id, answers, answer_warnings = parse_answer_sheet(rec_texts, rec_scores)
 
     # Düzenlenmiş çıktıyı oluştur
     formatted_output = []
@@ -178,7 +106,10 @@ def process_ocr_json(json_file_path: str, original_image_path: str):
     else:
         formatted_output.append("Cevap bulunamadı")
     
-    # Sonucu JSON olarak kaydet
+    return save_result(student_name, student_id, answers, answer_warnings, original_image_path)
+
+def save_result(student_name, student_id, answers: dict, answer_warnings: dict, original_image_path: str):
+    # Ayrıştırılmış alanlardan sonuç JSON'ını oluşturur ve kaydeder (şablon modu da kullanır)
     result_data = {
         "student_name": student_name,
         "student_id": student_id,
@@ -190,27 +121,93 @@ def process_ocr_json(json_file_path: str, original_image_path: str):
         "empty_questions": len([a for a in answers.values() if a == "Boş"])
     }
 
-    base_name = os.path.splitext(os.path.basename(original_image_path))[0]
-    processed_json = f"output/{base_name}_processed.json"
+    # RESULT_JSON_FILES=0 ise dosya yazılmaz, sonuç çağıranın sonuç deposuna kaydedilir
+    if WRITE_JSON_FILES:
+        base_name = os.path.splitext(os.path.basename(original_image_path))[0]
+        processed_json = f"output/{base_name}_processed.json"
+        
+        with stage_timer("v3", "write"), open(processed_json, 'w', encoding='utf-8') as f:
+            json.dump(result_data, f, indent=2, ensure_ascii=False)
+        
+        print(f"İşlenmiş JSON kaydedildi: {processed_json}")
     
-    with open(processed_json, 'w', encoding='utf-8') as f:
-        json.dump(result_data, f, indent=2, ensure_ascii=False)
+    return result_data
+
+def ocr_json_path(image_path: str) -> str:
+    # Hata ayıklama modunda yazılan OCR çıktısının dosya adı
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return f"output/{base_name}_preprocessed_res.json"
+
+def process_image(image_path: str, ocr=None, cache=None, debug: bool = False):
+    # Önişleme -> OCR -> ayrıştırma adımlarını bellekte çalıştırır
+    # Ara dosyalar (önişlenmiş görüntü, _res.json) sadece debug=True ise yazılır
+    # Her adımın süresi metrics'e "v3" aşamaları olarak kaydedilir
+    with stage_timer("v3", "read"):
+        image_bytes = read_image_bytes(image_path)
+    
+    return process_image_bytes(image_bytes, image_path, ocr, cache, debug)
+
+def process_image_bytes(image_bytes: bytes, image_path: str, ocr=None, cache=None, debug: bool = False):
+    # Bellekteki görüntü baytlarını işler (API yüklemeleri diske yazılmadan buraya gelir)
+    # image_path sadece sonuçtaki ad ve çıktı dosyası adı için kullanılır
+    # 0. Aynı görüntü daha önce işlendiyse OCR'ı atla
+    cache_key = None
+    payload = None
+    if cache is not None:
+        with stage_timer("v3", "cache"):
+            cache_key = cache.make_key(image_bytes, PREPROCESS_VARIANT)
+            payload = cache.get(cache_key)
+        if payload is not None:
+            print(f"OCR sonucu önbellekten alındı: {image_path}")
+    
+    if payload is None:
+        # 1. Görüntü önişleme
+        with stage_timer("v3", "decode"):
+            img = decode_image(image_bytes)
+        if img is None:
+            print(f"Hata: {image_path} okunamadı!")
+            return None
+        
+        with stage_timer("v3", "preprocess"):
+            ocr_input, transform = prepare_ocr_input(img)
+        
+        if debug:
+            base_name = os.path.splitext(os.path.basename(image_path))[0]
+            cv2.imwrite(f"output/{base_name}_preprocessed.jpg", ocr_input)
+        
+        # 2. OCR işlemi (önişlenmiş dizi üzerinde)
+        if ocr is None:
+            with stage_timer("v3", "model_load"):
+                ocr = create_ocr_engine()
+        
+        with stage_timer("v3", "ocr"):
+            payload = extract_payload(ocr.predict(ocr_input), transform)
+        print("OCR tamamlandı!")
+        
+        if cache is not None:
+            with stage_timer("v3", "cache"):
+                cache.put(cache_key, payload)
     
-    print(f"İşlenmiş JSON kaydedildi: {processed_json}")
+    if debug:
+        write_ocr_json(payload, ocr_json_path(image_path))
     
-    return result_data
+    # 3. OCR çıktısını ayrıştır (sonuç dosyasının yazılması ayrıca "write" olarak da ölçülür)
+    with stage_timer("v3", "parse"):
+        return process_ocr_data(payload, image_path)
 
 def main():
     #başlangıç zamanı
     start_time = time.time()
     
     if len(sys.argv) < 2:
-        print("Kullanım: python v3.py \"resim_yolu\"")
+        print("Kullanım: python v3.py \"resim_yolu\" [--debug]")
         print("\nÖrnek:")
         print('python v3.py "examm.jpg"')
+        print("--debug: önişlenmiş görüntüyü ve OCR JSON'ını output/ klasörüne yazar")
         return
     
     image_path = sys.argv[1]
+    debug = "--debug" in sys.argv[2:]
     
     if not os.path.exists(image_path):
         print(f"Hata: {image_path} dosyası bulunamadı!")
@@ -220,26 +217,7 @@ def main():
     if not os.path.exists("output"):
         os.makedirs("output")
     
-    # 1. Görüntü önişleme
-    preprocessed_path = preprocess_image(image_path)
-    
-    if preprocessed_path is None:
-        return
-    
-    # 2. OCR işlemi (önişlenmiş görüntü üzerinde)
-    ocr_result = run_ocr_on_image(preprocessed_path)
-    print("OCR tamamlandı!")
-    
-    # JSON dosyası konumu
-    base_name = os.path.splitext(os.path.basename(preprocessed_path))[0]
-    json_file = f"output/{base_name}_res.json"
-    
-    if os.path.exists(json_file):
-        
-        # 3. JSON'ı işle ve düzenle
-        process_ocr_json(json_file, image_path)
-    else:
-        print(f"⚠️ Uyarı: {json_file} dosyası oluşturulamadı!")
+    process_image(image_path, cache=get_default_cache(), debug=debug)
     
     print("\nİşlem tamamlandı!")
     print("=" * 50)
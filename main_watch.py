@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import main_puan
+import main_v3
+from main_batch import IMAGE_EXTENSIONS
+from ocr_cache import get_default_cache
+from ocr_engine import create_ocr_engine
+from result_store import get_default_result_store
+
+WATCH_MANIFEST_PATH = os.environ.get("WATCH_MANIFEST_PATH", "watch_manifest.sqlite3")
+# Klasörü tarama aralığı (saniye)
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", "2"))
+# Tarayıcı hâlâ yazıyor olabilir: son değişiklikten bu kadar saniye geçmeden dosya alınmaz
+WATCH_SETTLE_SECONDS = float(os.environ.get("WATCH_SETTLE_SECONDS", "2"))
+# Bu kadar denemede başarısız olan dosya "failed" olarak bırakılır
+WATCH_MAX_ATTEMPTS = int(os.environ.get("WATCH_MAX_ATTEMPTS", "3"))
+
+# Verim penceresi (saniye)
+RATE_WINDOW = 60
+
+PIPELINES = {"v3": main_v3, "puan": main_puan}
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class WatchManifest:
+    """İzlenen klasörün kalıcı (SQLite) kaydı
+
+    files: içerik özetine (sha256) göre iş durumu; aynı içerik yeniden
+    adlandırılsa ya da tekrar kopyalansa da bir kez işlenir.
+    seen: yol + boyut + değişiklik zamanı; değişmeyen dosyalar tekrar
+    okunup özetlenmez.
+    """
+
+    def __init__(self, db_path: str = WATCH_MANIFEST_PATH, max_attempts: int = WATCH_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                content_hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                first_seen REAL NOT NULL,
+                finished_at REAL,
+                error TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_status ON files (status, first_seen)")
+        self._conn.commit()
+
+    def is_known(self, path: str, size: int, mtime_ns: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns FROM seen WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def add(self, path: str, size: int, mtime_ns: int, content_hash: str) -> bool:
+        """Dosyayı kaydet; içerik yeniyse kuyruğa ekle (True), daha önce görüldüyse False"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)",
+                               (path, size, mtime_ns, content_hash))
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO files (content_hash, path, status, first_seen) VALUES (?, ?, 'pending', ?)",
+                (content_hash, path, time.time())
+            )
+        return cur.rowcount > 0
+
+    def reset_interrupted(self) -> int:
+        """Önceki çalıştırmada yarıda kalan (processing) işleri kuyruğa geri al
+
+        Deneme hakkı bitmiş olanlar (süreci çökerten dosya) tekrar alınmaz,
+        failed olarak bırakılır. Kuyruğa geri alınanların sayısı döner.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE files SET status = 'failed', error = 'İşlenirken süreç yarıda kaldı' "
+                "WHERE status = 'processing' AND attempts >= ?",
+                (self.max_attempts,)
+            )
+            cur = self._conn.execute("UPDATE files SET status = 'pending' WHERE status = 'processing'")
+        return cur.rowcount
+
+    def claim(self, limit: int) -> list:
+        """En eski bekleyen işleri al ve processing olarak işaretle: [(özet, yol), ...]"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT content_hash, path FROM files WHERE status = 'pending' ORDER BY first_seen LIMIT ?",
+                (limit,)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE files SET status = 'processing', attempts = attempts + 1 WHERE content_hash = ?",
+                [(content_hash,) for content_hash, _ in rows]
+            )
+        return rows
+
+    def finish(self, content_hash: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET status = 'done', finished_at = ?, error = NULL WHERE content_hash = ?",
+                               (time.time(), content_hash))
+
+    def fail(self, content_hash: str, error: str):
+        # Deneme hakkı bitmediyse tekrar kuyruğa
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE files SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ? WHERE content_hash = ?",
+                (self.max_attempts, error, content_hash)
+            )
+
+    def forget(self, content_hash: str, path: str):
+        """Dosya işlenmeden önce değişti ya da silindi
+
+        Aynı içerikte başka bir kopya görüldüyse iş ona aktarılıp tekrar
+        kuyruğa alınır (o kopyanın yolu döner); yoksa kayıt silinir. Değişen
+        dosyanın yeni içeriği sonraki taramada ayrıca eklenir.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM seen WHERE path = ?", (path,))
+            other = self._conn.execute("SELECT path FROM seen WHERE content_hash = ? ORDER BY path LIMIT 1",
+                                       (content_hash,)).fetchone()
+            if other:
+                # Okunamayan kopya deneme hakkından sayılmaz
+                self._conn.execute("UPDATE files SET path = ?, status = 'pending', attempts = attempts - 1 "
+                                   "WHERE content_hash = ?", (other[0], content_hash))
+            else:
+                self._conn.execute("DELETE FROM files WHERE content_hash = ?", (content_hash,))
+        return other[0] if other else None
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        counts = dict(rows)
+        return {status: counts.get(status, 0) for status in ("pending", "processing", "done", "failed")}
+
+class ThroughputMeter:
+    """Son RATE_WINDOW saniyedeki ve oturum boyunca işlenen dosya hızı"""
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self.total = 0
+        self._times = deque()
+
+    def add(self):
+        now = time.time()
+        self.total += 1
+        self._times.append(now)
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+    def rate(self) -> float:
+        """Dosya/dakika (son pencere; pencere dolmadıysa oturum ortalaması)"""
+        now = time.time()
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+        span = min(self.window, now - self.started)
+        return len(self._times) / span * 60 if span > 0 else 0.0
+
+def scan(folder: str, manifest: WatchManifest, recursive: bool = False, settle: float = WATCH_SETTLE_SECONDS) -> int:
+    """Klasördeki yeni / değişmiş görüntüleri manifeste ekle, kuyruğa eklenen sayısı"""
+    added = 0
+    now = time.time()
+    for root, dirs, files in os.walk(folder):
+        if not recursive:
+            dirs.clear()
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if manifest.is_known(path, st.st_size, st.st_mtime_ns) or now - st.st_mtime < settle:
+                continue
+            try:
+                content_hash = file_hash(path)
+            except OSError:
+                continue
+            if manifest.add(path, st.st_size, st.st_mtime_ns, content_hash):
+                added += 1
+    return added
+
+def process_file(pipeline, path: str, content_hash: str, ocr, cache, store, exam_id: str = None):
+    """Tek dosyayı işle; True: tamamlandı, None: dosya değişti/silindi (yeniden taranacak)"""
+    try:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+    except OSError:
+        return None
+    if hashlib.sha256(image_bytes).hexdigest() != content_hash:
+        return None
+
+    result = pipeline.process_image_bytes(image_bytes, path, ocr, cache)
+    if result is None:
+        raise ValueError("Sonuç oluşturulamadı")
+
+    # İş kimliği içerik özetinden: yeniden işleme aynı kaydın üzerine yazar
+    if store is not None:
+        store.put(pipeline.RESULT_KIND, result, f"{pipeline.RESULT_KIND}-{content_hash[:16]}", exam_id)
+    return True
+
+def print_stats(manifest: WatchManifest, meter: ThroughputMeter):
+    counts = manifest.counts()
+    backlog = counts["pending"] + counts["processing"]
+    rate = meter.rate()
+    eta = f", tahmini bitiş: {backlog / rate:.1f} dk" if backlog and rate > 0 else ""
+    print(f"📊 Bu oturum: {meter.total} | tamamlanan: {counts['done']} | bekleyen: {backlog} | "
+          f"başarısız: {counts['failed']} | verim: {rate:.1f} dosya/dk{eta}")
+
+def watch(folder: str, mode: str = "v3", manifest: WatchManifest = None, interval: float = WATCH_INTERVAL,
+          batch_size: int = 8, recursive: bool = False, exam_id: str = None, once: bool = False,
+          ocr=None, cache=None, store=None):
+    """Klasörü izle; yeni / değişmiş görüntüleri sırayla işle
+
+    Tamamlanan dosyalar manifestte içerik özetiyle tutulur; süreç durup
+    yeniden başlatılınca sadece kalan işler işlenir. once=True ise mevcut
+    birikim bitince çıkar.
+    """
+    pipeline = PIPELINES[mode]
+    manifest = manifest or WatchManifest()
+    os.makedirs("output", exist_ok=True)
+    os.makedirs(main_puan.folder_path, exist_ok=True)
+
+    resumed = manifest.reset_interrupted()
+    if resumed:
+        print(f"↻ Yarıda kalan {resumed} iş tekrar kuyruğa alındı")
+
+    if ocr is None:
+        ocr = create_ocr_engine()
+
+    meter = ThroughputMeter()
+    print(f"👀 İzleniyor: {folder} ({mode} modu, her {interval:g} saniyede bir)")
+    print_stats(manifest, meter)
+
+    try:
+        while True:
+            added = scan(folder, manifest, recursive, settle=0 if once else WATCH_SETTLE_SECONDS)
+            if added:
+                print(f"➕ {added} yeni dosya kuyruğa eklendi")
+
+            claimed = manifest.claim(batch_size)
+            for content_hash, path in claimed:
+                start = time.time()
+                try:
+                    if process_file(pipeline, path, content_hash, ocr, cache, store, exam_id) is None:
+                        other = manifest.forget(content_hash, path)
+                        print(f"↷ {path}: işlenmeden önce değişti ya da silindi"
+                              + (f", aynı içerikli {other} kuyruğa alındı" if other else ""))
+                        continue
+                except Exception as e:
+                    manifest.fail(content_hash, str(e))
+                    print(f"✗ {path}: {e}")
+                    continue
+                manifest.finish(content_hash)
+                meter.add()
+                print(f"✓ {path}: {time.time() - start:.2f} saniye")
+
+            if added or claimed:
+                print_stats(manifest, meter)
+
+            if not claimed:
+                if once:
+                    break
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        # İşlenmekte olan dosya "processing" kalır, sonraki açılışta tekrar kuyruğa alınır
+        print("\nDurduruldu")
+        print_stats(manifest, meter)
+
+    return manifest.counts()
+
+def main():
+    parser = argparse.ArgumentParser(description="Tarayıcı klasörünü izle, yeni kağıtları kaldığı yerden devam ederek işle")
+    parser.add_argument("folder", help="İzlenecek klasör")
+    parser.add_argument("--mode", choices=sorted(PIPELINES), default="v3",
+                        help="v3: cevap kağıdı, puan: puan kağıdı")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Tarama aralığı (saniye)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Taramalar arasında işlenecek en fazla dosya")
+    parser.add_argument("--recursive", action="store_true", help="Alt klasörleri de izle")
+    parser.add_argument("--manifest", default=WATCH_MANIFEST_PATH, help="Manifest dosyası")
+    parser.add_argument("--exam-id", help="Sonuç deposunda kayıtların sınav kimliği")
+    parser.add_argument("--once", action="store_true", help="Mevcut dosyaları işle ve çık (izleme yok)")
+    parser.add_argument("--no-cache", action="store_true", help="OCR önbelleğini kullanma")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"{args.folder} bir klasör değil")
+
+    watch(args.folder, args.mode, WatchManifest(args.manifest), args.interval, max(1, args.batch_size),
+          args.recursive, args.exam_id, args.once,
+          cache=None if args.no_cache else get_default_cache(), store=get_default_result_store())
+
+if __name__ == "__main__":
+    main()
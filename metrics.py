@@ -0,0 +1,222 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Süre histogramlarının kova sınırları (saniye)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# İstek kayıtları (JSON satırları) varsayılan olarak stderr'e, ayarlanırsa dosyaya yazılır
+REQUEST_LOG_FILE = os.environ.get("REQUEST_LOG_FILE")
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Değeri set/inc ile ya da her okumada fn() ile belirlenen ölçüm"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), fn=None, kind: str = None):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+        if kind:
+            self.kind = kind
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self.fn is None:
+            return super().render()
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Prometheus metin biçiminde dışa aktarılan ölçümler"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames=(), fn=None, kind: str = None) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames, fn, kind))
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ocr_stage_duration_seconds", "Pipeline aşama süreleri", ("pipeline", "stage"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Uç nokta bazında istek süreleri", ("method", "endpoint", "status"))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "İşlenmekte olan HTTP istekleri")
+LLM_CALLS = REGISTRY.counter(
+    "llm_judgements_total", "LLM benzerlik kararları (source: cache ya da model)", ("source",))
+LLM_ERRORS = REGISTRY.counter(
+    "llm_errors_total", "Başarısız LLM çağrıları")
+
+# Aktif isteğin aşama süreleri; iş parçacıklarına contextvars kopyasıyla taşınır
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+class RequestTimings:
+    """Tek bir isteğin aşama bazında toplam süreleri"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, elapsed: float):
+        with self._lock:
+            self.stages[key] = self.stages.get(key, 0.0) + elapsed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {key: round(elapsed * 1000, 2) for key, elapsed in self.stages.items()}
+
+def record_stage(pipeline: str, stage: str, elapsed: float):
+    """Ölçülmüş süreyi aşama histogramına ve (varsa) aktif isteğin kaydına ekle"""
+    STAGE_SECONDS.observe(elapsed, pipeline=pipeline, stage=stage)
+    timings = _current_request.get()
+    if timings is not None:
+        timings.add(f"{pipeline}.{stage}", elapsed)
+
+@contextmanager
+def stage_timer(pipeline: str, stage: str):
+    """Bloğun süresini aşama olarak kaydet"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(pipeline, stage, time.perf_counter() - start)
+
+def begin_request() -> tuple:
+    """Yeni istek kaydı başlat: (RequestTimings, reset token)"""
+    timings = RequestTimings()
+    return timings, _current_request.set(timings)
+
+def end_request(token):
+    _current_request.reset(token)
+
+def _request_logger():
+    logger = logging.getLogger("ocr.requests")
+    if not logger.handlers:
+        handler = logging.FileHandler(REQUEST_LOG_FILE, encoding="utf-8") if REQUEST_LOG_FILE else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def log_request(record: dict):
+    """İstek kaydını tek satır JSON olarak yaz"""
+    _request_logger().info(json.dumps(record, ensure_ascii=False))
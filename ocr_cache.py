@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+
+from ocr_engine import cache_settings
+
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", "ocr_cache")
+OCR_CACHE_MAX_MB = float(os.environ.get("OCR_CACHE_MAX_MB", "256"))
+
+# Önbellekte tutulan OCR alanları (save_to_json çıktısından)
+PAYLOAD_KEYS = ("rec_texts", "rec_scores", "rec_boxes")
+
+class OCRCache:
+    """Görüntü içeriğine göre adreslenen, boyut sınırlı (LRU) OCR sonuç önbelleği
+
+    Anahtar: görüntü baytlarının SHA-256 özeti + OCR ayarları (dil, yön
+    bayrakları) + önişleme varyantı. Değer: rec_texts / rec_scores / rec_boxes.
+    """
+
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR, max_mb: float = OCR_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def make_key(self, image_bytes: bytes, variant: str, settings: dict = None) -> str:
+        """Görüntü baytları, OCR ayarları ve önişleme varyantından anahtar üret"""
+        config = {
+            "settings": settings if settings is not None else cache_settings(),
+            "variant": variant,
+        }
+        h = hashlib.sha256(image_bytes)
+        h.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        # (yol, son erişim zamanı, boyut)
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def get(self, key: str):
+        """Önbellekteki OCR sonucunu döndür, yoksa None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # LRU: erişim zamanını güncelle
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict):
+        """OCR sonucunu kaydet, sınır aşılırsa en eski kayıtları sil"""
+        data = {k: payload.get(k, []) for k in PAYLOAD_KEYS}
+        encoded = json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+
+        # Eski boyut ve değiştirme aynı kilit altında: aynı anahtara yarışan
+        # iki put eski kaydı iki kez saymaz
+        with self._lock:
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            self._size += len(encoded) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Boyut sınırın %90'ına inene kadar en az yakın zamanda kullanılanları sil
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(size for _, _, size in entries)
+
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+def write_ocr_json(payload: dict, json_file_path: str):
+    """OCR sonucunu process_ocr_json'ın okuyabildiği _res.json biçiminde yaz"""
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        json.dump({k: payload.get(k, []) for k in PAYLOAD_KEYS}, f, ensure_ascii=False)
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_default_cache():
+    """Süreç genelinde paylaşılan önbellek; OCR_CACHE_DISABLED=1 ise None"""
+    global _default_cache
+    if os.environ.get("OCR_CACHE_DISABLED") == "1":
+        return None
+    # Çift kontrol: oluşturulduktan sonra her çağrıda kilit beklenmez
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = OCRCache()
+    return _default_cache
@@ -0,0 +1,140 @@
+import json
+import os
+import queue
+from contextlib import contextmanager
+
+from metrics import stage_timer
+
+# run_ocr_on_image'in kullandığı PaddleOCR ayarları
+OCR_SETTINGS = {
+    "use_doc_orientation_classify": False,
+    "use_doc_unwarping": False,
+    "use_textline_orientation": True,
+    "lang": "tr",
+}
+
+# Şablon modunda (algılama yapılmadan) kırpılmış satırlar için tanıma modeli
+TEXT_REC_MODEL = os.environ.get("TEXT_REC_MODEL", "latin_PP-OCRv5_mobile_rec")
+# Aşama ölçümlerinde ayrı çalıştırılan algılama modeli
+TEXT_DET_MODEL = os.environ.get("TEXT_DET_MODEL", "PP-OCRv5_server_det")
+
+# main_tune.py'nin bu makine için seçtiği ayarlar (worker sayısı + motor ayarları)
+OCR_PROFILE_PATH = os.environ.get("OCR_PROFILE_PATH", "ocr_profile.json")
+
+# Profilden PaddleOCR'a aktarılan motor ayarları
+PROFILE_ENGINE_KEYS = ("cpu_threads", "enable_mkldnn", "text_det_limit_side_len", "text_det_limit_type")
+# OCR çıktısını değiştirebilen ayarlar; önbellek anahtarına da girer
+PROFILE_RESULT_KEYS = ("text_det_limit_side_len", "text_det_limit_type")
+
+_profiles = {}
+
+def load_ocr_profile(path: str = None) -> dict:
+    """Ayar profilini oku (süreç başına bir kez); dosya yoksa ya da bozuksa boş sözlük"""
+    path = path or OCR_PROFILE_PATH
+    if path not in _profiles:
+        profile = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    profile = json.load(f)
+                print(f"OCR profili yüklendi: {path} (worker: {profile.get('workers')}, motor: {profile.get('engine')})")
+            except (OSError, ValueError) as e:
+                print(f"Uyarı: OCR profili okunamadı, varsayılanlar kullanılıyor: {path} ({e})")
+        _profiles[path] = profile
+    return _profiles[path]
+
+def profile_engine_settings() -> dict:
+    """Profildeki PaddleOCR ayarları (create_ocr_engine'e otomatik eklenir)"""
+    engine = load_ocr_profile().get("engine", {})
+    return {key: engine[key] for key in PROFILE_ENGINE_KEYS if key in engine}
+
+def profile_workers(default: int) -> int:
+    """Profildeki worker (motor) sayısı, profil yoksa default"""
+    return int(load_ocr_profile().get("workers") or default)
+
+def cache_settings() -> dict:
+    """OCR önbellek anahtarına giren ayarlar: temel ayarlar + çıktıyı etkileyen profil ayarları"""
+    engine = profile_engine_settings()
+    return {**OCR_SETTINGS, **{key: engine[key] for key in PROFILE_RESULT_KEYS if key in engine}}
+
+# paddleocr ağır bir import; sadece motor gerçekten oluşturulurken yüklenir
+# (ayrıştırma / değerlendirme / benchmark kodu paddle kurulu olmadan da çalışır)
+
+def create_ocr_engine(use_profile: bool = True, **overrides):
+    """Varsayılan ayarlar + ayar profiliyle yeni bir PaddleOCR motoru oluştur (overrides önceliklidir)"""
+    from paddleocr import PaddleOCR
+    settings = {**OCR_SETTINGS, **(profile_engine_settings() if use_profile else {}), **overrides}
+    return PaddleOCR(**settings)
+
+def create_text_recognizer(**overrides):
+    """Sadece metin tanıma yapan model (satır görüntüsü -> metin)"""
+    from paddleocr import TextRecognition
+    settings = {"model_name": TEXT_REC_MODEL, **overrides}
+    return TextRecognition(**settings)
+
+def create_text_detector(**overrides):
+    """Sadece metin algılama yapan model (sayfa -> satır çokgenleri)"""
+    from paddleocr import TextDetection
+    settings = {"model_name": TEXT_DET_MODEL, **overrides}
+    return TextDetection(**settings)
+
+class OCREnginePool:
+    """Başlangıçta yüklenip sıcak tutulan PaddleOCR motorları havuzu
+
+    PaddleOCR örnekleri thread-safe olmadığı için her motor aynı anda
+    yalnızca tek bir istek tarafından kullanılır.
+    """
+
+    def __init__(self, size: int = 1, **overrides):
+        self.size = size
+        self._engines = queue.Queue()
+        
+        for i in range(size):
+            print(f"OCR motoru yükleniyor ({i + 1}/{size})...")
+            with stage_timer("ocr_pool", "model_load"):
+                self._engines.put(create_ocr_engine(**overrides))
+
+    def warm_up(self):
+        """Her motorda bir sahte çıkarım çalıştır (ilk istekte graf kurulumu beklenmesin)"""
+        for i in range(self.size):
+            # Kuyruk FIFO olduğu için art arda alımlar motorları sırayla verir
+            with self.acquire() as engine, stage_timer("ocr_pool", "warm_up"):
+                engine.predict(warm_up_image())
+
+    @contextmanager
+    def acquire(self, timeout: float = None):
+        """Havuzdan boş bir motor al, iş bitince geri bırak"""
+        with stage_timer("ocr_pool", "wait"):
+            engine = self._engines.get(timeout=timeout)
+        try:
+            yield engine
+        finally:
+            self._engines.put(engine)
+
+def warm_up_image():
+    """Algılama + tanıma adımlarını tetikleyen küçük, yazılı sahte görüntü"""
+    import cv2
+    import numpy as np
+
+    img = np.full((160, 640, 3), 255, np.uint8)
+    cv2.putText(img, "Soru 1: Ankara", (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    return img
+
+def extract_payload(result, transform=None) -> dict:
+    """predict sonucundan rec_texts / rec_scores / rec_boxes alanlarını al (save_to_json'a gerek kalmadan)
+
+    transform (roi.ROITransform) verilirse kutular kırpılmamış orijinal
+    görüntünün koordinatlarına çevrilir.
+    """
+    for res in result:
+        payload = {
+            "rec_texts": [str(t) for t in res["rec_texts"]],
+            "rec_scores": [float(s) for s in res["rec_scores"]],
+        }
+        boxes = res.get("rec_boxes")
+        if boxes is not None and len(boxes):
+            if transform is not None:
+                boxes = transform.to_original(boxes)
+            payload["rec_boxes"] = [[round(float(v), 1) for v in box] for box in boxes]
+        return payload
+    return {"rec_texts": [], "rec_scores": []}
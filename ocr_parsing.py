@@ -0,0 +1,165 @@
+import re
+
+from text_normalize import OCR_CHAR_MAP
+
+# Cevap kağıdı: sayısal alanlarda (öğrenci no) harfe benzeyen rakamlar
+DIGIT_FIXES = {'u': '4', 'U': '4', 'o': '0', 'O': '0', 'l': '1', 'I': '1'}
+
+# Puan kağıdı: rakam ve "p" harfine benzeyen karakterler (rho da p'ye dönüşür)
+SCORE_FIXES = {
+    's': '3', 'S': '3',
+    'f': 'p', 'F': 'p',
+    'l': '1', 'I': '1',
+    'o': '0', 'O': '0',
+    'ğ': '9', 'Ğ': '9',
+    'ş': '6', 'Ş': '6',
+    'ı': '1', 'İ': '1',
+    'ρ': 'p', 'P': 'p',
+}
+
+# Karakter düzeltmesi + rakam düzeltmesi tek translate çağrısında
+# (ø -> o -> 0 gibi zincirleme dönüşümler tabloya önceden işlenir)
+ANSWER_SHEET_TRANSLATION = str.maketrans({
+    **DIGIT_FIXES,
+    **{wrong: DIGIT_FIXES.get(right, right) for wrong, right in OCR_CHAR_MAP.items()},
+})
+SCORE_SHEET_TRANSLATION = str.maketrans(SCORE_FIXES)
+
+QUESTION_RE = re.compile(r'[Ss]oru\s*(\d+)')
+SCORE_WITH_QUESTION_RE = re.compile(r'(\d+)\s*[pPρ]\s*=\s*(\d+)')
+SCORE_RE = re.compile(r'[pPρ]\s*=\s*(\d+)')
+NUMBER_RE = re.compile(r'(\d+)')
+NUMBERED_LINE_RE = re.compile(r'(\d+)\.')
+
+# Bu skorun altındaki satırlar cevapta "düşük güvenilirlik" uyarısı üretir
+LOW_CONFIDENCE_THRESHOLD = 0.85
+
+# Puan kağıdında geçerli soru numarası aralığı
+MIN_QUESTION, MAX_QUESTION = 1, 50
+
+def correct_common_ocr_errors(text: str) -> str:
+    """Cevap kağıdı OCR düzeltmesi: Türkçe karakter + sayısal (u->4, o->0, l->1)"""
+    return text.translate(ANSWER_SHEET_TRANSLATION)
+
+def correct_ocr_errors(text: str) -> str:
+    """Puan kağıdı OCR düzeltmesi: rakamlar ve "p" harfi"""
+    return text.translate(SCORE_SHEET_TRANSLATION)
+
+def _finish_question(question, rec_scores, answers: dict, answer_warnings: dict):
+    question_num, answer, low_confidence_indices = question
+
+    if not answer or answer.lower() == "boş" or answer.lower() == "bos":
+        answers[question_num] = "Boş"
+        return
+
+    answers[question_num] = answer
+    if low_confidence_indices:
+        answer_warnings[question_num] = {
+            "warning": "Düşük OCR güvenilirliği",
+            "low_confidence_scores": [rec_scores[idx] for idx in low_confidence_indices if idx < len(rec_scores)]
+        }
+
+def parse_answer_sheet(rec_texts, rec_scores):
+    """Cevap kağıdı satırlarını tek geçişte ayrıştır
+
+    Bir "Soru N" satırı yeni soruyu başlatır; sonraki "Soru N" satırına kadar
+    gelen boş olmayan satırlar (alt satıra kayan cevap) cevaba eklenir.
+    Dönüş: (ad soyad, öğrenci no, cevaplar, düşük güvenilirlik uyarıları)
+    """
+    student_name = None
+    student_id = None
+    answers = {}
+    answer_warnings = {}
+    score_count = len(rec_scores)
+
+    # Açık soru: [soru no, cevap, düşük skorlu satır indeksleri]
+    question = None
+
+    for i, text in enumerate(rec_texts):
+        text = text.strip()
+        lower = text.lower()
+        boundary = QUESTION_RE.search(text)
+
+        # Her "Soru N" satırı (ad/numara satırı olsa bile) açık soruyu kapatır
+        if boundary is not None and question is not None:
+            _finish_question(question, rec_scores, answers, answer_warnings)
+            question = None
+
+        if "ad soyad" in lower:
+            parts = text.split(":")
+            if len(parts) > 1:
+                student_name = parts[1].strip()
+
+        elif "ogrenci no" in lower or "Öğrenci No" in text:
+            parts = text.split(":")
+            if len(parts) > 1:
+                # OCR hatalarını düzelt, sadece rakamları al
+                student_id = ''.join(filter(str.isdigit, correct_common_ocr_errors(parts[1].strip())))
+
+        elif boundary is not None:
+            answer = None
+            low_confidence_indices = []
+            if ":" in text:
+                answer = text.split(":", 1)[1].strip()
+                if i < score_count and rec_scores[i] < LOW_CONFIDENCE_THRESHOLD:
+                    low_confidence_indices.append(i)
+            question = [int(boundary.group(1)), answer, low_confidence_indices]
+            continue
+
+        # Alt satıra kayan cevap (ad/numara satırları da açık soruya eklenir)
+        if question is not None and boundary is None and text:
+            if i < score_count and rec_scores[i] < LOW_CONFIDENCE_THRESHOLD:
+                question[2].append(i)
+            question[1] = question[1] + " " + text if question[1] else text
+
+    if question is not None:
+        _finish_question(question, rec_scores, answers, answer_warnings)
+
+    return student_name, student_id, answers, answer_warnings
+
+def extract_scores_from_text(text: str, all_scores: dict):
+    """Tek satırdaki puanları all_scores'a ekle ("1p=7" ya da "7. ... p=7" biçimleri)"""
+    corrected_text = text.translate(SCORE_SHEET_TRANSLATION)
+
+    # Her iki biçim de "=" içerir; puan olmayan satırlar regex'e hiç girmez
+    if "=" not in corrected_text:
+        return
+
+    # Format: 1p=7, 5p=7, 6p=7 (p harfi yerine f, ρ de olabilir)
+    for q_num, score in SCORE_WITH_QUESTION_RE.findall(corrected_text):
+        all_scores[int(q_num)] = int(score)
+
+    # Format: p=7, p= 7 (boşluklu)
+    matches = SCORE_RE.findall(corrected_text)
+    if not matches:
+        return
+
+    numbers_in_text = NUMBER_RE.findall(text)
+    question_match = NUMBERED_LINE_RE.search(text)
+    question_num = int(question_match.group(1)) if question_match else None
+    lowered = corrected_text.lower()
+
+    for score_match in matches:
+        score = int(score_match)
+
+        # Önce aynı satırda soru numarası ara (örn: "7. ... p=7")
+        if question_num is not None and question_num not in all_scores and MIN_QUESTION <= question_num <= MAX_QUESTION:
+            all_scores[question_num] = score
+            continue
+
+        # Yoksa "Np" / "N p" olarak geçen diğer sayıları dene
+        for num in numbers_in_text:
+            num_int = int(num)
+            if num_int not in all_scores and MIN_QUESTION <= num_int <= MAX_QUESTION:
+                if f"{num}p" in lowered or f"{num} p" in lowered:
+                    all_scores[num_int] = score
+                    break
+
+def parse_score_sheet(rec_texts) -> dict:
+    """Puan kağıdı satırlarını tek geçişte ayrıştır: {soru no: puan}"""
+    all_scores = {}
+    for text in rec_texts:
+        text = text.strip()
+        if text:
+            extract_scores_from_text(text, all_scores)
+    return all_scores
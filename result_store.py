@@ -0,0 +1,200 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+RESULT_STORE_PATH = os.environ.get("RESULT_STORE_PATH", "results.sqlite3")
+
+# 0 ise sonuçlar sadece veritabanına yazılır; JSON düzeni gerekirse export ile üretilir
+WRITE_JSON_FILES = os.environ.get("RESULT_JSON_FILES", "1") == "1"
+
+# Sonuç türü -> (klasör, dosya eki): mevcut JSON dosya düzeni
+LAYOUT = {
+    "processed": ("output", "_processed.json"),
+    "scores": ("output(puan)", "_scores.json"),
+    "evaluation": ("output_llm", "_evaluation.json"),
+}
+
+# Toplu yazmada tek işlemde gönderilen kayıt sayısı
+BULK_CHUNK = 500
+
+def student_of(data: dict):
+    """Sonuçtaki öğrenci numarası (cevap kağıdı: student_id, değerlendirme: ogrenci_no)"""
+    student_id = data.get("student_id") or data.get("ogrenci_no")
+    return str(student_id) if student_id else None
+
+def result_name(data: dict, job_id: str) -> str:
+    """Dışa aktarılan dosyanın taban adı: görüntü adı, yoksa iş kimliği"""
+    image_path = data.get("image_path")
+    if image_path:
+        return os.path.splitext(os.path.basename(image_path))[0]
+    return job_id
+
+class ResultStore:
+    """İşlenmiş kağıtlar, puanlar ve değerlendirmeler için indeksli (SQLite) sonuç deposu
+
+    Her kayıt iş kimliği (job_id) ile saklanır; öğrenci numarası ve sınav
+    kimliği (exam_id, genelde cevap anahtarı kimliği) üzerinden sorgulanır.
+    """
+
+    def __init__(self, db_path: str = RESULT_STORE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                student_id TEXT,
+                exam_id TEXT,
+                name TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_student ON results (student_id, kind)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_exam ON results (exam_id, kind)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_kind ON results (kind, created_at)")
+        self._conn.commit()
+
+    def _row(self, kind: str, data: dict, job_id: str = None, exam_id: str = None,
+             name: str = None, student_id: str = None) -> tuple:
+        if kind not in LAYOUT:
+            raise ValueError(f"Bilinmeyen sonuç türü: {kind}")
+        job_id = job_id or str(uuid.uuid4())
+        return (
+            job_id,
+            kind,
+            student_id or student_of(data),
+            exam_id,
+            name or result_name(data, job_id),
+            time.time(),
+            json.dumps(data, ensure_ascii=False),
+        )
+
+    def put(self, kind: str, data: dict, job_id: str = None, exam_id: str = None,
+            name: str = None, student_id: str = None) -> str:
+        """Tek sonucu kaydet (aynı job_id varsa üzerine yazar), job_id döndür"""
+        row = self._row(kind, data, job_id, exam_id, name, student_id)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self._conn.commit()
+        return row[0]
+
+    def put_many(self, records) -> list:
+        """Toplu kayıt: her öğe put() argümanlarıyla aynı anahtarları taşıyan dict
+
+        Kayıtlar BULK_CHUNK'lık işlemlerle yazılır; job_id listesi döner.
+        """
+        rows = [self._row(**record) for record in records]
+        with self._lock:
+            for i in range(0, len(rows), BULK_CHUNK):
+                with self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                           rows[i:i + BULK_CHUNK])
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _record(row) -> dict:
+        job_id, kind, student_id, exam_id, name, created_at, data = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "student_id": student_id,
+            "exam_id": exam_id,
+            "name": name,
+            "created_at": created_at,
+            "data": json.loads(data),
+        }
+
+    def get(self, job_id: str):
+        """job_id ile kaydı döndür, yoksa None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM results WHERE job_id = ?", (job_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def query(self, kind: str = None, exam_id: str = None, student_id: str = None,
+              limit: int = None, offset: int = 0) -> list:
+        """Filtrelere uyan kayıtlar, en eskiden en yeniye (örn. bir sınavın tüm değerlendirmeleri)"""
+        clauses, params = [], []
+        for column, value in (("kind", kind), ("exam_id", exam_id), ("student_id", student_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        sql = "SELECT * FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at, job_id LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def export(self, root: str = ".", kind: str = None, exam_id: str = None, student_id: str = None) -> int:
+        """Kayıtları mevcut JSON düzenine yaz (output/, output(puan)/, output_llm/), yazılan dosya sayısı"""
+        count = 0
+        for record in self.query(kind, exam_id, student_id):
+            folder, suffix = LAYOUT[record["kind"]]
+            os.makedirs(os.path.join(root, folder), exist_ok=True)
+            with open(os.path.join(root, folder, record["name"] + suffix), "w", encoding="utf-8") as f:
+                json.dump(record["data"], f, indent=2, ensure_ascii=False)
+            count += 1
+        return count
+
+    def import_layout(self, root: str = ".", exam_id: str = None) -> int:
+        """Eski JSON dosyalarını depoya aktar (dosya adı iş kimliği olur), aktarılan kayıt sayısı"""
+        records = []
+        for kind, (folder, suffix) in LAYOUT.items():
+            for path in sorted(glob.glob(os.path.join(glob.escape(os.path.join(root, folder)), "*" + suffix))):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Atlandı: {path} ({e})")
+                    continue
+                name = os.path.basename(path)[:-len(suffix)]
+                records.append({"kind": kind, "data": data, "job_id": f"{kind}:{name}",
+                                "exam_id": exam_id, "name": name})
+        self.put_many(records)
+        return len(records)
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM results GROUP BY kind").fetchall()
+        counts = dict(rows)
+        return {"entries": sum(counts.values()), **{kind: counts.get(kind, 0) for kind in LAYOUT}}
+
+def write_result_json(kind: str, data: dict, name: str, root: str = "."):
+    """Sonucu mevcut düzendeki JSON dosyasına yaz (RESULT_JSON_FILES=1 iken pipeline'lar kullanır)"""
+    folder, suffix = LAYOUT[kind]
+    path = os.path.join(root, folder, name + suffix)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return path
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_default_result_store():
+    """Süreç genelinde paylaşılan sonuç deposu; RESULT_STORE_DISABLED=1 ise None"""
+    global _default_store
+    if os.environ.get("RESULT_STORE_DISABLED") == "1":
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ResultStore()
+    return _default_store
@@ -0,0 +1,131 @@
+import os
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# İçerik alanına kırpma (boş kenar boşlukları OCR'a gönderilmez)
+# Varsayılan kapalı: kurulum bench_roi ile kendi kağıtlarında ölçüp açar
+ROI_CROP = os.environ.get("ROI_CROP", "0") == "1"
+# Hedef yazı yüksekliği (piksel); 0 ise küçültme yapılmaz
+ROI_TARGET_TEXT_HEIGHT = int(os.environ.get("ROI_TARGET_TEXT_HEIGHT", "0"))
+# Kırpılan alanın çevresine eklenen pay (içerik boyutunun oranı)
+ROI_MARGIN = float(os.environ.get("ROI_MARGIN", "0.03"))
+# Küçültmede uzun kenarın altına inilmeyecek sınır
+ROI_MIN_SIDE = int(os.environ.get("ROI_MIN_SIDE", "960"))
+
+# İçerik analizi bu boyuta küçültülmüş kopya üzerinde yapılır
+ANALYSIS_SIDE = 1000
+
+@dataclass(frozen=True)
+class ROITransform:
+    """Kırpılmış/küçültülmüş görüntüden orijinal görüntü koordinatlarına dönüşüm
+
+    orijinal = işlenmiş / scale + (x, y)
+    """
+    x: int = 0
+    y: int = 0
+    scale: float = 1.0
+
+    @property
+    def is_identity(self) -> bool:
+        return self.x == 0 and self.y == 0 and self.scale == 1.0
+
+    def to_original(self, points):
+        """(N, 2) noktaları ya da (N, 4) [x1, y1, x2, y2] kutuları orijinal koordinatlara çevir"""
+        pts = np.asarray(points, dtype=np.float32)
+        offset = np.array([self.x, self.y] * (pts.shape[-1] // 2), dtype=np.float32)
+        return pts / self.scale + offset
+
+def variant_suffix(crop: bool = ROI_CROP, target_text_height: int = ROI_TARGET_TEXT_HEIGHT) -> str:
+    """OCR önbellek anahtarına eklenecek ayar etiketi (farklı ayar -> farklı kayıt)"""
+    suffix = ""
+    if crop:
+        suffix += f"+roi{ROI_MARGIN:g}"
+    if target_text_height > 0:
+        suffix += f"+h{target_text_height}-{ROI_MIN_SIDE}"
+    return suffix
+
+def _ink_mask(gray):
+    # Koyu (yazı) pikseller beyaz; Otsu ters eşikleme
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return mask
+
+def _text_components(mask):
+    """Yazı karakteri boyutundaki bağlı bileşenler: (x, y, w, h) dizisi"""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]  # 0: arka plan
+    img_h, img_w = mask.shape[:2]
+
+    x, y, w, h, area = stats.T
+    keep = (
+        (area >= 4)
+        & (h >= 3)
+        & (h < img_h * 0.2)
+        & (w < img_w * 0.5)
+        # Görüntü kenarına değen gölge / kağıt kenarı bileşenleri
+        & (x > 0) & (y > 0) & (x + w < img_w) & (y + h < img_h)
+    )
+    return stats[keep][:, :4]
+
+def find_content_box(img, margin: float = ROI_MARGIN):
+    """Yazılı içeriğin sınır kutusu (x1, y1, x2, y2), orijinal koordinatlarda; içerik yoksa None"""
+    img_h, img_w = img.shape[:2]
+    factor = min(1.0, ANALYSIS_SIDE / max(img_h, img_w))
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    boxes = _text_components(_ink_mask(gray))
+    if len(boxes) == 0:
+        return None
+
+    x1 = boxes[:, 0].min()
+    y1 = boxes[:, 1].min()
+    x2 = (boxes[:, 0] + boxes[:, 2]).max()
+    y2 = (boxes[:, 1] + boxes[:, 3]).max()
+
+    pad_x = (x2 - x1) * margin
+    pad_y = (y2 - y1) * margin
+    return (
+        max(0, int((x1 - pad_x) / factor)),
+        max(0, int((y1 - pad_y) / factor)),
+        min(img_w, int(np.ceil((x2 + pad_x) / factor))),
+        min(img_h, int(np.ceil((y2 + pad_y) / factor))),
+    )
+
+def estimate_text_height(img) -> float:
+    """Karakter yüksekliğinin medyanı (piksel); yazı bulunamazsa 0"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    boxes = _text_components(_ink_mask(gray))
+    if len(boxes) == 0:
+        return 0.0
+    return float(np.median(boxes[:, 3]))
+
+def apply_roi(img, crop: bool = ROI_CROP, target_text_height: int = ROI_TARGET_TEXT_HEIGHT,
+              margin: float = ROI_MARGIN, min_side: int = ROI_MIN_SIDE):
+    """İçerik alanına kırp ve yazı yüksekliği hedefe inecek şekilde küçült
+
+    (işlenmiş görüntü, ROITransform) döner; görüntü hiçbir zaman büyütülmez.
+    """
+    x = y = 0
+    if crop:
+        box = find_content_box(img, margin)
+        if box is not None:
+            x, y, x2, y2 = box
+            img = img[y:y2, x:x2]
+
+    scale = 1.0
+    if target_text_height > 0:
+        text_height = estimate_text_height(img)
+        if text_height > target_text_height:
+            scale = target_text_height / text_height
+            # Çok küçük görüntüde algılama modeli satırları kaçırır
+            scale = max(scale, min(1.0, min_side / max(img.shape[:2])))
+        if scale < 1.0:
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+
+    return img, ROITransform(x, y, scale)
@@ -0,0 +1,107 @@
+"""main_evaluate.string_similarity için hızlı benzerlik motoru
+
+Skorlar eski difflib tabanlı uygulamayla birebir aynıdır (tolerans: 0).
+Hızlanma üç yerden gelir:
+
+- normalize edilmiş metinler ve kelime listeleri önbellekte tutulur,
+- kelime eşleştirmede SequenceMatcher'ın üst sınırları (uzunluk oranı ve
+  karakter çokluk kümesi) 0.75 eşiğine karşı erken eleme yapar, tam
+  eşleşen kelimeler küme aramasıyla bulunur ve kelime çiftleri önbelleğe
+  alınır,
+- score_cutoff verilirse (örn. 85 / 30 eşikleri) üst sınırı eşiğin altında
+  kalan çiftler için hesaplama hiç yapılmadan 0 döner.
+
+Ölçüm için: python bench_similarity.py
+"""
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from text_normalize import normalize_text
+
+# Kelime eşleşmesi için SequenceMatcher oran eşiği (eski davranış: > 0.75)
+WORD_MATCH_THRESHOLD = 0.75
+
+CACHE_SIZE = 65536
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_normalize(text: str) -> str:
+    return normalize_text(text)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _split_words(normalized: str):
+    return tuple(normalized.split())
+
+def _ratio_bound(len1: int, len2: int) -> float:
+    # SequenceMatcher.real_quick_ratio ile aynı formül
+    return 2.0 * min(len1, len2) / (len1 + len2)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def words_match(w1: str, w2: str) -> bool:
+    """SequenceMatcher(None, w1, w2).ratio() > 0.75 ile aynı sonuç"""
+    if w1 == w2:
+        return True
+    if _ratio_bound(len(w1), len(w2)) <= WORD_MATCH_THRESHOLD:
+        return False
+
+    matcher = SequenceMatcher(None, w1, w2)
+    if matcher.quick_ratio() <= WORD_MATCH_THRESHOLD:
+        return False
+    return matcher.ratio() > WORD_MATCH_THRESHOLD
+
+def _word_similarity(words1, words2) -> float:
+    candidates = set(words2)
+    matching_words = 0
+
+    for w in words1:
+        if w in candidates or any(words_match(w, w2) for w2 in candidates):
+            matching_words += 1
+
+    return (matching_words / max(len(words1), len(words2))) * 100
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalized_similarity(s1_norm: str, s2_norm: str, score_cutoff: float):
+    words1 = _split_words(s1_norm)
+    words2 = _split_words(s2_norm)
+    has_words = bool(words1 and words2)
+
+    # Erken eleme: karakter oranı ve kelime oranı için üst sınırlar
+    if score_cutoff > 0:
+        char_bound = _ratio_bound(len(s1_norm), len(s2_norm)) * 100
+        if has_words:
+            word_bound = len(words1) / max(len(words1), len(words2)) * 100
+            upper = (char_bound + word_bound) / 2
+        else:
+            upper = char_bound
+        if upper < score_cutoff:
+            return 0
+
+    # Kısa cevaplar için karakter benzerliği
+    char_similarity = SequenceMatcher(None, s1_norm, s2_norm).ratio() * 100
+
+    if not has_words:
+        return char_similarity
+
+    # Kelime eşleşme oranı; ikisinin ortalaması
+    return (char_similarity + _word_similarity(words1, words2)) / 2
+
+def string_similarity(s1: str, s2: str, score_cutoff: float = 0):
+    """İki string arasındaki benzerlik (0-100)
+
+    score_cutoff > 0 ise sonucun bu değerin altında kalacağı kesinleştiğinde
+    0 döner (yalnızca eşik kararı gereken çağıranlar için).
+    """
+    s1_norm = cached_normalize(s1) if s1 else ""
+    s2_norm = cached_normalize(s2) if s2 else ""
+
+    return normalized_similarity(s1_norm, s2_norm, score_cutoff)
+
+def normalized_similarity(s1_norm: str, s2_norm: str, score_cutoff: float = 0):
+    """Önceden normalize edilmiş (normalize_text) iki metnin benzerliği (0-100)"""
+    if not s1_norm or not s2_norm:
+        return 0
+
+    # Tam eşleşme
+    if s1_norm == s2_norm:
+        return 100
+
+    return _normalized_similarity(s1_norm, s2_norm, score_cutoff)
@@ -0,0 +1,374 @@
+import json
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+import main_v3
+from image_io import decode_image, read_image_bytes
+from main_v3 import correct_common_ocr_errors, save_result, threshold_image
+from ocr_engine import create_ocr_engine, create_text_recognizer, extract_payload
+
+TEMPLATE_DIR = os.environ.get("TEMPLATE_DIR", "templates")
+# Hizalama için gereken en az RANSAC eşleşmesi; altında tam OCR'a dönülür
+TEMPLATE_MIN_INLIERS = int(os.environ.get("TEMPLATE_MIN_INLIERS", "25"))
+
+# Şablon referans görüntüsü bu genişliğe ölçeklenir, alan koordinatları bu uzaydadır
+TEMPLATE_WIDTH = 1600
+# ORB özellik eşleştirmesi bu genişlikteki kopyalarda yapılır
+ALIGN_WIDTH = 1000
+ORB_FEATURES = 3000
+# Yönlendirmeli yeniden eşleştirme: tur sayısı ve arama penceresi (ALIGN_WIDTH uzayında piksel)
+GUIDED_PASSES = 2
+GUIDED_RADIUS = 40
+# Eşleşmelerin kapsaması gereken en az sayfa yüksekliği oranı
+MIN_SPREAD = 0.4
+# process_ocr_data ile aynı düşük güvenilirlik eşiği
+LOW_CONFIDENCE = 0.85
+
+QUESTION_PATTERN = re.compile(r'[Ss]oru\s*(\d+)')
+NAME_PATTERN = re.compile(r'^[\w\-]+$')
+
+def _gray(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+def _resize_width(img, width: int):
+    factor = width / img.shape[1]
+    interpolation = cv2.INTER_AREA if factor < 1 else cv2.INTER_LINEAR
+    return cv2.resize(img, None, fx=factor, fy=factor, interpolation=interpolation), factor
+
+def _label_end(box, text: str) -> float:
+    # Etiketin (":" dahil) bittiği x; kutu genişliği karakter sayısına orantılı bölünür
+    x1, _, x2, _ = box
+    colon = text.find(":")
+    if colon < 0:
+        return x2
+    return x1 + (x2 - x1) * (colon + 1) / len(text)
+
+def _field_kind(text: str):
+    # process_ocr_data'daki etiket kontrolleriyle aynı
+    lower = text.lower()
+    if "ad soyad" in lower:
+        return "name", None
+    if "ogrenci no" in lower or "öğrenci no" in lower:
+        return "id", None
+    match = QUESTION_PATTERN.search(text)
+    if match:
+        return "answer", int(match.group(1))
+    return None, None
+
+def build_layout(payload: dict, width: int, height: int) -> dict:
+    """Boş şablonun OCR sonucundan alan bölgelerini çıkar
+
+    Her alan: etiket satırından sayfanın sağ kenarına kadar; cevaplar bir
+    sonraki sorunun başına kadar (alt satırlara kayan cevaplar). Etiketin
+    kendisi "mask" ile tanıma dışında bırakılır.
+    """
+    boxes = payload.get("rec_boxes")
+    if not boxes:
+        raise ValueError("OCR sonucu kutu (rec_boxes) içermiyor")
+
+    labels = []
+    for text, box in zip(payload["rec_texts"], boxes):
+        kind, question = _field_kind(text.strip())
+        if kind is not None:
+            labels.append((kind, question, box, text.strip()))
+
+    if not labels:
+        raise ValueError("Şablonda 'Ad Soyad', 'Öğrenci No' ya da 'Soru N' alanı bulunamadı")
+
+    line_height = float(np.median([box[3] - box[1] for _, _, box, _ in labels]))
+    pad = line_height * 0.3
+    left = max(0.0, min(box[0] for box in boxes) - pad)
+    right = width - width * 0.02
+
+    # Son sorunun alt sınırı: sorular arası ortalama aralık kadar
+    question_tops = sorted(box[1] for kind, _, box, _ in labels if kind == "answer")
+    gaps = np.diff(question_tops)
+    last_gap = float(np.median(gaps)) if len(gaps) else height
+
+    fields = []
+    for kind, question, box, text in labels:
+        x1, y1, x2, y2 = box
+        # Etiket, hizalama hatasını tolere edecek kadar geniş maskelenir
+        mask = [x1 - 2 * pad, y1 - 2 * pad, _label_end(box, text) + pad, y2 + 2 * pad]
+
+        if kind == "answer":
+            next_tops = [top for top in question_tops if top > y1]
+            bottom = (next_tops[0] if next_tops else min(height, y1 + last_gap)) - pad
+            region = [left, y1 - pad, right, bottom]
+        else:
+            region = [x1 - pad, y1 - pad, right, y2 + pad]
+
+        fields.append({
+            "kind": kind,
+            "question": question,
+            "box": [round(float(v), 1) for v in region],
+            "mask": [round(float(v), 1) for v in mask],
+        })
+
+    return {"width": width, "height": height, "line_height": line_height, "fields": fields}
+
+def _remove_rules(ink, line_height: float):
+    # Form çizgileri (çerçeve, yazı satırı çizgileri) satır bölmeyi bozmasın
+    # Hizalama sonrası hafif eğik çizgiler de yakalansın diye önce 3x3 kalınlaştırılır
+    length = max(3, int(line_height * 3))
+    square = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    thick = cv2.dilate(ink, square)
+    horizontal = cv2.morphologyEx(thick, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1)))
+    vertical = cv2.morphologyEx(thick, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length)))
+    return cv2.subtract(ink, cv2.dilate(cv2.bitwise_or(horizontal, vertical), square))
+
+def split_lines(ink, min_height: float):
+    """Bölgedeki yazı satırları (yatay izdüşüm ile): [(x1, y1, x2, y2), ...]"""
+    rows = np.count_nonzero(ink, axis=1)
+    has_ink = rows > max(2, ink.shape[1] * 0.002)
+
+    lines = []
+    start = None
+    for y, on in enumerate(np.append(has_ink, False)):
+        if on and start is None:
+            start = y
+        elif not on and start is not None:
+            if y - start >= min_height:
+                cols = np.flatnonzero(ink[start:y].any(axis=0))
+                lines.append((int(cols[0]), start, int(cols[-1]) + 1, y))
+            start = None
+    return lines
+
+class ExamTemplate:
+    """Kayıtlı bir sınav formu: referans görüntü + alan bölgeleri"""
+
+    def __init__(self, name: str, layout: dict, reference):
+        self.name = name
+        self.layout = layout
+        self.width = layout["width"]
+        self.height = layout["height"]
+        self.fields = layout["fields"]
+
+        small, self._align_factor = _resize_width(reference, ALIGN_WIDTH)
+        self._keypoints, self._descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+        self._points = np.float32([kp.pt for kp in self._keypoints])
+
+    def _fit(self, keypoints, matches):
+        # Küçük kopyalar arasında RANSAC homografi: (H, inlier maskesi)
+        if len(matches) < TEMPLATE_MIN_INLIERS:
+            return None, None
+        src = np.float32([keypoints[m.queryIdx].pt for m in matches])
+        dst = np.float32([self._keypoints[m.trainIdx].pt for m in matches])
+        homography, inlier_mask = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        if homography is None:
+            return None, None
+        return homography, inlier_mask.ravel().astype(bool)
+
+    def _guided_matches(self, homography, keypoints, descriptors):
+        # Sadece tahmini konumun çevresindeki şablon noktalarıyla eşleştir
+        projected = cv2.perspectiveTransform(np.float32([kp.pt for kp in keypoints]).reshape(-1, 1, 2), homography)
+        projected = projected.reshape(-1, 2)
+        mask = (
+            (np.abs(projected[:, 0:1] - self._points[:, 0]) < GUIDED_RADIUS)
+            & (np.abs(projected[:, 1:2] - self._points[:, 1]) < GUIDED_RADIUS)
+        ).astype(np.uint8)
+
+        matches = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(descriptors, self._descriptors, k=2, mask=mask)
+        good = []
+        for pair in matches:
+            if len(pair) == 1 or (len(pair) == 2 and pair[0].distance < 0.8 * pair[1].distance):
+                good.append(pair[0])
+        return good
+
+    def align(self, img):
+        """Taranmış sayfayı şablon koordinatlarına hizala: (hizalı görüntü ya da None, eşleşme sayısı)"""
+        if self._descriptors is None:
+            return None, 0
+
+        small, factor = _resize_width(_gray(img), ALIGN_WIDTH)
+        keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+        if descriptors is None or len(keypoints) < TEMPLATE_MIN_INLIERS:
+            return None, 0
+
+        matches = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(descriptors, self._descriptors, k=2)
+        good = [pair[0] for pair in matches if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance]
+        homography, inlier_mask = self._fit(keypoints, good)
+        if homography is None:
+            return None, len(good)
+
+        # Tekrarlayan etiketler ("Soru N") ilk modeli sayfanın bir bölgesine kilitleyebilir;
+        # tahmini konumların çevresinde yeniden eşleştirip modeli iyileştir
+        for _ in range(GUIDED_PASSES):
+            guided = self._guided_matches(homography, keypoints, descriptors)
+            refined, refined_mask = self._fit(keypoints, guided)
+            if refined is None:
+                break
+            homography, inlier_mask, good = refined, refined_mask, guided
+
+        inliers = int(inlier_mask.sum())
+        # Eşleşmeler sayfanın küçük bir bölgesinde toplanmışsa model güvenilmez
+        ys = np.float32([self._keypoints[m.trainIdx].pt[1] for m in good])[inlier_mask]
+        spread = (ys.max() - ys.min()) / (self.height * self._align_factor) if inliers else 0.0
+        if inliers < TEMPLATE_MIN_INLIERS or spread < MIN_SPREAD:
+            return None, inliers
+
+        # Küçük kopya koordinatlarından tam boyuta
+        to_template = np.diag([1 / self._align_factor, 1 / self._align_factor, 1])
+        from_scan = np.diag([factor, factor, 1])
+        homography = to_template @ homography @ from_scan
+
+        aligned = cv2.warpPerspective(img, homography, (self.width, self.height),
+                                      borderMode=cv2.BORDER_CONSTANT, borderValue=(255, 255, 255))
+        return aligned, inliers
+
+    def _clip(self, box):
+        x1, y1, x2, y2 = box
+        return (max(0, int(x1)), max(0, int(y1)), min(self.width, int(np.ceil(x2))), min(self.height, int(np.ceil(y2))))
+
+    def read_fields(self, aligned, recognizer):
+        """Her alanın satırlarını sadece tanıma modeliyle oku: alan başına [(metin, skor), ...]"""
+        page = threshold_image(aligned)
+        for field in self.fields:
+            x1, y1, x2, y2 = self._clip(field["mask"])
+            page[y1:y2, x1:x2] = 255
+        ink = _remove_rules(cv2.bitwise_not(page), self.layout["line_height"])
+        page = cv2.bitwise_not(ink)
+
+        min_height = self.layout["line_height"] * 0.4
+        pad = int(self.layout["line_height"] * 0.15) + 1
+
+        crops = []
+        for index, field in enumerate(self.fields):
+            x1, y1, x2, y2 = self._clip(field["box"])
+            for lx1, ly1, lx2, ly2 in split_lines(ink[y1:y2, x1:x2], min_height):
+                line = page[max(0, y1 + ly1 - pad):y1 + ly2 + pad, max(0, x1 + lx1 - pad):x1 + lx2 + pad]
+                crops.append((index, cv2.cvtColor(line, cv2.COLOR_GRAY2BGR)))
+
+        lines = [[] for _ in self.fields]
+        if crops:
+            # Tüm satırlar tek predict çağrısında
+            for (index, _), res in zip(crops, recognizer.predict([crop for _, crop in crops])):
+                lines[index].append((str(res["rec_text"]).strip(), float(res["rec_score"])))
+        return lines
+
+    def to_result(self, lines, original_image_path: str):
+        """Alan metinlerini process_ocr_data ile aynı biçimde sonuca dönüştür"""
+        student_name = None
+        student_id = None
+        answers = {}
+        answer_warnings = {}
+
+        for field, field_lines in zip(self.fields, lines):
+            text = " ".join(t for t, _ in field_lines if t)
+
+            if field["kind"] == "name":
+                student_name = text or None
+            elif field["kind"] == "id":
+                student_id = ''.join(filter(str.isdigit, correct_common_ocr_errors(text))) or None
+            else:
+                question_num = field["question"]
+                if not text or text.lower() == "boş" or text.lower() == "bos":
+                    answers[question_num] = "Boş"
+                    continue
+                answers[question_num] = text
+                low_scores = [score for t, score in field_lines if t and score < LOW_CONFIDENCE]
+                if low_scores:
+                    answer_warnings[question_num] = {
+                        "warning": "Düşük OCR güvenilirliği",
+                        "low_confidence_scores": low_scores
+                    }
+
+        answers = dict(sorted(answers.items()))
+        return save_result(student_name, student_id, answers, answer_warnings, original_image_path)
+
+class TemplateRegistry:
+    """storage_dir/<ad>/ altında template.json + reference.png olarak saklanan şablonlar"""
+
+    def __init__(self, storage_dir: str = TEMPLATE_DIR):
+        self.storage_dir = storage_dir
+        self._templates = {}
+        os.makedirs(storage_dir, exist_ok=True)
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.storage_dir, name)
+
+    def register(self, name: str, img, ocr=None) -> ExamTemplate:
+        """Boş (ya da örnek) formu tam OCR ile bir kez okuyup alan bölgelerini kaydet"""
+        if not NAME_PATTERN.match(name):
+            raise ValueError("Şablon adı sadece harf, rakam, '_' ve '-' içerebilir")
+
+        reference, _ = _resize_width(_gray(img), TEMPLATE_WIDTH)
+        if ocr is None:
+            ocr = create_ocr_engine()
+        payload = extract_payload(ocr.predict(cv2.cvtColor(reference, cv2.COLOR_GRAY2BGR)))
+
+        layout = build_layout(payload, reference.shape[1], reference.shape[0])
+        layout["name"] = name
+        layout["created_at"] = time.time()
+
+        os.makedirs(self._dir(name), exist_ok=True)
+        cv2.imwrite(os.path.join(self._dir(name), "reference.png"), reference)
+        with open(os.path.join(self._dir(name), "template.json"), "w", encoding="utf-8") as f:
+            json.dump(layout, f, indent=2, ensure_ascii=False)
+
+        self._templates[name] = ExamTemplate(name, layout, reference)
+        return self._templates[name]
+
+    def get(self, name: str):
+        if name in self._templates:
+            return self._templates[name]
+        if not NAME_PATTERN.match(name) or not os.path.exists(os.path.join(self._dir(name), "template.json")):
+            return None
+
+        with open(os.path.join(self._dir(name), "template.json"), "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        reference = cv2.imread(os.path.join(self._dir(name), "reference.png"), cv2.IMREAD_GRAYSCALE)
+        self._templates[name] = ExamTemplate(name, layout, reference)
+        return self._templates[name]
+
+    def names(self):
+        return sorted(
+            name for name in os.listdir(self.storage_dir)
+            if os.path.exists(os.path.join(self._dir(name), "template.json"))
+        )
+
+    def match(self, img, name: str = None):
+        """Sayfaya en iyi oturan şablon: (şablon, hizalı görüntü) ya da (None, None)"""
+        candidates = [self.get(name)] if name else [self.get(n) for n in self.names()]
+        best = (None, None, 0)
+        for template in candidates:
+            if template is None:
+                continue
+            aligned, inliers = template.align(img)
+            if aligned is not None and inliers > best[2]:
+                best = (template, aligned, inliers)
+        return best[0], best[1]
+
+def process_image_with_template(image_path: str, registry: TemplateRegistry, template_name: str = None,
+                                recognizer=None, ocr=None, cache=None, debug: bool = False, ocr_factory=None):
+    """Şablona hizala -> bilinen alanlarda sadece tanıma; hizalanamazsa main_v3 akışına dön
+
+    ocr_factory: ocr verilmediğinde tam OCR motorunu ilk hizalanamayan
+    kağıtta oluşturan (ve sonra aynısını döndüren) fonksiyon.
+    """
+    img = decode_image(read_image_bytes(image_path))
+    if img is None:
+        print(f"Hata: {image_path} okunamadı!")
+        return None
+
+    template, aligned = registry.match(img, template_name)
+    if template is None:
+        print(f"⚠️ {image_path} şablona hizalanamadı, tam OCR kullanılıyor")
+        if ocr is None and ocr_factory is not None:
+            ocr = ocr_factory()
+        return main_v3.process_image(image_path, ocr, cache, debug)
+
+    if debug:
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        cv2.imwrite(f"output/{base_name}_aligned.jpg", aligned)
+
+    if recognizer is None:
+        recognizer = create_text_recognizer()
+
+    lines = template.read_fields(aligned, recognizer)
+    print(f"Şablon: {template.name} ({sum(len(l) for l in lines)} satır tanındı)")
+    return template.to_result(lines, image_path)
@@ -0,0 +1,39 @@
+# Türkçede olmayan (OCR kaynaklı) karakterlerin benzer Türkçe karşılıkları
+OCR_CHAR_MAP = {
+    'ä': 'ö', 'à': 'a', 'á': 'a', 'â': 'ö', 'ã': 'ö', 'å': 'a', 'ā': 'ö', 'ă': 'ö', 'ą': 'a',
+    'ë': 'e', 'è': 'e', 'é': 'e', 'ê': 'e', 'ē': 'e', 'ĕ': 'e', 'ę': 'ç', 'ė': 'e',
+    'ï': 'i', 'ì': 'i', 'í': 'i', 'î': 'i', 'ĩ': 'i', 'ī': 'i', 'ĭ': 'i', 'į': 'i',
+    'ò': 'ö', 'ó': 'ö', 'ô': 'ö', 'õ': 'ö', 'ø': 'o', 'ō': 'ö', 'ŏ': 'ö', 'ő': 'ö',
+    'ù': 'ü', 'ú': 'ü', 'û': 'ü', 'ũ': 'ü', 'ū': 'ü', 'ŭ': 'ü', 'ů': 'ü', 'ű': 'ü',
+    'ÿ': 'y', 'ý': 'y', 'ŷ': 'g',
+    'ć': 'c', 'ĉ': 'c', 'ċ': 'c', 'č': 'c',
+    'ġ': 'ğ', 'ģ': 'ğ',
+    'ś': 's', 'ŝ': 's','š': 's',
+    'ž': 'z', 'ź': 'z', 'ż': 'z',
+    'ñ': 'n', 'ń': 'n', 'ņ': 'n', 'ň': 'n', 'ŉ': 'n',
+}
+
+# str.translate için önceden derlenmiş tablo
+OCR_TRANSLATION = str.maketrans(OCR_CHAR_MAP)
+
+def normalize_ocr_text(text: str):
+    """OCR hatalarını düzelt: Türkçede olmayan karakterleri benzer Türkçe karakterlere çevir"""
+    if not text:
+        return ""
+    
+    return text.translate(OCR_TRANSLATION)
+
+def normalize_text(text: str):
+    """Metni normalize et: küçük harf + boşlukları temizle + OCR karakter düzeltmeleri"""
+    if not text:
+        return ""
+    
+    # Önce OCR karakterlerini düzelt
+    text = normalize_ocr_text(text)
+    
+    # Sonra normal normalize işlemleri
+    text = text.lower()
+    text = text.strip()
+    text = ' '.join(text.split())  # Birden fazla boşluğu teke indir
+    
+    return text